@@ -0,0 +1,55 @@
+# Problem.ascent_count: rows of user_climbed_problems per problem, kept up to date by the writers
+#
+# Every code path inserting or deleting user_climbed_problems rows adjusts
+# the counters in the same transaction (submit_questionnaire, the logbook
+# import, scripts.load_ascents). scripts/reconcile_ascent_counts.py
+# recomputes them from the table to catch any drift, e.g. after manual edits.
+from collections import Counter
+from sqlalchemy import bindparam, func, select, update
+from sqlalchemy.orm import Session
+from app.models import Problem, UserClimbedProblem
+
+UPDATE_BATCH_SIZE = 5000
+
+_problems = Problem.__table__
+
+# Core statement: executemany with a custom WHERE (the ORM bulk UPDATE only matches on primary keys)
+_ADJUST = (
+    update(_problems)
+    .where(_problems.c.id == bindparam("problem_id"))
+    .values(ascent_count=_problems.c.ascent_count + bindparam("delta"))
+)
+
+def adjust_ascent_counts(db: Session, problem_ids, sign: int = 1) -> None:
+    """
+    Add (sign=1) or remove (sign=-1) one ascent per occurrence in problem_ids.
+    The caller is responsible for committing, with the rows it wrote.
+    """
+    deltas = [
+        {"problem_id": problem_id, "delta": sign * n}
+        for problem_id, n in Counter(problem_ids).items()
+    ]
+    for start in range(0, len(deltas), UPDATE_BATCH_SIZE):
+        db.execute(_ADJUST, deltas[start:start + UPDATE_BATCH_SIZE])
+
+def actual_ascent_count():
+    """Correlated COUNT(*) of user_climbed_problems for the current problems row."""
+    return (
+        select(func.count())
+        .where(UserClimbedProblem.problem_id == _problems.c.id)
+        .scalar_subquery()
+    )
+
+def reconcile_ascent_counts(db: Session, dry_run: bool = False) -> int:
+    """
+    Reset every drifted counter to the actual count, in one UPDATE.
+    The caller is responsible for committing.
+
+    Returns:
+        Number of problems whose counter was wrong
+    """
+    drifted = _problems.c.ascent_count != actual_ascent_count()
+    n_drifted = db.execute(select(func.count()).select_from(_problems).where(drifted)).scalar()
+    if n_drifted and not dry_run:
+        db.execute(update(_problems).where(drifted).values(ascent_count=actual_ascent_count()))
+    return n_drifted
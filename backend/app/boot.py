@@ -0,0 +1,260 @@
+# Fast boot: skip database setup when the stored schema and dataset versions are current
+#
+# The Procfile used to run scripts.create_tables and scripts.load_data before
+# uvicorn on every start. The lifespan now reads both versions from app_state
+# in a single query. A stale schema is migrated (alembic) before serving.
+# Loading the catalog files and warming the in-process caches run in a
+# background thread, so the worker accepts requests right away.
+import hashlib
+import os
+import threading
+import time
+from pathlib import Path
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import SQLAlchemyError
+from app.database import Base, SessionLocal, engine
+from app.catalog_db import DATASET_VERSION_KEY, refresh_catalog_version
+from app.state import set_state
+from app import metrics
+
+SCHEMA_VERSION_KEY = "schema_version"
+RAW_DATA_PATH = Path(__file__).parent.parent / "data" / "raw"
+MIGRATIONS_PATH = Path(__file__).parent.parent / "migrations"
+# Arbitrary keys of the Postgres advisory locks held by the worker running setup
+SETUP_LOCK_ID = 460_041
+SCHEMA_LOCK_ID = 460_042
+
+def _process_started_at() -> float:
+    """Wall-clock start of this process (Linux), else the time this module was imported."""
+    try:
+        with open("/proc/self/stat") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return time.time() - uptime + start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return time.time()
+
+PROCESS_STARTED_AT = _process_started_at()
+
+# Reported by /health
+status = {
+    "ready": False,
+    "setup": None,  # "skipped", "running", "done" or "failed"
+    "lifespan_ready_s": None,
+    "first_request_s": None,
+    "warm_s": None,
+}
+
+def schema_version() -> str:
+    """Fingerprint of the tables and columns declared in app.models."""
+    parts = [
+        f"{table.name}({','.join(sorted(column.name for column in table.columns))})"
+        for table in sorted(Base.metadata.tables.values(), key=lambda t: t.name)
+    ]
+    return hashlib.sha1(";".join(parts).encode()).hexdigest()[:12]
+
+def dataset_version() -> str:
+    """Fingerprint of the raw catalog files, from their names and sizes (no file is read)."""
+    parts = [
+        f"{path.relative_to(RAW_DATA_PATH)}:{path.stat().st_size}"
+        for folder in ("boulders", "circuits")
+        for path in sorted((RAW_DATA_PATH / folder).glob("*.json"))
+    ]
+    return hashlib.sha1(";".join(parts).encode()).hexdigest()[:12]
+
+def stored_versions() -> dict[str, str]:
+    """Schema and dataset versions from app_state in one query; empty if the table is missing."""
+    try:
+        with engine.connect() as conn:
+            rows = conn.execute(
+                text("SELECT key, value FROM app_state WHERE key IN (:schema, :dataset)"),
+                {"schema": SCHEMA_VERSION_KEY, "dataset": DATASET_VERSION_KEY},
+            )
+            return dict(rows.all())
+    except SQLAlchemyError:
+        return {}
+
+def _setup_lock(conn) -> None:
+    """
+    Let a single worker run the setup when several boot against the same
+    Postgres; the others block here until it is done.
+    """
+    if engine.dialect.name == "postgresql":
+        conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": SETUP_LOCK_ID})
+
+def _release_setup_lock(conn) -> None:
+    # Session-level lock: it would outlive the pooled connection otherwise
+    if engine.dialect.name == "postgresql":
+        conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": SETUP_LOCK_ID})
+
+def missing_columns() -> list[str]:
+    """'table.column' declared in app.models but absent from the database (whole tables included)."""
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    missing = []
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            missing.append(f"{table.name}.*")
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        missing.extend(f"{table.name}.{column.name}" for column in table.columns if column.name not in existing)
+    return missing
+
+def _alembic_config():
+    # No ini file: alembic's fileConfig would replace the logging setup of the server
+    from alembic.config import Config
+
+    config = Config()
+    config.set_main_option("script_location", str(MIGRATIONS_PATH))
+    return config
+
+def migrate() -> None:
+    """
+    Bring the database to the latest migration. An empty database gets
+    create_all plus a stamp; a database created by create_all before
+    migrations were tracked is stamped only if it already has every column.
+    """
+    from alembic import command
+
+    inspector = inspect(engine)
+    tables = set(inspector.get_table_names())
+    if "alembic_version" in tables:
+        command.upgrade(_alembic_config(), "head")
+    elif not tables & set(Base.metadata.tables):
+        Base.metadata.create_all(bind=engine)
+        command.stamp(_alembic_config(), "head")
+    elif not missing_columns():
+        command.stamp(_alembic_config(), "head")
+    else:
+        raise RuntimeError(
+            "The database has no migration history and is behind app.models: run "
+            "'alembic stamp <revision it matches>' then 'alembic upgrade head'"
+        )
+
+def ensure_schema(versions: dict[str, str]) -> None:
+    """
+    Migrate the database unless the stored schema version is current. Runs
+    before serving; the version is only stamped once every declared column
+    exists, otherwise the worker refuses to start.
+    """
+    if versions.get(SCHEMA_VERSION_KEY) == schema_version():
+        return
+    t0 = time.perf_counter()
+    with engine.connect() as lock_conn:
+        # Blocking: the other workers wait for the migration, then find nothing to do
+        if engine.dialect.name == "postgresql":
+            lock_conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": SCHEMA_LOCK_ID})
+        try:
+            migrate()
+        finally:
+            if engine.dialect.name == "postgresql":
+                lock_conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": SCHEMA_LOCK_ID})
+
+    missing = missing_columns()
+    if missing:
+        raise RuntimeError(f"Schema still behind app.models after migrating, missing: {', '.join(missing)}")
+    db = SessionLocal()
+    try:
+        set_state(db, SCHEMA_VERSION_KEY, schema_version())
+        db.commit()
+    finally:
+        db.close()
+    print(f"✅ Schema {schema_version()} ensured in {time.perf_counter() - t0:.2f}s")
+
+def load_dataset() -> None:
+    """Load (or reload over an older one) the raw catalog through scripts.load_data and record its version."""
+    # Imported here: the loader and its stats helpers are only needed on a setup boot
+    from scripts import load_data
+
+    with engine.connect() as lock_conn:
+        _setup_lock(lock_conn)
+        try:
+            # Waited for another worker: its load is ours, and warming must only start now
+            if stored_versions().get(DATASET_VERSION_KEY) == dataset_version():
+                print(f"✅ Dataset {dataset_version()} loaded by another worker")
+                return
+            t0 = time.perf_counter()
+            # reload: the stored version is stale, so an existing catalog must be replaced too
+            if not load_data.main(reload=True):
+                raise RuntimeError("the dataset was not loaded")
+            db = SessionLocal()
+            try:
+                set_state(db, DATASET_VERSION_KEY, dataset_version())
+                db.commit()
+            finally:
+                db.close()
+            print(f"✅ Dataset {dataset_version()} loaded in {time.perf_counter() - t0:.2f}s")
+        finally:
+            _release_setup_lock(lock_conn)
+
+def warm_caches() -> None:
+    """Build the in-process caches that would otherwise be built by the first requests."""
+    from app.catalog import load_catalog
+    from app.reco_cache import current_version
+
+    # Version first: the catalog snapshot is stamped with it
+    refresh_catalog_version()
+    load_catalog()
+    db = SessionLocal()
+    try:
+        current_version(db)
+    finally:
+        db.close()
+
+def _background_boot(needs_dataset: bool) -> None:
+    t0 = time.perf_counter()
+    try:
+        if needs_dataset:
+            load_dataset()
+            status["setup"] = "done"
+        warm_caches()
+        status["ready"] = True
+    except Exception as e:
+        if status["setup"] == "running":
+            status["setup"] = "failed"
+        print(f"❌ Error during background boot: {e}")
+    finally:
+        status["warm_s"] = round(time.perf_counter() - t0, 3)
+
+def boot() -> threading.Thread:
+    """
+    Called from the app lifespan: check versions, ensure the schema, then
+    start the dataset load (if needed) and cache warming in the background.
+
+    Returns:
+        The background thread
+    """
+    versions = stored_versions()
+    ensure_schema(versions)
+    needs_dataset = versions.get(DATASET_VERSION_KEY) != dataset_version()
+    status["setup"] = "running" if needs_dataset else "skipped"
+
+    thread = threading.Thread(target=_background_boot, args=(needs_dataset,), name="boot", daemon=True)
+    thread.start()
+
+    elapsed = time.time() - PROCESS_STARTED_AT
+    status["lifespan_ready_s"] = round(elapsed, 3)
+    metrics.BOOT_SECONDS.labels("lifespan_ready").set(elapsed)
+    print(f"✅ Accepting requests {elapsed:.2f}s after process start (dataset load {status['setup']})")
+    return thread
+
+class FirstRequestMiddleware:
+    """Report time-to-first-request, then only forward requests."""
+
+    def __init__(self, app):
+        self.app = app
+        self.seen = False
+
+    async def __call__(self, scope, receive, send):
+        if not self.seen and scope["type"] == "http":
+            self.seen = True
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                elapsed = time.time() - PROCESS_STARTED_AT
+                status["first_request_s"] = round(elapsed, 3)
+                metrics.BOOT_SECONDS.labels("first_request").set(elapsed)
+                print(f"✅ First request served {elapsed:.2f}s after process start")
+            return
+        await self.app(scope, receive, send)
@@ -0,0 +1,209 @@
+# In-process snapshot of the problem catalog, rebuilt when the catalog dataset version changes
+import threading
+import time
+import numpy as np
+import scipy.sparse as sp
+from sqlalchemy.orm import Session
+from app.catalog_db import CatalogSessionLocal, catalog_version
+from app.matching import GRADE_ORDER
+from app.models import Problem, Sector
+from app.translations import TAG_LABELS, TAG_IDS
+
+# Tag vocabulary: column j of the tag matrix is tag id j (None, and an empty column, for retired ids)
+TAG_VOCABULARY = [TAG_LABELS[j][0] if j in TAG_LABELS else None for j in range(max(TAG_LABELS) + 1)]
+# French and English labels resolve to the same columns
+TAG_POSITION = TAG_IDS
+
+MAX_GRADE_ORDER = max(GRADE_ORDER.values())
+RATING_BINS = np.arange(0.0, 5.5, 0.5)
+
+# Relative weights of each feature block in the content vectors
+TAG_WEIGHT = 1.0
+GRADE_WEIGHT = 1.0
+RATING_WEIGHT = 0.3
+SECTOR_WEIGHT = 0.5
+
+class Catalog:
+    """Problem ids plus columnar arrays and sparse feature matrices over them"""
+
+    def __init__(self, rows, sectors, dataset_version=None):
+        """
+        Args:
+            rows: Iterable of (id, grade_order, rating, sector_id, tag_ids) tuples
+            sectors: Iterable of (sector_id, slug) tuples
+            dataset_version: Catalog dataset version the rows were read at
+        """
+        self.dataset_version = dataset_version
+        rows = list(rows)
+        self.problem_ids = [r[0] for r in rows]
+        self.position = {pid: i for i, pid in enumerate(self.problem_ids)}
+        self.grade_order = np.array([r[1] or 0 for r in rows], dtype=np.int16)
+        self.rating = np.array([r[2] if r[2] is not None else np.nan for r in rows], dtype=np.float32)
+        self.sector_id = np.array([r[3] if r[3] is not None else -1 for r in rows], dtype=np.int32)
+        self.sector_slug_to_id = {slug: sector_id for sector_id, slug in sectors}
+        self.tags = build_tag_matrix(r[4] for r in rows)
+        # Problems carrying each tag id, served by /questionnaire/available-tags
+        self.tag_counts = np.asarray(self.tags.sum(axis=0)).ravel().astype(np.int64)
+        self.similarity_index = SimilarityIndex(self)
+
+    def __len__(self):
+        return len(self.problem_ids)
+
+    def preference_vector(self, weights: dict[str, float]) -> np.ndarray:
+        """Dense weight vector over the tag vocabulary; unknown tags are ignored."""
+        w = np.zeros(len(TAG_VOCABULARY), dtype=np.float32)
+        for tag, weight in weights.items():
+            j = TAG_POSITION.get(tag.strip().lower())
+            if j is not None:
+                w[j] += weight
+        return w
+
+    def rank_by_preferences(self, weights: dict[str, float], min_order=None, max_order=None,
+                            sector_id=None, n=100):
+        """
+        Rank problems by how well their styles match weighted preferences.
+
+        The score of every problem is one sparse product, tags @ w. Ratings
+        break ties.
+
+        Returns:
+            List of (problem_id, score), best first, only problems with a match
+        """
+        w = self.preference_vector(weights)
+        scores = self.tags @ w
+        mask = scores > 0
+        if min_order is not None:
+            mask &= self.grade_order >= min_order
+        if max_order is not None:
+            mask &= self.grade_order <= max_order
+        if sector_id is not None:
+            mask &= self.sector_id == sector_id
+
+        candidates = np.flatnonzero(mask)
+        if len(candidates) == 0:
+            return []
+        keys = scores[candidates] + 1e-3 * np.nan_to_num(self.rating[candidates])
+        if len(candidates) > n:
+            top = np.argpartition(-keys, n - 1)[:n]
+            candidates, keys = candidates[top], keys[top]
+        order = np.argsort(-keys)
+        return [(self.problem_ids[j], float(scores[j])) for j in candidates[order]]
+
+def build_tag_matrix(tag_ids_column) -> sp.csr_matrix:
+    """Binary problem x tag matrix over TAG_VOCABULARY, from the problems.tag_ids lists."""
+    indptr, indices = [0], []
+    for tag_ids in tag_ids_column:
+        cols = sorted(set(tag_ids or []))
+        indices.extend(cols)
+        indptr.append(len(indices))
+    data = np.ones(len(indices), dtype=np.float32)
+    return sp.csr_matrix((data, indices, indptr), shape=(len(indptr) - 1, len(TAG_VOCABULARY)))
+
+def _soft_one_hot(values, n_bins, width=1.0):
+    """
+    Encode scalars as Gaussian bumps over neighbouring bins, so that the dot
+    product of two encodings decreases smoothly with their distance.
+    """
+    rows, cols, data = [], [], []
+    for i, v in enumerate(values):
+        if np.isnan(v):
+            continue
+        center = int(round(v))
+        for b in range(max(0, center - 2), min(n_bins, center + 3)):
+            rows.append(i)
+            cols.append(b)
+            data.append(np.exp(-((v - b) ** 2) / (2 * width ** 2)))
+    return sp.csr_matrix((np.array(data, dtype=np.float32), (rows, cols)), shape=(len(values), n_bins))
+
+class SimilarityIndex:
+    """
+    Exact nearest-neighbor index over content vectors.
+
+    Each problem is encoded as [tags | grade | rating | sector], L2-normalized,
+    so cosine similarity is one sparse matrix-vector product over the catalog.
+    """
+
+    def __init__(self, catalog: Catalog):
+        n = len(catalog)
+        tags = catalog.tags.multiply(1.0 / np.sqrt(np.maximum(catalog.tags.sum(axis=1), 1))).tocsr()
+        grade = _soft_one_hot(catalog.grade_order.astype(np.float32), MAX_GRADE_ORDER + 1)
+        rating = _soft_one_hot(catalog.rating / 0.5, len(RATING_BINS))
+
+        sector_ids = catalog.sector_id
+        sector_cols = {s: j for j, s in enumerate(np.unique(sector_ids))}
+        sector = sp.csr_matrix(
+            (np.ones(n, dtype=np.float32), (np.arange(n), [sector_cols[s] for s in sector_ids])),
+            shape=(n, len(sector_cols)),
+        )
+
+        features = sp.hstack([
+            TAG_WEIGHT * tags,
+            GRADE_WEIGHT * grade,
+            RATING_WEIGHT * rating,
+            SECTOR_WEIGHT * sector,
+        ]).tocsr().astype(np.float32)
+        norms = np.sqrt(np.asarray(features.multiply(features).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        self.features = sp.diags(1.0 / norms).dot(features).tocsr()
+        self.catalog = catalog
+
+    def query(self, problem_id: str, k: int = 10, other_sectors: bool = False):
+        """
+        Top-k most similar problems.
+
+        Args:
+            problem_id: Problem to find neighbors for
+            k: Number of neighbors
+            other_sectors: If True, only return problems from other sectors
+
+        Returns:
+            List of (problem_id, score), best first, or None if the id is unknown
+        """
+        i = self.catalog.position.get(problem_id)
+        if i is None:
+            return None
+        scores = self.features @ self.features[i].toarray().ravel()
+        scores[i] = -np.inf
+        if other_sectors:
+            scores[self.catalog.sector_id == self.catalog.sector_id[i]] = -np.inf
+
+        k = min(k, len(scores) - 1)
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.catalog.problem_ids[j], float(scores[j])) for j in top if np.isfinite(scores[j])]
+
+# Process-wide catalog, built at startup and on reload
+_catalog: Catalog | None = None
+_build_lock = threading.Lock()
+
+def load_catalog(db: Session | None = None) -> Catalog:
+    """(Re)build the catalog snapshot and its indexes from the database."""
+    global _catalog
+    own_session = db is None
+    db = db or CatalogSessionLocal()
+    try:
+        t0 = time.perf_counter()
+        # Read before the rows: a load finishing meanwhile only triggers one more rebuild
+        version = catalog_version()
+        rows = db.query(Problem.id, Problem.grade_order, Problem.rating, Problem.sector_id, Problem.tag_ids)
+        sectors = db.query(Sector.id, Sector.slug).all()
+        catalog = Catalog(rows.order_by(Problem.id).yield_per(5000), sectors, version)
+        print(f"✅ Catalog loaded: {len(catalog)} problems in {time.perf_counter() - t0:.2f}s")
+    finally:
+        if own_session:
+            db.close()
+    _catalog = catalog
+    return catalog
+
+def _is_current(catalog: Catalog | None) -> bool:
+    return catalog is not None and catalog.dataset_version == catalog_version()
+
+def get_catalog() -> Catalog:
+    """Return the catalog, building it on first use and rebuilding it when the dataset version changes."""
+    if not _is_current(_catalog):
+        with _build_lock:
+            if not _is_current(_catalog):
+                load_catalog()
+    return _catalog
@@ -0,0 +1,106 @@
+# Optional read-only SQLite copy of the catalog (sectors, problems, circuits)
+#
+# Built from data/raw by scripts.build_sqlite_catalog. With CATALOG_DB_PATH
+# set, the catalog routers read this file through a read-only engine created
+# in each worker; survey, ascent and recommendation tables stay in the primary
+# database. Without it, catalog reads go to the primary database as before.
+import os
+import re
+import time
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session, sessionmaker
+from app.database import engine
+
+CATALOG_DB_PATH = os.getenv("CATALOG_DB_PATH")
+
+# Tables copied into the catalog file
+CATALOG_TABLES = ["sectors", "sector_stats", "problems", "circuits", "circuit_stats", "circuit_problems", "app_state"]
+# FTS5 index over problem names, accent- and case-insensitive
+FTS_TABLE = "problems_fts"
+# app_state key of the loaded dataset version, written by app.boot and the catalog builder
+DATASET_VERSION_KEY = "dataset_version"
+# How long a worker trusts its copy of the catalog dataset version
+VERSION_TTL_SECONDS = 60
+
+_version = (None, 0.0)
+
+def read_only_engine(path: str):
+    """
+    Engine over a catalog file that is never written in place.
+
+    immutable=1 skips SQLite's file locking. The builder swaps in a new file
+    with os.replace, and open connections keep reading the old one until the
+    workers restart.
+    """
+    catalog_engine = create_engine(
+        f"sqlite:///file:{path}?mode=ro&immutable=1&uri=true",
+        connect_args={"check_same_thread": False},
+    )
+
+    @event.listens_for(catalog_engine, "connect")
+    def _pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA query_only = ON")
+        cursor.execute("PRAGMA mmap_size = 268435456")
+        cursor.close()
+
+    return catalog_engine
+
+catalog_engine = read_only_engine(CATALOG_DB_PATH) if CATALOG_DB_PATH else engine
+
+CatalogSessionLocal = sessionmaker(bind=catalog_engine, autocommit=False, autoflush=False)
+
+def get_catalog_db():
+    db = CatalogSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def fts_enabled() -> bool:
+    """True when catalog reads are served from the SQLite file and its FTS5 index."""
+    return CATALOG_DB_PATH is not None
+
+def fts_query(q: str) -> str | None:
+    """
+    Turn user input into an FTS5 query matching every word as a prefix,
+    e.g. "la marie" -> '"la"* "marie"*'. Returns None if q has no words.
+    """
+    words = re.findall(r"\w+", q)
+    if not words:
+        return None
+    return " ".join(f'"{word}"*' for word in words)
+
+def search_problem_ids(db: Session, q: str, limit: int) -> list[str]:
+    """Problem ids whose name matches q, best match first."""
+    match = fts_query(q)
+    if match is None:
+        return []
+    rows = db.execute(
+        text(f"SELECT id FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match ORDER BY rank LIMIT :limit"),
+        {"match": match, "limit": limit},
+    )
+    return [problem_id for (problem_id,) in rows]
+
+def catalog_version_expired() -> bool:
+    return time.monotonic() - _version[1] > VERSION_TTL_SECONDS
+
+def refresh_catalog_version() -> str | None:
+    """Re-read the dataset version stored in the catalog database."""
+    global _version
+    try:
+        with catalog_engine.connect() as conn:
+            version = conn.execute(
+                text("SELECT value FROM app_state WHERE key = :key"), {"key": DATASET_VERSION_KEY}
+            ).scalar()
+    except SQLAlchemyError:
+        version = None
+    _version = (version, time.monotonic())
+    return version
+
+def catalog_version() -> str | None:
+    """Dataset version the catalog responses are built from, or None if none was recorded."""
+    if catalog_version_expired():
+        return refresh_catalog_version()
+    return _version[0]
@@ -0,0 +1,157 @@
+# KD-tree over climbers' (height, arm span, grade level), for reach-aware suggestions
+#
+# Survey users and scraped climbers with a height, an arm span and at least
+# one graded ascent are indexed. The grade level of a climber is the mean
+# grade_order of their MAX_GRADE_ASCENTS hardest ascents. Features are
+# divided by their *_SCALE, so one scale unit of height, span or grade
+# counts the same in the distance. A k-nearest query costs O(log n), so its
+# latency stays flat as climbers are added. Once older than
+# REBUILD_SECONDS the index is rebuilt in a background thread; climbers who
+# joined meanwhile are looked up directly (climber_features) and can query
+# right away, they only show up as neighbors after the rebuild.
+import threading
+import time
+import numpy as np
+from scipy.spatial import cKDTree
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.models import Problem, UserClimbedProblem, UserResponse
+
+# Differences considered equivalent: 5 cm of height, 5 cm of span, 2 grade steps (e.g. 6b -> 6c)
+HEIGHT_SCALE = 5.0
+SPAN_SCALE = 5.0
+GRADE_SCALE = 2.0
+# Hardest ascents averaged into a climber's grade level
+MAX_GRADE_ASCENTS = 5
+REBUILD_SECONDS = 600
+
+class ClimberIndex:
+    """Climber ids, their raw features and a KD-tree over the scaled features"""
+
+    def __init__(self, user_ids, features):
+        """
+        Args:
+            user_ids: Sequence of user_responses ids
+            features: (n, 3) array of height, arm span and grade level, aligned with user_ids
+        """
+        self.user_ids = np.asarray(user_ids, dtype=np.int64)
+        self.features = np.asarray(features, dtype=np.float64).reshape(-1, 3)
+        self.position = {int(user_id): i for i, user_id in enumerate(self.user_ids)}
+        self.scale = np.array([HEIGHT_SCALE, SPAN_SCALE, GRADE_SCALE])
+        self.tree = cKDTree(self.features / self.scale) if len(self.user_ids) else None
+        self.built_at = time.monotonic()
+
+    def __len__(self):
+        return len(self.user_ids)
+
+    def features_of(self, user_id: int) -> np.ndarray | None:
+        i = self.position.get(user_id)
+        return None if i is None else self.features[i]
+
+    def nearest(self, height: float, arm_span: float, grade_level: float, k: int, exclude: int | None = None):
+        """
+        The k climbers closest to a profile.
+
+        Returns:
+            List of (user_id, distance), closest first, distance in scale units
+        """
+        if self.tree is None:
+            return []
+        n = min(k + (exclude is not None), len(self))
+        distances, positions = self.tree.query(np.array([height, arm_span, grade_level]) / self.scale, k=n)
+        neighbors = [
+            (int(self.user_ids[i]), float(d))
+            for d, i in zip(np.atleast_1d(distances), np.atleast_1d(positions))
+            if int(self.user_ids[i]) != exclude
+        ]
+        return neighbors[:k]
+
+def grade_levels(db: Session) -> dict[int, float]:
+    """Grade level of every climber with graded ascents, from one ordered query."""
+    rows = (
+        db.query(UserClimbedProblem.user_response_id, Problem.grade_order)
+        .join(Problem, Problem.id == UserClimbedProblem.problem_id)
+        .filter(Problem.grade_order > 0)
+        .order_by(UserClimbedProblem.user_response_id, Problem.grade_order.desc())
+    )
+    levels = {}
+    user_id, hardest = None, []
+    for row_user_id, grade_order in rows.yield_per(10000):
+        if row_user_id != user_id:
+            if hardest:
+                levels[user_id] = sum(hardest) / len(hardest)
+            user_id, hardest = row_user_id, []
+        if len(hardest) < MAX_GRADE_ASCENTS:
+            hardest.append(grade_order)
+    if hardest:
+        levels[user_id] = sum(hardest) / len(hardest)
+    return levels
+
+def climber_features(db: Session, user_id: int) -> tuple[float, float, float] | None:
+    """
+    Height, arm span and grade level of one climber, from one query, for
+    climbers not indexed yet. None if one of them is unknown.
+    """
+    rows = (
+        db.query(UserResponse.height, UserResponse.arm_span, Problem.grade_order)
+        .join(UserClimbedProblem, UserClimbedProblem.user_response_id == UserResponse.id)
+        .join(Problem, Problem.id == UserClimbedProblem.problem_id)
+        .filter(UserResponse.id == user_id, Problem.grade_order > 0)
+        .order_by(Problem.grade_order.desc())
+        .limit(MAX_GRADE_ASCENTS)
+        .all()
+    )
+    if not rows or rows[0][0] is None or rows[0][1] is None:
+        return None
+    hardest = [grade_order for _, _, grade_order in rows]
+    return rows[0][0], rows[0][1], sum(hardest) / len(hardest)
+
+def build_climber_index(db: Session) -> ClimberIndex:
+    """Index every climber with a height, an arm span and a grade level."""
+    levels = grade_levels(db)
+    climbers = [
+        (user_id, height, arm_span, levels[user_id])
+        for user_id, height, arm_span in db.query(UserResponse.id, UserResponse.height, UserResponse.arm_span).filter(
+            UserResponse.height.isnot(None), UserResponse.arm_span.isnot(None)
+        )
+        if user_id in levels
+    ]
+    return ClimberIndex([c[0] for c in climbers], [c[1:] for c in climbers])
+
+# Process-wide index, rebuilt in the background once stale while requests keep using it
+_index: ClimberIndex | None = None
+_build_lock = threading.Lock()
+
+def load_climber_index(db: Session | None = None) -> ClimberIndex:
+    """(Re)build the index from the database."""
+    global _index
+    own_session = db is None
+    db = db or SessionLocal()
+    try:
+        t0 = time.perf_counter()
+        index = build_climber_index(db)
+        print(f"✅ Climber index built: {len(index)} climbers in {time.perf_counter() - t0:.2f}s")
+    finally:
+        if own_session:
+            db.close()
+    _index = index
+    return index
+
+def _rebuild_in_background() -> None:
+    # _build_lock is held by the caller and released here
+    try:
+        load_climber_index()
+    except Exception as e:
+        print(f"❌ Error rebuilding the climber index: {e}")
+    finally:
+        _build_lock.release()
+
+def get_climber_index() -> ClimberIndex:
+    """Return the index, building it on first use; a stale one is returned while a thread rebuilds it."""
+    if _index is None:
+        with _build_lock:
+            if _index is None:
+                load_climber_index()
+    elif time.monotonic() - _index.built_at > REBUILD_SECONDS and _build_lock.acquire(blocking=False):
+        threading.Thread(target=_rebuild_in_background, name="climber-index", daemon=True).start()
+    return _index
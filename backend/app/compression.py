@@ -0,0 +1,304 @@
+# Response compression (brotli or gzip) with a cache of precompressed catalog responses
+#
+# Catalog responses only change when the dataset does, so a 200 from one of
+# CACHEABLE_ROUTES is stored with its ETag and compressed bodies, keyed by
+# path, normalized query string and catalog dataset version. Later requests
+# for the same URL are answered from memory without running the endpoint;
+# If-None-Match gets a 304. Entries also expire after CACHE_TTL_SECONDS, so
+# catalog changes made without a version bump (build_sqlite_catalog or
+# compute_stats reruns) are picked up without a restart. Identical requests arriving while the first one is
+# still running wait for it instead of querying the database themselves
+# (single flight). Any other response over MINIMUM_SIZE is compressed on the fly.
+import asyncio
+import gzip
+import hashlib
+import os
+import re
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qsl, urlencode
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from app.catalog_db import catalog_version, catalog_version_expired, refresh_catalog_version
+from app.metrics import record_cache_event, REQUEST_COALESCING, router_label
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+# Smaller bodies are not worth the extra header and CPU
+MINIMUM_SIZE = 1024
+# Total size of the cached bodies, all encodings included
+CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MB", "64")) * 1024 * 1024
+# Lifetime of a cached response, whatever the dataset version
+CACHE_TTL_SECONDS = int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "300"))
+
+# Responses that depend only on the catalog dataset and the URL (unless LIVE_QUERY_PARAMS)
+CACHEABLE_ROUTES = {
+    "/api/problems",
+    "/api/problems/{problem_id}/similar",
+    "/api/problems/{problem_id}/circuits",
+    "/api/problems/filter",
+    "/api/sectors",
+    "/api/sectors/{sector_slug}/problems",
+    "/api/circuits",
+    "/api/circuits/{circuit_id}/problems",
+    "/api/questionnaire/available-tags",
+    "/api/questionnaire/search-problems",
+}
+
+# Query parameters making a response depend on live data (ascent counters), never cached
+LIVE_QUERY_PARAMS = {("order_by", "ascents")}
+
+_CACHEABLE_PATTERNS = [
+    re.compile("^" + re.sub(r"\{\w+\}", "[^/]+", template) + "$") for template in CACHEABLE_ROUTES
+]
+
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+
+def is_cacheable_path(path: str) -> bool:
+    """Whether a path is served by one of CACHEABLE_ROUTES (known before routing)."""
+    return any(pattern.match(path) for pattern in _CACHEABLE_PATTERNS)
+
+def is_live_query(query_string: bytes) -> bool:
+    """Whether a query string selects a response that changes without the dataset (LIVE_QUERY_PARAMS)."""
+    return bool(query_string) and any(
+        pair in LIVE_QUERY_PARAMS for pair in parse_qsl(query_string.decode("latin-1"))
+    )
+
+def normalize_query(query_string: bytes) -> str:
+    """
+    Query string with parameters sorted by name, so that ?a=1&b=2 and ?b=2&a=1
+    share a cache entry. Repeated parameters keep their relative order.
+    """
+    pairs = parse_qsl(query_string.decode("latin-1"), keep_blank_values=True)
+    return urlencode(sorted(pairs, key=lambda pair: pair[0]))
+
+def negotiate(accept_encoding: str) -> str:
+    """Pick 'br', 'gzip' or 'identity' from an Accept-Encoding header (q=0 excludes)."""
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(coding.strip())
+    if brotli is not None and ("br" in accepted or "*" in accepted):
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return "identity"
+
+def compress(body: bytes, encoding: str, best: bool = False) -> bytes:
+    """
+    Compress a body; best=True trades CPU for size, for bodies compressed once
+    and cached. Brotli stops at quality 9: 11 is ~10% smaller on /api/sectors
+    but 8x slower, a cost the first request of every cached URL would pay.
+    """
+    if encoding == "br":
+        return brotli.compress(body, quality=9 if best else 4)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=9 if best else 6, mtime=0)
+    return body
+
+class CachedResponse:
+    """A cacheable 200 response and its bodies per encoding"""
+
+    def __init__(self, body: bytes, content_type: bytes):
+        self.content_type = content_type
+        self.etag = f'"{hashlib.sha1(body).hexdigest()[:20]}"'.encode()
+        self.bodies = {"identity": body}
+        self.created_at = time.monotonic()
+
+    @property
+    def size(self) -> int:
+        # An encoding that did not shrink the body shares the identity bytes
+        return sum(len(b) for b in {id(b): b for b in self.bodies.values()}.values())
+
+class CompressionMiddleware:
+    """ASGI middleware negotiating brotli/gzip and serving cached catalog responses."""
+
+    def __init__(self, app, minimum_size: int = MINIMUM_SIZE, cache_max_bytes: int = CACHE_MAX_BYTES,
+                 cache_ttl: float = CACHE_TTL_SECONDS):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.cache_max_bytes = cache_max_bytes
+        self.cache_ttl = cache_ttl
+        self.cache: OrderedDict[tuple, CachedResponse] = OrderedDict()
+        self.cache_bytes = 0
+        self.cache_dataset_version = None
+        # Requests being computed, by cache key: identical requests await the same future
+        self.in_flight: dict[tuple, asyncio.Future] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = Headers(scope=scope)
+        encoding = negotiate(request_headers.get("accept-encoding", ""))
+
+        if (scope["method"] != "GET" or not is_cacheable_path(scope["path"])
+                or is_live_query(scope.get("query_string", b""))):
+            await self.app(scope, receive, CompressingSender(self, send, encoding, None, request_headers))
+            return
+
+        version = await self.dataset_version()
+        key = (scope["path"], normalize_query(scope.get("query_string", b"")), version)
+        router = router_label(scope["path"])
+
+        entry = self.lookup(key)
+        if entry is not None:
+            self.cache.move_to_end(key)
+            record_cache_event("responses", "hits")
+            await self.send_cached(entry, encoding, request_headers, send)
+            return
+
+        leader = self.in_flight.get(key)
+        if leader is not None:
+            # shield: a waiter disconnecting must not cancel the shared computation
+            entry = await asyncio.shield(leader)
+            if entry is not None:
+                REQUEST_COALESCING.labels(router, "coalesced").inc()
+                await self.send_cached(entry, encoding, request_headers, send)
+                return
+            # The first request did not produce a cacheable 200 (error, 404...): run our own,
+            # without registering, so that waiters never replace each other's futures
+            sender = CompressingSender(self, send, encoding, key, request_headers)
+            await self.app(scope, receive, sender)
+            REQUEST_COALESCING.labels(router, "executed").inc()
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self.in_flight[key] = future
+        sender = CompressingSender(self, send, encoding, key, request_headers)
+        try:
+            await self.app(scope, receive, sender)
+        finally:
+            # Wake the waiters first, whatever happens to the bookkeeping below
+            future.set_result(sender.entry)
+            if self.in_flight.get(key) is future:
+                del self.in_flight[key]
+            REQUEST_COALESCING.labels(router, "executed").inc()
+
+    async def dataset_version(self):
+        """Catalog dataset version; the cache is dropped when it changes."""
+        version = await run_in_threadpool(refresh_catalog_version) if catalog_version_expired() else catalog_version()
+        if version != self.cache_dataset_version:
+            self.cache.clear()
+            self.cache_bytes = 0
+            self.cache_dataset_version = version
+        return version
+
+    async def body_for(self, entry: CachedResponse, encoding: str) -> bytes:
+        """The entry's body in an encoding, compressed (at best quality) on first use."""
+        body = entry.bodies.get(encoding)
+        if body is None:
+            body = await run_in_threadpool(compress, entry.bodies["identity"], encoding, True)
+            # Keep the compressed copy only if it actually saves bytes
+            if len(body) >= len(entry.bodies["identity"]):
+                body = entry.bodies["identity"]
+            else:
+                self.cache_bytes += len(body)
+            entry.bodies[encoding] = body
+        return body
+
+    def lookup(self, key) -> CachedResponse | None:
+        """The cached entry for a key, None if missing or expired (and then evicted)."""
+        entry = self.cache.get(key)
+        if entry is not None and time.monotonic() - entry.created_at > self.cache_ttl:
+            del self.cache[key]
+            self.cache_bytes -= entry.size
+            return None
+        return entry
+
+    def store(self, key, entry: CachedResponse) -> None:
+        # Without a recorded dataset version there is nothing to invalidate on: only coalesce
+        if key[2] is None or entry.size > self.cache_max_bytes // 4:
+            return
+        self.cache[key] = entry
+        self.cache_bytes += entry.size
+        while self.cache_bytes > self.cache_max_bytes and self.cache:
+            _, evicted = self.cache.popitem(last=False)
+            self.cache_bytes -= evicted.size
+
+    async def send_cached(self, entry: CachedResponse, encoding: str, request_headers: Headers, send) -> None:
+        if entry.etag in request_headers.get("if-none-match", "").encode():
+            await send({"type": "http.response.start", "status": 304, "headers": [
+                (b"etag", entry.etag), (b"vary", b"Accept-Encoding"),
+            ]})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        body = entry.bodies["identity"]
+        if encoding != "identity" and len(body) >= self.minimum_size:
+            body = await self.body_for(entry, encoding)
+        headers = [
+            (b"content-type", entry.content_type),
+            (b"content-length", str(len(body)).encode()),
+            (b"etag", entry.etag),
+            (b"vary", b"Accept-Encoding"),
+        ]
+        if body is not entry.bodies["identity"]:
+            headers.append((b"content-encoding", encoding.encode()))
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+class CompressingSender:
+    """
+    Wraps `send` for a request that missed the cache. The response start is
+    held back until the body is known, so headers can be rewritten; streamed
+    responses (several body messages) pass through unchanged.
+
+    With a cache key, a 200 JSON response becomes `entry`, which is stored
+    and handed to the requests that waited on this one.
+    """
+
+    def __init__(self, middleware: CompressionMiddleware, send, encoding, key, request_headers):
+        self.middleware = middleware
+        self.send = send
+        self.encoding = encoding
+        self.key = key
+        self.request_headers = request_headers
+        self.start = None
+        self.streaming = False
+        self.entry = None
+
+    async def __call__(self, message):
+        if message["type"] == "http.response.start":
+            self.start = message
+            return
+        if message["type"] != "http.response.body" or self.streaming:
+            await self.send(message)
+            return
+        if message.get("more_body", False):
+            self.streaming = True
+            await self.send(self.start)
+            await self.send(message)
+            return
+
+        headers = MutableHeaders(raw=self.start["headers"])
+        body = message.get("body", b"")
+        content_type = headers.get("content-type", "")
+        compressible = (
+            not headers.get("content-encoding")
+            and content_type.startswith(COMPRESSIBLE_TYPES)
+        )
+
+        if self.key is not None and self.start["status"] == 200 and compressible:
+            self.entry = CachedResponse(body, content_type.encode())
+            self.middleware.store(self.key, self.entry)
+            record_cache_event("responses", "misses")
+            # Headers set by the endpoint are dropped so that hits and misses look the same
+            await self.middleware.send_cached(self.entry, self.encoding, self.request_headers, self.send)
+            return
+
+        if compressible and self.encoding != "identity" and len(body) >= self.middleware.minimum_size:
+            compressed = compress(body, self.encoding)
+            if len(compressed) < len(body):
+                body = compressed
+                headers["content-encoding"] = self.encoding
+                headers["content-length"] = str(len(body))
+            headers.add_vary_header("Accept-Encoding")
+        await self.send(self.start)
+        await self.send({"type": "http.response.body", "body": body})
@@ -0,0 +1,188 @@
+# Implicit-feedback matrix factorization (ALS) and its memory-mapped artifacts
+import json
+import os
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import numpy as np
+import scipy.sparse as sp
+
+MODEL_DIR = Path(os.getenv("MODEL_DIR", Path(__file__).parent.parent / "data" / "models"))
+ALS_DIR = MODEL_DIR / "als"
+LATEST_FILE = "LATEST"
+
+def _solve_rows(Y, YtY, R, rows, regularization, alpha):
+    """
+    Exact ALS least-squares solves for a block of rows of R.
+
+    With binary preferences and confidence c = 1 + alpha for observed entries,
+    each row solves (YtY + alpha * Yi^T Yi + reg * I) x = (1 + alpha) * sum(Yi).
+    """
+    n_factors = Y.shape[1]
+    reg = regularization * np.eye(n_factors, dtype=np.float32)
+    out = np.zeros((len(rows), n_factors), dtype=np.float32)
+    for k, u in enumerate(rows):
+        items = R.indices[R.indptr[u]:R.indptr[u + 1]]
+        if len(items) == 0:
+            continue
+        Yi = Y[items]
+        A = YtY + alpha * (Yi.T @ Yi) + reg
+        b = (1.0 + alpha) * Yi.sum(axis=0)
+        out[k] = np.linalg.solve(A, b)
+    return rows, out
+
+def _als_step(R, Y, regularization, alpha, pool, n_blocks):
+    """Recompute the factors of every row of R, holding Y fixed."""
+    YtY = Y.T @ Y
+    X = np.zeros((R.shape[0], Y.shape[1]), dtype=np.float32)
+    blocks = np.array_split(np.arange(R.shape[0]), n_blocks)
+    futures = [pool.submit(_solve_rows, Y, YtY, R, rows, regularization, alpha) for rows in blocks if len(rows)]
+    for future in futures:
+        rows, out = future.result()
+        X[rows] = out
+    return X
+
+def train_als(R, factors=64, regularization=0.1, alpha=20.0, iterations=15, n_jobs=None, seed=42):
+    """
+    Fit an implicit-feedback ALS model (Hu, Koren & Volinsky 2008).
+
+    The per-row solves are independent, so each half-step is split across a
+    thread pool; NumPy's BLAS and LAPACK calls release the GIL.
+
+    Args:
+        R: Binary user x problem csr_matrix
+        factors: Latent dimension
+        regularization: L2 penalty
+        alpha: Confidence weight of observed ascents
+        iterations: Number of alternating sweeps
+        n_jobs: Threads (default: all cores)
+
+    Returns:
+        (user_factors, item_factors) float32 arrays
+    """
+    R = sp.csr_matrix(R, dtype=np.float32)
+    Rt = R.T.tocsr()
+    rng = np.random.default_rng(seed)
+    user_factors = (rng.standard_normal((R.shape[0], factors)) * 0.01).astype(np.float32)
+    item_factors = (rng.standard_normal((R.shape[1], factors)) * 0.01).astype(np.float32)
+
+    n_jobs = n_jobs or os.cpu_count() or 1
+    with ThreadPoolExecutor(max_workers=n_jobs) as pool:
+        for _ in range(iterations):
+            user_factors = _als_step(R, item_factors, regularization, alpha, pool, n_jobs * 4)
+            item_factors = _als_step(Rt, user_factors, regularization, alpha, pool, n_jobs * 4)
+    return user_factors, item_factors
+
+def save_model(version, user_factors, item_factors, user_ids, problem_ids, params):
+    """
+    Write a versioned artifact directory and point LATEST at it.
+
+    The directory is written under a temporary name and renamed, so workers
+    never map a half-written model. If a model with the same version exists
+    (e.g. two runs in the same second), the version gets a -2, -3... suffix.
+    """
+    ALS_DIR.mkdir(parents=True, exist_ok=True)
+    # Unique per run, so concurrent trainings never write into each other's directory
+    tmp = Path(tempfile.mkdtemp(prefix=f".{version}.", suffix=".tmp", dir=ALS_DIR))
+    # mkdtemp creates it 0700 and the rename keeps the mode: workers running as another user must read it
+    os.chmod(tmp, 0o755)
+
+    np.save(tmp / "user_factors.npy", np.ascontiguousarray(user_factors, dtype=np.float32))
+    np.save(tmp / "item_factors.npy", np.ascontiguousarray(item_factors, dtype=np.float32))
+    base_version, attempt = version, 1
+    while True:
+        if attempt > 1:
+            version = f"{base_version}-{attempt}"
+        target = ALS_DIR / version
+        attempt += 1
+        if target.exists():
+            continue
+        with open(tmp / "meta.json", "w") as f:
+            json.dump({
+                "version": version,
+                "params": params,
+                "user_ids": list(user_ids),
+                "problem_ids": list(problem_ids),
+            }, f)
+        try:
+            tmp.rename(target)
+            break
+        except OSError:
+            # Another run took this version between the check and the rename
+            if not target.exists():
+                shutil.rmtree(tmp)
+                raise
+
+    latest_tmp = ALS_DIR / f".{LATEST_FILE}.tmp"
+    latest_tmp.write_text(version)
+    latest_tmp.replace(ALS_DIR / LATEST_FILE)
+    return target
+
+class FactorModel:
+    """Read-only, memory-mapped ALS factors shared by all workers on a host"""
+
+    def __init__(self, path: Path):
+        with open(path / "meta.json", "r") as f:
+            meta = json.load(f)
+        self.version = meta["version"]
+        self.params = meta["params"]
+        self.user_ids = meta["user_ids"]
+        self.problem_ids = meta["problem_ids"]
+        self.user_pos = {u: i for i, u in enumerate(self.user_ids)}
+        self.problem_pos = {p: j for j, p in enumerate(self.problem_ids)}
+        # mmap_mode='r' maps the files read-only: pages live in the OS cache once per host
+        self.user_factors = np.load(path / "user_factors.npy", mmap_mode="r")
+        self.item_factors = np.load(path / "item_factors.npy", mmap_mode="r")
+        self.YtY = np.asarray(self.item_factors.T @ self.item_factors)
+
+    def fold_in(self, climbed_ids):
+        """Solve a user vector from their climbed problems, for users not seen at training time."""
+        items = [self.problem_pos[p] for p in climbed_ids if p in self.problem_pos]
+        if not items:
+            return None
+        Y = self.item_factors
+        alpha = self.params["alpha"]
+        Yi = np.asarray(Y[items])
+        A = self.YtY + alpha * (Yi.T @ Yi) + self.params["regularization"] * np.eye(Y.shape[1], dtype=np.float32)
+        b = (1.0 + alpha) * Yi.sum(axis=0)
+        return np.linalg.solve(A, b).astype(np.float32)
+
+    def user_vector(self, user_id, climbed_ids):
+        """Trained factors for known users, folded-in factors otherwise."""
+        if user_id is not None and user_id in self.user_pos:
+            return self.user_factors[self.user_pos[user_id]]
+        return self.fold_in(climbed_ids)
+
+    def score(self, user_vector):
+        """Scores of every problem: a single matrix-vector product."""
+        return self.item_factors @ user_vector
+
+    def top_candidates(self, user_vector, exclude_ids, n):
+        """Top-n (problem_id, score) pairs, excluding already climbed problems."""
+        scores = np.array(self.score(user_vector), copy=True)
+        excluded = [self.problem_pos[p] for p in exclude_ids if p in self.problem_pos]
+        scores[excluded] = -np.inf
+        n = min(n, len(scores))
+        if n <= 0:
+            return []
+        top = np.argpartition(-scores, n - 1)[:n]
+        top = top[np.argsort(-scores[top])]
+        return [(self.problem_ids[j], float(scores[j])) for j in top if np.isfinite(scores[j])]
+
+# Process-wide model, mapped once at startup
+_model: FactorModel | None = None
+
+def load_factor_model() -> FactorModel | None:
+    """Map the latest trained model, if any. Called from the app lifespan."""
+    global _model
+    latest = ALS_DIR / LATEST_FILE
+    if not latest.exists():
+        _model = None
+        return None
+    _model = FactorModel(ALS_DIR / latest.read_text().strip())
+    return _model
+
+def get_factor_model() -> FactorModel | None:
+    """Return the mapped model, or None if no model has been trained."""
+    return _model
@@ -0,0 +1,145 @@
+# Per-request timing: wall time, DB time and SQL statement count
+import json
+import logging
+import os
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app import metrics
+
+logger = logging.getLogger("dreamclimb.requests")
+
+# Requests slower than this are logged with their timings
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "500"))
+# Level of the app's own loggers (dreamclimb.*)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+
+def configure_logging() -> None:
+    """
+    Send the dreamclimb.* loggers (slow requests, questionnaire events) to
+    stderr, one message per line, whatever the server configures for the
+    root logger. Safe to call more than once.
+    """
+    app_logger = logging.getLogger("dreamclimb")
+    app_logger.setLevel(LOG_LEVEL)
+    if not app_logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        app_logger.addHandler(handler)
+    # Our handler already writes them: no second copy through the root logger
+    app_logger.propagate = False
+
+@dataclass
+class RequestStats:
+    """Timings accumulated while serving one request"""
+    started: float = field(default_factory=time.perf_counter)
+    db_seconds: float = 0.0
+    statements: int = 0
+
+    @property
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+# Shared with the threadpool running sync endpoints: the context is copied, the object is not
+_current: ContextVar[RequestStats | None] = ContextVar("request_stats", default=None)
+
+def current_stats() -> RequestStats | None:
+    return _current.get()
+
+def install_sql_listeners(engine: Engine) -> None:
+    """Attribute every SQL statement's execution time to the current request."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+        context._query_pending = True
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_start"].pop()
+        context._query_pending = False
+        stats = _current.get()
+        if stats is not None:
+            stats.db_seconds += time.perf_counter() - started
+            stats.statements += 1
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        # A failed statement never reaches after_cursor_execute: drop its start time
+        # so it does not stay on the pooled connection and skew later timings
+        context = exception_context.execution_context
+        if context is not None and getattr(context, "_query_pending", False):
+            context._query_pending = False
+            exception_context.connection.info["query_start"].pop()
+
+def route_template(scope) -> str:
+    """Matched route path (e.g. /api/problems/{problem_id}/similar), or the raw path."""
+    path = scope.get("path", "")
+    template = getattr(scope.get("route"), "path", None)
+    if not template:
+        return path
+    # Routes of an included router may carry their path without the "/api" prefix
+    depth = template.count("/")
+    prefix = path.rsplit("/", depth)[0] if path.count("/") > depth else ""
+    return prefix + template
+
+class TimingMiddleware:
+    """
+    ASGI middleware adding a Server-Timing header, feeding the Prometheus
+    request metrics and logging slow requests.
+
+    Server-Timing: app;dur=<wall ms>, db;dur=<db ms>;desc="<n> queries"
+    """
+
+    def __init__(self, app, slow_request_ms: float = SLOW_REQUEST_MS):
+        self.app = app
+        self.slow_request_ms = slow_request_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        status_code = 500
+        elapsed_ms = None
+        response_size = 0
+
+        async def send_with_timing(message):
+            nonlocal status_code, elapsed_ms, response_size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                timing = (
+                    f'app;dur={stats.elapsed_ms:.1f}, '
+                    f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.statements} queries"'
+                )
+                message.setdefault("headers", []).append((b"server-timing", timing.encode("latin-1")))
+            elif message["type"] == "http.response.body":
+                response_size += len(message.get("body", b""))
+                if not message.get("more_body", False):
+                    # Background tasks run after this point and are not part of the request latency
+                    elapsed_ms = stats.elapsed_ms
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            if elapsed_ms is None:
+                elapsed_ms = stats.elapsed_ms
+            route = route_template(scope)
+            metrics.observe_request(route, scope.get("method", ""), status_code, elapsed_ms / 1000, response_size)
+            if elapsed_ms >= self.slow_request_ms:
+                logger.warning(json.dumps({
+                    "event": "slow_request",
+                    "method": scope.get("method"),
+                    "route": route,
+                    "query": scope.get("query_string", b"").decode("latin-1"),
+                    "status": status_code,
+                    "duration_ms": round(elapsed_ms, 1),
+                    "db_ms": round(stats.db_seconds * 1000, 1),
+                    "statements": stats.statements,
+                }))
@@ -0,0 +1,144 @@
+# Item-item collaborative filtering on the sparse user x problem matrix
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import scipy.sparse as sp
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.models import UserClimbedProblem, ProblemNeighbor, Problem
+
+NEIGHBORS_VERSION_KEY = "item_neighbors_version"
+
+# Worker-global interaction matrix, set once per process by _init_worker
+_X = None
+
+def build_interaction_matrix(db: Session, all_problems: bool = False):
+    """
+    Build the binary user x problem matrix from user_climbed_problems.
+
+    Args:
+        db: Database session
+        all_problems: If True, one column per catalog problem, including
+            problems nobody has logged yet
+
+    Returns:
+        (csr_matrix, user_ids, problem_ids) where row i is user_ids[i]
+        and column j is problem_ids[j]
+    """
+    rows = db.query(UserClimbedProblem.user_response_id, UserClimbedProblem.problem_id).distinct().all()
+    user_ids = sorted({u for u, _ in rows})
+    if all_problems:
+        problem_ids = sorted(p for (p,) in db.query(Problem.id))
+    else:
+        problem_ids = sorted({p for _, p in rows})
+    user_pos = {u: i for i, u in enumerate(user_ids)}
+    problem_pos = {p: j for j, p in enumerate(problem_ids)}
+
+    row_idx = np.fromiter((user_pos[u] for u, _ in rows), dtype=np.int32, count=len(rows))
+    col_idx = np.fromiter((problem_pos[p] for _, p in rows), dtype=np.int32, count=len(rows))
+    data = np.ones(len(rows), dtype=np.float32)
+    X = sp.csr_matrix((data, (row_idx, col_idx)), shape=(len(user_ids), len(problem_ids)))
+    return X, user_ids, problem_ids
+
+def _init_worker(X):
+    global _X
+    _X = X
+
+def _top_k_chunk(args):
+    """Similarities for a block of item columns, reduced to their top-k neighbors."""
+    start, stop, k, metric, shrinkage, min_support = args
+    X = _X
+    support = np.asarray(X.sum(axis=0)).ravel()
+
+    # Co-occurrence counts of items [start, stop) with every item
+    co = (X[:, start:stop].T @ X).tocsr()
+
+    sources, targets, scores = [], [], []
+    for local_i in range(co.shape[0]):
+        i = start + local_i
+        lo, hi = co.indptr[local_i], co.indptr[local_i + 1]
+        if hi == lo or support[i] < min_support:
+            continue
+        j = co.indices[lo:hi]
+        c = co.data[lo:hi]
+        keep = (j != i) & (c >= min_support) & (support[j] >= min_support)
+        j, c = j[keep], c[keep]
+        if len(j) == 0:
+            continue
+
+        if metric == "jaccard":
+            sim = c / (support[i] + support[j] - c)
+        else:
+            sim = c / np.sqrt(support[i] * support[j])
+        # Shrink similarities backed by few co-occurrences towards zero
+        sim = sim * (c / (c + shrinkage))
+
+        if len(sim) > k:
+            top = np.argpartition(-sim, k)[:k]
+            j, sim = j[top], sim[top]
+        sources.append(np.full(len(j), i, dtype=np.int32))
+        targets.append(j.astype(np.int32))
+        scores.append(sim.astype(np.float32))
+
+    if not sources:
+        empty = np.empty(0, dtype=np.int32)
+        return empty, empty, np.empty(0, dtype=np.float32)
+    return np.concatenate(sources), np.concatenate(targets), np.concatenate(scores)
+
+def compute_item_neighbors(X, k=50, metric="cosine", shrinkage=10.0, min_support=1,
+                           n_jobs=None, chunk_size=2000):
+    """
+    Compute top-k item-item similarities, parallelised over column blocks.
+
+    Args:
+        X: Binary user x item csr_matrix
+        k: Number of neighbors kept per item
+        metric: 'cosine' or 'jaccard'
+        shrinkage: Shrinkage constant, similarities are scaled by c / (c + shrinkage)
+        min_support: Minimum number of users for an item or a co-occurrence
+        n_jobs: Worker processes (default: all cores)
+        chunk_size: Items per work unit
+
+    Returns:
+        (source_idx, target_idx, scores) arrays of column indices into X
+    """
+    X = sp.csc_matrix(X, dtype=np.float32)
+    n_items = X.shape[1]
+    tasks = [
+        (start, min(start + chunk_size, n_items), k, metric, shrinkage, min_support)
+        for start in range(0, n_items, chunk_size)
+    ]
+    n_jobs = n_jobs or os.cpu_count() or 1
+
+    if n_jobs == 1 or len(tasks) == 1:
+        _init_worker(X)
+        parts = [_top_k_chunk(t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=(X,)) as pool:
+            parts = list(pool.map(_top_k_chunk, tasks))
+
+    return (
+        np.concatenate([p[0] for p in parts]),
+        np.concatenate([p[1] for p in parts]),
+        np.concatenate([p[2] for p in parts]),
+    )
+
+def score_climbed_set(db: Session, climbed_ids):
+    """
+    Aggregated neighbor scores for a set of climbed problems.
+
+    Returns:
+        Subquery with columns (problem_id, score), excluding problems already climbed
+    """
+    return (
+        db.query(
+            ProblemNeighbor.neighbor_id.label("problem_id"),
+            func.sum(ProblemNeighbor.score).label("score"),
+        )
+        .filter(
+            ProblemNeighbor.problem_id.in_(climbed_ids),
+            ProblemNeighbor.neighbor_id.notin_(climbed_ids),
+        )
+        .group_by(ProblemNeighbor.neighbor_id)
+        .subquery()
+    )
@@ -0,0 +1,217 @@
+# Logbook uploads: CSV or NDJSON rows (name, grade, sector, date) matched against the catalog
+#
+# The body is read as a stream and matched in batches of MATCH_BATCH_SIZE
+# rows with app.matching, so a large upload is never held in memory as a
+# whole. Matches are written to user_climbed_problems with one INSERT
+# (executemany) for the new problems and one bulk UPDATE for earlier dates.
+import codecs
+import csv
+import json
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+from app.ascent_counts import adjust_ascent_counts
+from app.matching import ProblemIndex
+from app.models import UserClimbedProblem
+
+CSV_TYPES = ("text/csv", "application/csv")
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl", "application/x-jsonlines")
+
+# Column names accepted for each field, French included
+FIELD_ALIASES = {
+    "name": "name", "problem": "name", "nom": "name", "bloc": "name",
+    "grade": "grade", "cotation": "grade",
+    "sector": "sector", "secteur": "sector", "area": "sector",
+    "date": "date",
+}
+DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%d/%m/%y", "%Y/%m/%d", "%d.%m.%Y")
+
+# Rows resolved together: same-named problems are told apart by the sectors of their batch
+MATCH_BATCH_SIZE = 500
+MAX_ROWS = 20000
+# Unmatched and invalid rows listed in the report (all of them are counted)
+MAX_REPORTED_ROWS = 200
+INSERT_BATCH_SIZE = 5000
+
+class LogbookError(ValueError):
+    """The upload cannot be read at all (e.g. CSV without a name column)."""
+
+@dataclass
+class LogbookRow:
+    line: int
+    name: str
+    grade: str | None
+    sector: str | None
+    date: datetime | None
+
+def logbook_format(content_type: str | None) -> str | None:
+    """'csv' or 'ndjson' from a Content-Type header, None if unsupported."""
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    if media_type in CSV_TYPES:
+        return "csv"
+    if media_type in NDJSON_TYPES:
+        return "ndjson"
+    return None
+
+def parse_date(raw) -> datetime | None:
+    """Parse an ascent date (ISO first, then day-first formats); None if missing or unreadable."""
+    raw = str(raw or "").strip()
+    if not raw:
+        return None
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(raw[:10] if date_format == "%Y-%m-%d" else raw, date_format)
+        except ValueError:
+            continue
+    return None
+
+async def iter_lines(chunks):
+    """Decode an async stream of byte chunks into lines (UTF-8, BOM and CRLF tolerated)."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+class LogbookParser:
+    """
+    Turn the lines of an upload into LogbookRows.
+
+    CSV uploads start with a header row naming the columns (comma or
+    semicolon separated); NDJSON uploads have one object per line.
+    Rows that cannot be read are collected in `invalid` instead of
+    failing the whole upload.
+    """
+
+    def __init__(self, fmt: str):
+        self.fmt = fmt
+        self.line = 0
+        self.columns = None
+        self.delimiter = ","
+        self.invalid = []
+
+    def parse(self, text: str) -> LogbookRow | None:
+        self.line += 1
+        if not text.strip():
+            return None
+        if self.fmt == "ndjson":
+            try:
+                fields = json.loads(text)
+            except json.JSONDecodeError:
+                return self._invalid("invalid JSON")
+            if not isinstance(fields, dict):
+                return self._invalid("not a JSON object")
+            fields = {FIELD_ALIASES.get(str(key).strip().lower()): value for key, value in fields.items()}
+        else:
+            if self.columns is None:
+                self._read_header(text)
+                return None
+            values = next(csv.reader([text], delimiter=self.delimiter))
+            fields = dict(zip(self.columns, values))
+
+        name = str(fields.get("name") or "").strip()
+        if not name:
+            return self._invalid("missing name")
+        grade, sector = fields.get("grade"), fields.get("sector")
+        return LogbookRow(
+            line=self.line,
+            name=name,
+            grade=str(grade).strip() if grade else None,
+            sector=str(sector).strip() if sector else None,
+            date=parse_date(fields.get("date")),
+        )
+
+    def _read_header(self, text: str) -> None:
+        if text.count(";") > text.count(","):
+            self.delimiter = ";"
+        header = next(csv.reader([text], delimiter=self.delimiter))
+        self.columns = [FIELD_ALIASES.get(column.strip().lower()) for column in header]
+        if "name" not in self.columns:
+            raise LogbookError(f"CSV header must include a name column, got: {', '.join(header)}")
+
+    def _invalid(self, reason: str) -> None:
+        self.invalid.append({"line": self.line, "reason": reason})
+        return None
+
+class LogbookImport:
+    """Match results of one upload, batch after batch."""
+
+    def __init__(self, index: ProblemIndex):
+        self.index = index
+        self.rows = 0
+        self.stats = Counter()
+        self.unmatched = []
+        # Earliest known date of each matched problem (None when undated)
+        self.first_ascents: dict[str, datetime | None] = {}
+
+    def add_batch(self, rows: list[LogbookRow]) -> None:
+        """Resolve a batch of rows, with their sector names as hints."""
+        results = self.index.resolve_batch(
+            [(row.name, row.grade) for row in rows],
+            [self.index.sector_id(row.sector) for row in rows],
+        )
+        self.rows += len(rows)
+        for row, result in zip(rows, results):
+            self.stats[result.method] += 1
+            if result.problem_id is None:
+                self.unmatched.append({
+                    "line": row.line, "name": row.name, "grade": row.grade,
+                    "sector": row.sector, "reason": result.method,
+                })
+                continue
+            known = self.first_ascents.get(result.problem_id)
+            if result.problem_id not in self.first_ascents or (row.date and (known is None or row.date < known)):
+                self.first_ascents[result.problem_id] = row.date
+
+    @property
+    def matched(self) -> int:
+        return sum(n for method, n in self.stats.items() if method not in ("unmatched", "ambiguous", "circuit"))
+
+def write_ascents(db: Session, user_id: int, first_ascents: dict[str, datetime | None]) -> dict:
+    """
+    Merge matched problems into a user's climbed problems and commit.
+
+    New problems are inserted with executemany statements, and counted in
+    Problem.ascent_count; problems already logged only get their
+    date_climbed moved earlier (or set when missing).
+
+    Returns:
+        Counts of inserted, already_logged and dates_updated problems
+    """
+    existing = {
+        problem_id: (row_id, date)
+        for row_id, problem_id, date in db.query(
+            UserClimbedProblem.id, UserClimbedProblem.problem_id, UserClimbedProblem.date_climbed
+        ).filter(UserClimbedProblem.user_response_id == user_id)
+    }
+    new_rows = [
+        {"user_response_id": user_id, "problem_id": problem_id, "date_climbed": date}
+        for problem_id, date in first_ascents.items()
+        if problem_id not in existing
+    ]
+    earlier_dates = [
+        {"id": existing[problem_id][0], "date_climbed": date}
+        for problem_id, date in first_ascents.items()
+        if problem_id in existing and date
+        and (existing[problem_id][1] is None or date < existing[problem_id][1])
+    ]
+
+    for start in range(0, len(new_rows), INSERT_BATCH_SIZE):
+        db.execute(insert(UserClimbedProblem), new_rows[start:start + INSERT_BATCH_SIZE])
+    adjust_ascent_counts(db, [row["problem_id"] for row in new_rows])
+    if earlier_dates:
+        # ORM bulk UPDATE by primary key: one executemany statement
+        db.execute(update(UserClimbedProblem), earlier_dates)
+    db.commit()
+    return {
+        "inserted": len(new_rows),
+        "already_logged": len(first_ascents) - len(new_rows),
+        "dates_updated": len(earlier_dates),
+    }
@@ -1,10 +1,32 @@
 ## Actual FastAPI app
 
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import sectors, problems, circuits, questionnaire
+from app.routers import sectors, problems, circuits, questionnaire, recommendations
+from app.factors import load_factor_model
+from app.database import engine
+from app.catalog_db import catalog_engine
+from app.instrumentation import TimingMiddleware, install_sql_listeners, configure_logging
+from app import metrics
+from app.profiling import ProfilingMiddleware, PROFILE_DIR
+from app import boot
+from app.compression import CompressionMiddleware
 
-app = FastAPI(title = "DreamClimb API", version = "0.1.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Map the trained factor model read-only, once per worker
+    load_factor_model()
+    # Version check, then dataset load (if needed) and catalog warm-up in the background
+    boot.boot()
+    yield
+    metrics.mark_worker_dead()
+
+app = FastAPI(title = "DreamClimb API", version = "0.1.0", lifespan=lifespan)
+
+# Brotli/gzip, with catalog responses cached precompressed per dataset version.
+# Added before CORS so that cached responses still get the CORS headers.
+app.add_middleware(CompressionMiddleware)
 
 # Allow frontend to connect
 app.add_middleware(
@@ -17,14 +39,41 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "ETag"],
 )
 
+# Per-request wall time, DB time and statement count (Server-Timing header, slow request logs)
+configure_logging()
+install_sql_listeners(engine)
+metrics.install_pool_listeners(engine)
+if catalog_engine is not engine:
+    install_sql_listeners(catalog_engine)
+app.add_middleware(TimingMiddleware)
+
+# Opt-in request profiling, not installed at all unless PROFILE_DIR is set
+if PROFILE_DIR:
+    app.add_middleware(ProfilingMiddleware)
+
+app.add_middleware(boot.FirstRequestMiddleware)
+
 app.include_router(problems.router, prefix="/api", tags=["problems"])
 app.include_router(sectors.router, prefix="/api", tags=["sectors"])
 app.include_router(circuits.router, prefix="/api", tags=["circuits"])
 app.include_router(questionnaire.router, prefix="/api", tags=["questionnaire"])
+app.include_router(recommendations.router, prefix="/api", tags=["recommendations"])
 
 # Test endpoint
 @app.get("/")
 def root():
-    return {"message": "Welcome to the DreamClimb API"}
\ No newline at end of file
+    return {"message": "Welcome to the DreamClimb API"}
+
+# Boot progress and time-to-first-request
+@app.get("/health")
+def health():
+    return boot.status
+
+# Prometheus scrape endpoint
+@app.get("/metrics", include_in_schema=False)
+def read_metrics():
+    body, content_type = metrics.render_latest()
+    return Response(content=body, media_type=content_type)
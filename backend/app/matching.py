@@ -0,0 +1,206 @@
+# Matching of free-text ascents (name + grade) against the problem catalog
+import re
+import threading
+import unicodedata
+from collections import defaultdict, Counter
+from dataclasses import dataclass
+
+# Grade -> grade_order, the one grade table (problems.grade_order, filters, matching)
+GRADE_ORDER = {
+    "1": 1, "1+": 2, "2-": 3, "2": 4, "2+": 5,
+    "3-": 6, "3": 7, "3+": 8, "4-": 9, "4": 10, "4+": 11,
+    "5-": 12, "5": 13, "5+": 14, "6a": 15, "6a+": 16, "6b": 17,
+    "6b+": 18, "6c": 19, "6c+": 20, "7a": 21, "7a+": 22, "7b": 23,
+    "7b+": 24, "7c": 25, "7c+": 26, "8a": 27, "8a+": 28, "8b": 29,
+    "8b+": 30, "8c": 31, "8c+": 32, "9a": 33
+}
+
+# Tolerated grade difference (in grade_order steps) for name-only matches
+MAX_GRADE_DRIFT = 2
+
+# Circuit entries in scraped logbooks look like "- [n°5 Noir TD-]"
+CIRCUIT_ENTRY_RE = re.compile(r"^\s*-?\s*\[n°")
+_PUNCTUATION_RE = re.compile(r"[^a-z0-9()'+ ]")
+
+def normalize_name(name: str) -> str:
+    """
+    Normalize a problem name for matching.
+
+    Strips accents, lowercases, unifies apostrophes and collapses punctuation
+    and whitespace. Variant suffixes such as "(assis)" or "(gauche)" are kept,
+    since on bleau.info they are distinct problems.
+
+    Args:
+        name: Raw problem name
+
+    Returns:
+        Normalized name
+    """
+    if not name:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", name)
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    lowered = stripped.lower().replace("’", "'").replace("`", "'")
+    cleaned = _PUNCTUATION_RE.sub(" ", lowered)
+    # "( assis )" -> "(assis)"
+    cleaned = cleaned.replace("( ", "(").replace(" )", ")")
+    return " ".join(cleaned.split())
+
+def normalize_grade(grade: str | None) -> str:
+    """Lowercase and strip a grade, e.g. ' 6A+ ' -> '6a+'."""
+    return (grade or "").strip().lower()
+
+@dataclass
+class MatchResult:
+    """Outcome of matching a single ascent"""
+    problem_id: str | None
+    method: str  # exact, sector_context, rating, name_only, ambiguous, circuit, unmatched
+
+class ProblemIndex:
+    """
+    Hash index over the catalog keyed on (normalized name, grade).
+
+    Duplicates across sectors are kept as candidate lists and resolved
+    per batch, using the sectors a climber is already known to visit.
+    """
+
+    def __init__(self, rows, sectors=()):
+        """
+        Args:
+            rows: Iterable of (problem_id, name, grade, sector_id, rating) tuples
+            sectors: Optional iterable of (sector_id, name, slug) tuples, to turn
+                the sector names of uploaded logbooks into sector hints
+        """
+        self.sector_by_name = {}
+        for sector_id, name, slug in sectors:
+            self.sector_by_name[normalize_name(name)] = sector_id
+            self.sector_by_name.setdefault(normalize_name(slug), sector_id)
+        self.by_name_grade = defaultdict(list)
+        self.by_name = defaultdict(list)
+        self.sector_of = {}
+        self.rating_of = {}
+        self.grade_of = {}
+        for problem_id, name, grade, sector_id, rating in rows:
+            key = normalize_name(name)
+            if not key:
+                continue
+            grade = normalize_grade(grade)
+            self.by_name_grade[(key, grade)].append(problem_id)
+            self.by_name[key].append(problem_id)
+            self.sector_of[problem_id] = sector_id
+            self.rating_of[problem_id] = rating or 0.0
+            self.grade_of[problem_id] = GRADE_ORDER.get(grade, 0)
+
+    def __len__(self):
+        return len(self.sector_of)
+
+    def sector_id(self, name: str | None) -> int | None:
+        """Sector id for a sector name or slug as written by a climber, if known."""
+        return self.sector_by_name.get(normalize_name(name)) if name else None
+
+    def candidates(self, name: str, grade: str | None):
+        """Return (candidate_ids, method) for one ascent, without disambiguation."""
+        key = normalize_name(name)
+        grade = normalize_grade(grade)
+        exact = self.by_name_grade.get((key, grade))
+        if exact:
+            return exact, "exact"
+
+        # Grade may have been reassessed since the ascent: accept a nearby grade
+        target = GRADE_ORDER.get(grade)
+        same_name = self.by_name.get(key, [])
+        if target and same_name:
+            close = [
+                pid for pid in same_name
+                if abs(self.grade_of[pid] - target) <= MAX_GRADE_DRIFT
+            ]
+            if close:
+                return close, "name_only"
+        return [], "unmatched"
+
+    def resolve_batch(self, ascents, sector_hints=None):
+        """
+        Resolve a batch of ascents in two passes.
+
+        The first pass collects unambiguous matches; the sectors they fall in
+        are then used to pick between same-named problems in different sectors.
+
+        Args:
+            ascents: List of (name, grade) tuples, typically one climber's logbook
+            sector_hints: Optional list of sector ids (aligned with ascents) the
+                ascent is known to belong to
+
+        Returns:
+            List of MatchResult, aligned with ascents
+        """
+        pending = []
+        sector_votes = Counter()
+        for i, (name, grade) in enumerate(ascents):
+            if CIRCUIT_ENTRY_RE.match(name or ""):
+                pending.append(([], "circuit"))
+                continue
+            found, method = self.candidates(name, grade)
+            hint = sector_hints[i] if sector_hints else None
+            if hint is not None and len(found) > 1:
+                in_sector = [pid for pid in found if self.sector_of[pid] == hint]
+                found = in_sector or found
+            if len(found) == 1:
+                sector_votes[self.sector_of[found[0]]] += 1
+            pending.append((found, method))
+
+        results = []
+        for found, method in pending:
+            if len(found) == 1:
+                results.append(MatchResult(found[0], method))
+            elif not found:
+                results.append(MatchResult(None, method))
+            else:
+                results.append(self._disambiguate(found, sector_votes))
+        return results
+
+    def _disambiguate(self, found, sector_votes):
+        """Pick one of several same-named problems."""
+        by_votes = sorted(found, key=lambda pid: sector_votes.get(self.sector_of[pid], 0), reverse=True)
+        top_votes = sector_votes.get(self.sector_of[by_votes[0]], 0)
+        runner_up = sector_votes.get(self.sector_of[by_votes[1]], 0)
+        if top_votes > runner_up:
+            return MatchResult(by_votes[0], "sector_context")
+
+        # No sector context: fall back to the most popular (best rated) candidate
+        by_rating = sorted(found, key=lambda pid: self.rating_of[pid], reverse=True)
+        if self.rating_of[by_rating[0]] > self.rating_of[by_rating[1]]:
+            return MatchResult(by_rating[0], "rating")
+        return MatchResult(None, "ambiguous")
+
+def build_problem_index(db) -> ProblemIndex:
+    """Build a ProblemIndex from the problems table in a single query (plus the sectors)."""
+    from app.models import Problem, Sector
+
+    rows = db.query(
+        Problem.id, Problem.name, Problem.grade, Problem.sector_id, Problem.rating
+    ).yield_per(5000)
+    sectors = db.query(Sector.id, Sector.name, Sector.slug).all()
+    return ProblemIndex(rows, sectors)
+
+# Process-wide index for the API, with the catalog dataset version it was built from
+_index: tuple[ProblemIndex | None, str | None] = (None, None)
+_index_lock = threading.Lock()
+
+def get_problem_index() -> ProblemIndex:
+    """
+    Return the index over the catalog database, rebuilt (~0.5s) when the
+    catalog dataset version changes. Used by the logbook import endpoint.
+    """
+    from app.catalog_db import CatalogSessionLocal, catalog_version
+
+    global _index
+    version = catalog_version()
+    if _index[0] is None or _index[1] != version:
+        with _index_lock:
+            if _index[0] is None or _index[1] != version:
+                db = CatalogSessionLocal()
+                try:
+                    _index = (build_problem_index(db), version)
+                finally:
+                    db.close()
+    return _index[0]
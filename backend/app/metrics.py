@@ -0,0 +1,103 @@
+# Prometheus metrics, safe under several uvicorn workers
+#
+# With PROMETHEUS_MULTIPROC_DIR set, every worker writes its samples to
+# memory-mapped files in that directory and /metrics aggregates them. The
+# directory must be emptied before the workers start, e.g. in the Procfile:
+#   rm -rf $PROMETHEUS_MULTIPROC_DIR && mkdir -p $PROMETHEUS_MULTIPROC_DIR
+import os
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from prometheus_client import (
+    CollectorRegistry, Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, REGISTRY, generate_latest, multiprocess,
+)
+
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+# Routers reported as their own label; anything else is "other"
+ROUTERS = {"problems", "sectors", "circuits", "questionnaire", "recommendations"}
+
+REQUEST_LATENCY = Histogram(
+    "dreamclimb_request_duration_seconds",
+    "Request latency",
+    ["router", "method", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+RESPONSE_SIZE = Histogram(
+    "dreamclimb_response_size_bytes",
+    "Response body size",
+    ["router"],
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "dreamclimb_db_pool_checked_out",
+    "Database connections currently checked out",
+    multiprocess_mode="livesum",
+)
+DB_POOL_SIZE = Gauge(
+    "dreamclimb_db_pool_size",
+    "Configured database pool size",
+    multiprocess_mode="livesum",
+)
+QUESTIONNAIRE_SUBMISSIONS = Counter(
+    "dreamclimb_questionnaire_submissions_total",
+    "Questionnaire submissions and logbook imports, by kind (new, update, import)",
+    ["kind"],
+)
+CACHE_EVENTS = Counter(
+    "dreamclimb_cache_events_total",
+    "Cache lookups by outcome; hit ratio = hits / all lookups",
+    ["cache", "result"],
+)
+REQUEST_COALESCING = Counter(
+    "dreamclimb_request_coalescing_total",
+    "Catalog requests that ran the endpoint (executed) or shared an identical in-flight one (coalesced)",
+    ["router", "result"],
+)
+BOOT_SECONDS = Gauge(
+    "dreamclimb_boot_seconds",
+    "Seconds from process start to a boot milestone",
+    ["phase"],
+    multiprocess_mode="max",
+)
+
+def router_label(path: str) -> str:
+    """'/api/problems/{problem_id}/similar' -> 'problems'."""
+    parts = path.strip("/").split("/")
+    name = parts[1] if len(parts) > 1 and parts[0] == "api" else parts[0]
+    return name if name in ROUTERS else "other"
+
+def observe_request(route: str, method: str, status: int, seconds: float, size: int) -> None:
+    router = router_label(route)
+    REQUEST_LATENCY.labels(router, method, str(status)).observe(seconds)
+    RESPONSE_SIZE.labels(router).observe(size)
+
+def record_cache_event(cache: str, result: str) -> None:
+    CACHE_EVENTS.labels(cache, result).inc()
+
+def install_pool_listeners(engine: Engine) -> None:
+    """Track checked-out connections with pool events instead of polling."""
+    size = getattr(engine.pool, "size", None)
+    if callable(size):
+        DB_POOL_SIZE.set(size())
+
+    @event.listens_for(engine, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        DB_POOL_CHECKED_OUT.inc()
+
+    @event.listens_for(engine, "checkin")
+    def _checkin(dbapi_connection, connection_record):
+        DB_POOL_CHECKED_OUT.dec()
+
+def render_latest():
+    """Body and content type of a /metrics scrape, aggregated across workers if multiprocess."""
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+def mark_worker_dead() -> None:
+    """Drop this worker's live gauges on shutdown."""
+    if MULTIPROC_DIR:
+        multiprocess.mark_process_dead(os.getpid())
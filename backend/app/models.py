@@ -1,5 +1,5 @@
 # SQLAlchemy models (table definitions)
-from sqlalchemy import Column, Integer, String, ForeignKey, UniqueConstraint, Float, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, ForeignKey, UniqueConstraint, Float, DateTime, Boolean, JSON, Index, DDL, event
 from sqlalchemy.orm import relationship
 from .database import Base
 from datetime import datetime
@@ -16,6 +16,21 @@ class Sector(Base):
     # Relationships
     problems = relationship("Problem", back_populates="sector")
     circuits = relationship("Circuit", back_populates="sector")
+    stats = relationship("SectorStats", uselist=False, back_populates="sector")
+
+class SectorStats(Base):
+    """Per-sector summary, recomputed at load time by scripts/compute_stats.py"""
+    __tablename__ = "sector_stats"
+    sector_id = Column(Integer, ForeignKey("sectors.id"), primary_key=True)
+    problem_count = Column(Integer, nullable=False, default=0)
+    circuit_count = Column(Integer, nullable=False, default=0)
+    min_grade_order = Column(Integer, nullable=True)
+    max_grade_order = Column(Integer, nullable=True)
+    grade_histogram = Column(JSON, nullable=False)  # {grade: count}, in grade order
+    mean_rating = Column(Float, nullable=True)
+    tag_histogram = Column(JSON, nullable=False)  # {tag: count}, most common first
+    # Relationships
+    sector = relationship("Sector", back_populates="stats")
 
 class Problem(Base):
     __tablename__ = "problems"
@@ -27,22 +42,47 @@ class Problem(Base):
     alt_grade = Column(String)
     first_ascent = Column(String)
     styles = Column(String)  # Comma-separated styles for simplicity
+    tag_ids = Column(JSON, nullable=True)  # Ids of the styles in the compiled tag vocabulary (app.translations)
     rating = Column(Float, nullable=True)
+    # Rows of user_climbed_problems, maintained by the writers (app.ascent_counts)
+    ascent_count = Column(Integer, nullable=False, default=0, server_default="0")
     # Relationships
     sector_id = Column(Integer, ForeignKey("sectors.id"))
     sector = relationship("Sector", back_populates="problems")
     circuit_problems = relationship("CircuitProblem", back_populates="problem")
 
+    __table_args__ = (
+        # read_problems / sector listings: filter on sector and grade, order by rating
+        Index("ix_problems_sector_grade_rating", "sector_id", "grade_order", "rating"),
+        # read_problems with order_by=ascents
+        Index("ix_problems_ascent_count", "ascent_count"),
+    )
+
+# read_problems without a sector orders by "rating DESC NULLS LAST, grade_order".
+# NULLS LAST is not valid in SQLite indexes, where DESC already puts NULLs last.
+event.listen(Problem.__table__, "after_create", DDL(
+    "CREATE INDEX ix_problems_rating_grade ON problems (rating DESC NULLS LAST, grade_order)"
+).execute_if(dialect="postgresql"))
+event.listen(Problem.__table__, "after_create", DDL(
+    "CREATE INDEX ix_problems_rating_grade ON problems (rating DESC, grade_order)"
+).execute_if(dialect="sqlite"))
+
 class CircuitProblem(Base):
     __tablename__ = "circuit_problems"
     circuit_id = Column(String, ForeignKey("circuits.id"), primary_key=True)
     problem_id = Column(String, ForeignKey("problems.id"), primary_key=True)
     number = Column(String, nullable=True)  # Order of the problem in the circuit
+    number_order = Column(Integer, nullable=True)  # Sort key of number: "D" < "1" < "1 bis" < "2" < ... < "A"
 
     # Relationships
     circuit = relationship("Circuit", back_populates="circuit_problems")
     problem = relationship("Problem", back_populates="circuit_problems")
 
+    __table_args__ = (
+        # Reverse lookup problem -> circuits (the primary key leads with circuit_id)
+        Index("ix_circuit_problems_problem_circuit", "problem_id", "circuit_id"),
+    )
+
 class Circuit(Base):
     __tablename__ = "circuits"
     id = Column(String, primary_key=True, index=True)
@@ -51,9 +91,23 @@ class Circuit(Base):
     circuit_level = Column(String, nullable=True)
     circuit_order = Column(Integer, nullable=True)
     # Relationships
-    sector_id = Column(Integer, ForeignKey("sectors.id"))
+    sector_id = Column(Integer, ForeignKey("sectors.id"), index=True)
     sector = relationship("Sector", back_populates="circuits")
     circuit_problems = relationship("CircuitProblem", back_populates="circuit")
+    stats = relationship("CircuitStats", uselist=False, back_populates="circuit")
+
+class CircuitStats(Base):
+    """Per-circuit summary, recomputed at load time by scripts/compute_stats.py"""
+    __tablename__ = "circuit_stats"
+    circuit_id = Column(String, ForeignKey("circuits.id"), primary_key=True)
+    problem_count = Column(Integer, nullable=False, default=0)
+    min_grade_order = Column(Integer, nullable=True)
+    max_grade_order = Column(Integer, nullable=True)
+    grade_histogram = Column(JSON, nullable=False)  # {grade: count}, in grade order
+    mean_rating = Column(Float, nullable=True)
+    dominant_styles = Column(JSON, nullable=False)  # Most common tags, most common first
+    # Relationships
+    circuit = relationship("Circuit", back_populates="stats")
 
 # ====================
 # User models
@@ -62,11 +116,12 @@ class UserResponse(Base):
     __tablename__ = "user_responses"
 
     id = Column(Integer, primary_key=True, index=True)
-    browser_id = Column(String, index=False, nullable = True)
+    browser_id = Column(String, index=True, nullable = True)
     email = Column(String, nullable=True, index=True)
-    update_code = Column(String, nullable=True)
+    update_code = Column(String, nullable=True, index=True)
     subscribe_newsletter = Column(Boolean, default=False)
     bleau_info_user = Column(String, nullable=True)
+    external_url = Column(String, nullable=True, unique=True)  # Profile URL for scraped climbers
     
     # Demographics
     gender = Column(String, nullable=True)
@@ -86,17 +141,76 @@ class UserClimbedProblem(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     user_response_id = Column(Integer, ForeignKey("user_responses.id"))
-    problem_id = Column(String, ForeignKey("problems.id"))
+    problem_id = Column(String, ForeignKey("problems.id"), index=True)
     date_climbed = Column(DateTime, nullable=True)
     
     user_response = relationship("UserResponse", back_populates="climbed_problems")
     problem = relationship("Problem")
 
+    __table_args__ = (
+        # Climbed set of a user, answered from the index alone
+        Index("ix_user_climbed_problems_user_problem", "user_response_id", "problem_id"),
+    )
+
 class UserPreferredTag(Base):
     __tablename__ = "user_preferred_tags"
     
     id = Column(Integer, primary_key=True, index=True)
-    user_response_id = Column(Integer, ForeignKey("user_responses.id"))
+    user_response_id = Column(Integer, ForeignKey("user_responses.id"), index=True)
     tag = Column(String)  # e.g., "dévers", "réglettes"
     
-    user_response = relationship("UserResponse", back_populates="preferred_tags")
\ No newline at end of file
+    user_response = relationship("UserResponse", back_populates="preferred_tags")
+
+# ====================
+# Recommendation models
+# ====================
+class ProblemNeighbor(Base):
+    """Top-k item-item similarities, computed offline by scripts/build_item_neighbors.py"""
+    __tablename__ = "problem_neighbors"
+
+    problem_id = Column(String, ForeignKey("problems.id"), primary_key=True)
+    neighbor_id = Column(String, ForeignKey("problems.id"), primary_key=True)
+    score = Column(Float, nullable=False)
+
+class UserRecommendation(Base):
+    """Materialized top-N recommendations of a survey user"""
+    __tablename__ = "user_recommendations"
+
+    user_response_id = Column(Integer, ForeignKey("user_responses.id"), primary_key=True)
+    problem_ids = Column(JSON, nullable=False)  # Ranked, best first
+    scores = Column(JSON, nullable=False)  # Aligned with problem_ids
+    model_version = Column(String, nullable=True)  # item_neighbors_version used
+    computed_at = Column(DateTime, default=datetime.utcnow)
+
+class ProblemTrending(Base):
+    """Ascents per rolling window with time-decayed scores, computed by scripts/compute_trending.py"""
+    __tablename__ = "problem_trending"
+
+    problem_id = Column(String, ForeignKey("problems.id"), primary_key=True)
+    # Copied from the problem, so that filtered rankings are read from this table alone
+    sector_id = Column(Integer, nullable=True)
+    grade_order = Column(Integer, nullable=True)
+    ascents_30d = Column(Integer, nullable=False, default=0)
+    ascents_1y = Column(Integer, nullable=False, default=0)
+    ascents_all = Column(Integer, nullable=False, default=0)  # Undated ascents included
+    score_30d = Column(Float, nullable=False, default=0.0)
+    score_1y = Column(Float, nullable=False, default=0.0)
+    computed_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # /problems/trending orders by one of these, best first
+        Index("ix_problem_trending_score_30d", "score_30d"),
+        Index("ix_problem_trending_score_1y", "score_1y"),
+        Index("ix_problem_trending_ascents_all", "ascents_all"),
+    )
+
+# ====================
+# Bookkeeping
+# ====================
+class AppState(Base):
+    """Key/value store for dataset and model versions"""
+    __tablename__ = "app_state"
+
+    key = Column(String, primary_key=True)
+    value = Column(String, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,143 @@
+# Opt-in sampling profiler for single requests
+#
+# Disabled unless PROFILE_DIR is set, in which case main.py installs
+# ProfilingMiddleware. A request is profiled when it carries
+# "X-Profile: <PROFILE_TOKEN>" or is picked by PROFILE_SAMPLE_RATE.
+# Each profile is written as folded stacks (one "frame;frame;frame count"
+# line per stack), which flamegraph.pl, speedscope and inferno read as is,
+# next to a JSON file with the route, parameters and timings.
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from app.instrumentation import route_template
+
+PROFILE_DIR = os.getenv("PROFILE_DIR")
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "1"))
+PROFILE_HEADER = b"x-profile"
+
+# Innermost frames of a thread that is waiting rather than working
+_IDLE_FILES = ("threading.py", "queue.py", "selectors.py")
+
+def _is_idle(frame) -> bool:
+    return frame.f_code.co_filename.endswith(_IDLE_FILES)
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+
+class Sampler:
+    """
+    Background thread sampling the Python stacks of every busy thread.
+
+    Endpoints run either on the event loop or in the threadpool, so all
+    threads are sampled and idle ones (waiting on a lock, queue or selector)
+    are skipped. Concurrent requests in the same worker can show up in the
+    profile; only one profile runs at a time per worker to limit this.
+    """
+
+    def __init__(self, interval_ms: float = PROFILE_INTERVAL_MS):
+        self.interval = interval_ms / 1000
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id or _is_idle(frame):
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+def write_profile(directory: Path, root: str, sampler: Sampler, meta: dict) -> str:
+    """
+    Write <name>.folded and <name>.json, the route being the root frame.
+
+    Returns:
+        The profile name
+    """
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", meta["route"]).strip("_") or "root"
+    name = f"{datetime.utcnow():%Y%m%dT%H%M%S%f}-{meta['method'].lower()}-{slug}"
+    directory.mkdir(parents=True, exist_ok=True)
+    with open(directory / f"{name}.folded", "w") as f:
+        for stack, count in sampler.stacks.most_common():
+            f.write(f"{root};{stack} {count}\n")
+    with open(directory / f"{name}.json", "w") as f:
+        json.dump({**meta, "samples": sampler.samples, "interval_ms": sampler.interval * 1000}, f, indent=2)
+    return name
+
+class ProfilingMiddleware:
+    """ASGI middleware profiling the requests selected by header or sampling rate."""
+
+    def __init__(self, app, directory: str = PROFILE_DIR, token: str | None = PROFILE_TOKEN,
+                 sample_rate: float = PROFILE_SAMPLE_RATE):
+        self.app = app
+        self.directory = Path(directory)
+        self.token = token.encode() if token else None
+        self.sample_rate = sample_rate
+        self._busy = threading.Lock()
+
+    def wants_profile(self, scope) -> bool:
+        if self.token is not None and dict(scope.get("headers", [])).get(PROFILE_HEADER) == self.token:
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.wants_profile(scope) or not self._busy.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        sampler = Sampler()
+        started = time.perf_counter()
+        sampler.start()
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            sampler.stop()
+            self._busy.release()
+            duration_ms = (time.perf_counter() - started) * 1000
+            route = route_template(scope)
+            query = scope.get("query_string", b"").decode("latin-1")
+            root = f"{scope.get('method')} {scope.get('path')}" + (f"?{query}" if query else "")
+            try:
+                name = write_profile(self.directory, root, sampler, {
+                    "method": scope.get("method"),
+                    "route": route,
+                    "path": scope.get("path"),
+                    "query": query,
+                    "status": status_code,
+                    "duration_ms": round(duration_ms, 1),
+                })
+                print(f"✅ Profiled {root} ({sampler.samples} samples): {self.directory / name}.folded")
+            except OSError as e:
+                print(f"❌ Error writing profile for {root}: {e}")
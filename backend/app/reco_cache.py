@@ -0,0 +1,137 @@
+# Materialized top-N recommendations per survey user
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+import numpy as np
+import scipy.sparse as sp
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.models import UserClimbedProblem, UserRecommendation, ProblemNeighbor
+from app.item_knn import score_climbed_set, build_interaction_matrix, NEIGHBORS_VERSION_KEY
+from app.state import get_state
+from app.metrics import record_cache_event
+
+# Number of recommendations materialized per user
+CACHE_SIZE = 200
+# How long a worker trusts its copy of the model version
+VERSION_TTL_SECONDS = 60
+
+# Per-process counters, exposed by /api/recommendations/cache-stats
+stats = Counter()
+_stats_lock = threading.Lock()
+_version = (None, 0.0)
+
+def record(event: str) -> None:
+    with _stats_lock:
+        stats[event] += 1
+    record_cache_event("recommendations", event)
+
+def current_version(db: Session) -> str | None:
+    """Version of the item neighbors the cache should be computed from."""
+    global _version
+    version, fetched_at = _version
+    if time.monotonic() - fetched_at > VERSION_TTL_SECONDS:
+        version = get_state(db, NEIGHBORS_VERSION_KEY)
+        _version = (version, time.monotonic())
+    return version
+
+def get_cached(db: Session, user_id: int):
+    """
+    Return the fresh cache entry for a user, or None on a miss.
+
+    An entry is stale when it was computed from an older neighbor model.
+    """
+    entry = db.get(UserRecommendation, user_id)
+    if entry is None:
+        record("misses")
+        return None
+    if entry.model_version != current_version(db):
+        record("stale")
+        return None
+    record("hits")
+    return entry
+
+def rank_for_user(db: Session, user_id: int) -> list[tuple[str, float]]:
+    """One user's top-N (problem_id, score) pairs, computed without writing anything."""
+    climbed_ids = [
+        problem_id
+        for (problem_id,) in db.query(UserClimbedProblem.problem_id).filter(
+            UserClimbedProblem.user_response_id == user_id
+        )
+    ]
+    if not climbed_ids:
+        return []
+    scores = score_climbed_set(db, climbed_ids)
+    return db.query(scores.c.problem_id, scores.c.score).order_by(scores.c.score.desc()).limit(CACHE_SIZE).all()
+
+def compute_for_user(db: Session, user_id: int) -> UserRecommendation:
+    """Recompute and store one user's top-N recommendations. Does not commit."""
+    ranked = rank_for_user(db, user_id)
+    entry = db.get(UserRecommendation, user_id) or UserRecommendation(user_response_id=user_id)
+    entry.problem_ids = [problem_id for problem_id, _ in ranked]
+    entry.scores = [float(score) for _, score in ranked]
+    entry.model_version = current_version(db)
+    entry.computed_at = datetime.utcnow()
+    db.add(entry)
+    return entry
+
+def refresh_user(user_id: int) -> None:
+    """Background task: recompute a single user's entry after a submission."""
+    db = SessionLocal()
+    try:
+        compute_for_user(db, user_id)
+        db.commit()
+        record("refreshes")
+    except Exception as e:
+        db.rollback()
+        record("refresh_errors")
+        print(f"❌ Error refreshing recommendations for user {user_id}: {e}")
+    finally:
+        db.close()
+
+def rebuild_all(db: Session, version: str | None, top_n: int = CACHE_SIZE) -> int:
+    """
+    Recompute every user's entry in one sparse product, written with a
+    single bulk insert. Does not commit. Run by scripts/build_item_neighbors
+    with each new neighbor model.
+
+    Scores for all users are X @ S, with X the user x problem matrix and S the
+    stored problem x neighbor similarity matrix.
+
+    Returns:
+        Number of users written
+    """
+    X, user_ids, problem_ids = build_interaction_matrix(db, all_problems=True)
+    pos = {p: j for j, p in enumerate(problem_ids)}
+    pairs = db.query(ProblemNeighbor.problem_id, ProblemNeighbor.neighbor_id, ProblemNeighbor.score).all()
+    S = sp.csr_matrix(
+        (
+            np.array([s for _, _, s in pairs], dtype=np.float32),
+            ([pos[a] for a, _, _ in pairs], [pos[b] for _, b, _ in pairs]),
+        ),
+        shape=(len(problem_ids), len(problem_ids)),
+    )
+    scores = (X @ S).tocsr()
+    # Drop already climbed problems
+    scores = scores - scores.multiply(X > 0)
+    scores.eliminate_zeros()
+
+    now = datetime.utcnow()
+    rows = []
+    for i, user_id in enumerate(user_ids):
+        lo, hi = scores.indptr[i], scores.indptr[i + 1]
+        cols, vals = scores.indices[lo:hi], scores.data[lo:hi]
+        order = np.argsort(-vals)[:top_n]
+        rows.append({
+            "user_response_id": user_id,
+            "problem_ids": [problem_ids[j] for j in cols[order]],
+            "scores": [float(v) for v in vals[order]],
+            "model_version": version,
+            "computed_at": now,
+        })
+    db.query(UserRecommendation).delete(synchronize_session=False)
+    if rows:
+        db.execute(insert(UserRecommendation), rows)
+    return len(rows)
@@ -1,8 +1,9 @@
 from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
-from app.schemas import CircuitResponse, CircuitProblemResponse, ProblemResponse
-from app.models import Circuit, CircuitProblem, Problem
-from app.database import get_db
+from sqlalchemy.orm import Session, joinedload, noload
+from sqlalchemy import select
+from app.schemas import CircuitResponse, CircuitProblemDetail, CircuitMembership, ProblemIdsRequest
+from app.models import Circuit, CircuitProblem, Problem, Sector
+from app.catalog_db import get_catalog_db
 from enum import Enum
 
 router = APIRouter()
@@ -23,11 +24,14 @@ def read_circuits(
                         description = "List of circuit difficulty levels to filter by."
                     ),
                     matching: Strictness = Strictness.LOOSE,
-                    db: Session = Depends(get_db)):
-    query = db.query(Circuit)
+                    include_stats: bool = Query(False, description = "Include precomputed problem count, grades, rating and styles."),
+                    db: Session = Depends(get_catalog_db)):
+    # Stats are joined in the same query, or explicitly not loaded (no lazy load per circuit)
+    query = db.query(Circuit).options(joinedload(Circuit.stats) if include_stats else noload(Circuit.stats))
     
     if sector_slug:
-        query = query.filter(Circuit.sector.has(slug=sector_slug))
+        sector_id = select(Sector.id).where(Sector.slug == sector_slug).scalar_subquery()
+        query = query.filter(Circuit.sector_id == sector_id)
     
     if difficulty_levels:
         if matching == Strictness.STRICT:
@@ -43,13 +47,45 @@ def read_circuits(
     
     return query.all()
 
-@router.get("/circuits/{circuit_id}/problems", response_model=list[ProblemResponse])
-def get_circuit_problems(circuit_id: str, db: Session = Depends(get_db)):
-    circuit = db.query(Circuit).filter(Circuit.id == circuit_id).first()
-    if not circuit:
-        return []
-    problems = [
-        cp.problem
-        for cp in db.query(CircuitProblem).filter(CircuitProblem.circuit_id == circuit_id).all()
+@router.get("/circuits/{circuit_id}/problems", response_model=list[CircuitProblemDetail])
+def get_circuit_problems(circuit_id: str, db: Session = Depends(get_catalog_db)):
+    """Problems of a circuit in walking order, fetched with their sectors in one query."""
+    rows = (
+        db.query(Problem, CircuitProblem.number)
+        .join(CircuitProblem, CircuitProblem.problem_id == Problem.id)
+        .options(joinedload(Problem.sector))
+        .filter(CircuitProblem.circuit_id == circuit_id)
+        .order_by(CircuitProblem.number_order, CircuitProblem.number)
+        .all()
+    )
+    return [
+        CircuitProblemDetail.model_validate(problem).model_copy(update={"number": number})
+        for problem, number in rows
     ]
-    return problems
\ No newline at end of file
+
+def circuit_memberships(db: Session, problem_ids: list[str]):
+    """(problem_id, CircuitMembership) pairs, found through ix_circuit_problems_problem_circuit."""
+    rows = (
+        db.query(CircuitProblem.problem_id, Circuit.id, Circuit.name, Circuit.circuit_level, CircuitProblem.number)
+        .join(Circuit, Circuit.id == CircuitProblem.circuit_id)
+        .filter(CircuitProblem.problem_id.in_(problem_ids))
+        .order_by(Circuit.circuit_order, Circuit.name)
+        .all()
+    )
+    return [
+        (problem_id, CircuitMembership(circuit_id=circuit_id, name=name, circuit_level=level, number=number))
+        for problem_id, circuit_id, name, level, number in rows
+    ]
+
+@router.get("/problems/{problem_id}/circuits", response_model=list[CircuitMembership])
+def get_problem_circuits(problem_id: str, db: Session = Depends(get_catalog_db)):
+    """Circuits a problem belongs to."""
+    return [membership for _, membership in circuit_memberships(db, [problem_id])]
+
+@router.post("/problems/circuits", response_model=dict[str, list[CircuitMembership]])
+def get_problems_circuits(request: ProblemIdsRequest, db: Session = Depends(get_catalog_db)):
+    """Circuit memberships of many problems in one query. Every requested id is a key."""
+    result = {problem_id: [] for problem_id in request.problem_ids}
+    for problem_id, membership in circuit_memberships(db, request.problem_ids):
+        result[problem_id].append(membership)
+    return result
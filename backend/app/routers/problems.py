@@ -1,9 +1,12 @@
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
-from app.schemas import ProblemResponse
-from app.models import Problem
+from fastapi import APIRouter, Depends, Query, HTTPException
+from sqlalchemy.orm import Session, joinedload
+from app.schemas import ProblemResponse, SimilarProblem, ProblemIdsRequest, ProblemBatchResponse, TrendingProblem
 from app.database import get_db
-from sqlalchemy import or_, and_
+from app.models import Problem, Sector, ProblemTrending
+from app.catalog_db import get_catalog_db
+from app.catalog import get_catalog
+from app.matching import GRADE_ORDER
+from sqlalchemy import or_, and_, select
 from enum import Enum
 
 router = APIRouter()
@@ -12,42 +15,70 @@ class TagsMode(str, Enum):
     ANY = "any"
     ALL = "all"
 
+class ProblemOrder(str, Enum):
+    RATING = "rating"
+    STYLE_MATCH = "style_match"
+    ASCENTS = "ascents"
+
+class TrendingWindow(str, Enum):
+    DAYS_30 = "30d"
+    YEAR = "1y"
+    ALL = "all"
+
+# Window -> (ranking column, ascent count column) of problem_trending
+TRENDING_COLUMNS = {
+    TrendingWindow.DAYS_30: (ProblemTrending.score_30d, ProblemTrending.ascents_30d),
+    TrendingWindow.YEAR: (ProblemTrending.score_1y, ProblemTrending.ascents_1y),
+    TrendingWindow.ALL: (ProblemTrending.ascents_all, ProblemTrending.ascents_all),
+}
+
+def parse_weighted_tags(preferred_tags: list[str]) -> dict[str, float]:
+    """Parse 'tag' or 'tag:weight' entries, e.g. ['dévers:2', 'réglettes']."""
+    weights = {}
+    for entry in preferred_tags:
+        tag, _, weight = entry.rpartition(":") if ":" in entry else (entry, "", "1")
+        try:
+            weights[tag] = weights.get(tag, 0.0) + float(weight)
+        except ValueError:
+            raise HTTPException(status_code=422, detail=f"Invalid tag weight in '{entry}'")
+    return weights
+
 def convert_grade_to_order(grade: str) -> int:
-    grade_order_mapping = {
-        "1": 1, "1+": 2, "2-": 3, "2": 4, "2+": 5, 
-        "3-": 6, "3": 7, "3+": 8, "4-": 9, "4": 10, "4+": 11,
-        "5-": 12, "5": 13, "5+": 14, "6a": 15, "6a+": 16, "6b": 17,
-        "6b+": 18, "6c": 19, "6c+": 20, "7a": 21, "7a+": 22, "7b": 23,
-        "7b+": 24, "7c": 25, "7c+": 26, "8a": 27, "8a+": 28, "8b": 29,
-        "8b+": 30, "8c": 31, "8c+": 32, "9a": 33
-    }
-    return grade_order_mapping.get(grade, 0)
+    return GRADE_ORDER.get(grade, 0)
 
-@router.get("/problems", response_model=list[ProblemResponse])
-def read_problems(
-                    min_grade: str | None = "1", 
-                    max_grade: str | None = "9a",
-                    sector_slug: str | None = None,
-                    tags: list[str] | None = Query(
-                        None,
-                        example = ["dévers","réglette"],
-                        description = "List of tags/styles to filter by."
-                    ),
-                    tags_mode: TagsMode = TagsMode.ANY,
-                    db: Session = Depends(get_db)):
+def listing_grade_order(db: Session, min_grade, max_grade):
+    """
+    Grade column for the grade filter of the /problems listing.
+
+    SQLite has no range statistics and takes the full grade range (the
+    default, which only drops ungraded problems) for a selective one: it
+    would read ix_problems_grade_order and sort every problem. Comparing an
+    expression there makes it walk the index of the requested order instead.
+    Other dialects get the plain column.
+    """
+    full_range = (convert_grade_to_order(min_grade) <= 1
+                  and convert_grade_to_order(max_grade) >= convert_grade_to_order("9a"))
+    if full_range and db.get_bind().dialect.name == "sqlite":
+        return Problem.grade_order + 0
+    return Problem.grade_order
+
+def apply_problem_filters(query, min_grade, max_grade, sector_slug=None, tags=None, tags_mode=TagsMode.ANY,
+                          grade_order=Problem.grade_order):
+    """Apply the grade/sector/tag filters shared by the problem listing endpoints."""
     ## Define the paramters
     min_order = convert_grade_to_order(min_grade)
     max_order = convert_grade_to_order(max_grade)
 
     ## Filter by grade (but don't return all() yet):
-    query = db.query(Problem).filter(
-        Problem.grade_order <= max_order,
-        Problem.grade_order >= min_order
+    query = query.filter(
+        grade_order <= max_order,
+        grade_order >= min_order
     )
 
-    ## Further by sector if provided
+    ## Further by sector if provided (as an id lookup, so ix_problems_sector_grade_rating applies)
     if sector_slug:
-        query = query.filter(Problem.sector.has(slug=sector_slug))
+        sector_id = select(Sector.id).where(Sector.slug == sector_slug).scalar_subquery()
+        query = query.filter(Problem.sector_id == sector_id)
     ## Further by tags if provided
     if tags:
         tag_filters = [Problem.styles.ilike(f"%{tag}%") for tag in tags]
@@ -56,8 +87,150 @@ def read_problems(
             query = query.filter(and_(*tag_filters))
         else:
             query = query.filter(or_(*tag_filters))
+    return query
+
+@router.get("/problems", response_model=list[ProblemResponse])
+def read_problems(
+                    min_grade: str | None = "1", 
+                    max_grade: str | None = "9a",
+                    sector_slug: str | None = None,
+                    tags: list[str] | None = Query(
+                        None,
+                        example = ["dévers","réglette"],
+                        description = "List of tags/styles to filter by."
+                    ),
+                    tags_mode: TagsMode = TagsMode.ANY,
+                    order_by: ProblemOrder = ProblemOrder.RATING,
+                    preferred_tags: list[str] | None = Query(
+                        None,
+                        example = ["dévers:2","réglettes"],
+                        description = "Weighted style preferences ('tag' or 'tag:weight'), used with order_by=style_match."
+                    ),
+                    db: Session = Depends(get_catalog_db),
+                    primary_db: Session = Depends(get_db)):
+    if order_by == ProblemOrder.STYLE_MATCH:
+        if not preferred_tags:
+            raise HTTPException(status_code=422, detail="order_by=style_match requires preferred_tags")
+        return rank_by_style_match(db, parse_weighted_tags(preferred_tags), min_grade, max_grade,
+                                   sector_slug, tags, tags_mode)
+
+    if order_by == ProblemOrder.ASCENTS:
+        # Live counters: read them from the primary database, the catalog file holds a snapshot
+        db = primary_db
+    query = apply_problem_filters(db.query(Problem), min_grade, max_grade, sector_slug, tags, tags_mode,
+                                  grade_order=listing_grade_order(db, min_grade, max_grade))
+    # Sector is part of every ProblemResponse: load it in the same query
+    query = query.options(joinedload(Problem.sector))
     
-    ## sort by rating and problem grade
-    query = query.order_by(Problem.rating.desc().nulls_last(), Problem.grade_order)
+    if order_by == ProblemOrder.ASCENTS:
+        ## most climbed first, then by rating
+        query = query.order_by(Problem.ascent_count.desc(), Problem.rating.desc().nulls_last())
+    else:
+        ## sort by rating and problem grade
+        query = query.order_by(Problem.rating.desc().nulls_last(), Problem.grade_order)
     query = query.limit(100) # to limit response size for now.
     return query.all()
+
+def rank_by_style_match(db, weights, min_grade, max_grade, sector_slug, tags, tags_mode, limit=100):
+    """Best matches for weighted style preferences, ranked on the catalog's sparse tag matrix."""
+    catalog = get_catalog()
+    sector_id = None
+    if sector_slug:
+        sector_id = catalog.sector_slug_to_id.get(sector_slug)
+        if sector_id is None:
+            return []
+
+    # Grade and sector are applied on the matrix; over-fetch so the SQL tag filters still leave enough
+    ranked = catalog.rank_by_preferences(
+        weights,
+        min_order=convert_grade_to_order(min_grade),
+        max_order=convert_grade_to_order(max_grade),
+        sector_id=sector_id,
+        n=limit * 20 if tags else limit,
+    )
+    if not ranked:
+        return []
+    rank = {problem_id: i for i, (problem_id, _) in enumerate(ranked)}
+    query = db.query(Problem).options(joinedload(Problem.sector)).filter(Problem.id.in_(list(rank)))
+    if tags:
+        query = apply_problem_filters(query, min_grade, max_grade, None, tags, tags_mode)
+    problems = query.all()
+    problems.sort(key=lambda p: rank[p.id])
+    return problems[:limit]
+
+@router.get("/problems/trending", response_model=list[TrendingProblem])
+def read_trending_problems(
+    window: TrendingWindow = TrendingWindow.DAYS_30,
+    min_grade: str | None = "1",
+    max_grade: str | None = "9a",
+    sector_slug: str | None = None,
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db)
+):
+    """
+    Most climbed problems over a rolling window, from the rankings stored by
+    scripts/compute_trending.py. 30d and 1y rank by time-decayed score,
+    all by ascent count. Read from the primary database, next to the ascents.
+    """
+    score, ascents = TRENDING_COLUMNS[window]
+    # Rank on problem_trending alone (sector and grade are copied there), then load the winners
+    ranking = db.query(ProblemTrending.problem_id, score, ascents).filter(
+        ascents > 0,
+        ProblemTrending.grade_order <= convert_grade_to_order(max_grade),
+        ProblemTrending.grade_order >= convert_grade_to_order(min_grade),
+    )
+    if sector_slug:
+        sector_id = select(Sector.id).where(Sector.slug == sector_slug).scalar_subquery()
+        ranking = ranking.filter(ProblemTrending.sector_id == sector_id)
+    ranked = ranking.order_by(score.desc(), ProblemTrending.problem_id).limit(limit).all()
+    if not ranked:
+        return []
+
+    problems = {
+        problem.id: problem
+        for problem in db.query(Problem).options(joinedload(Problem.sector)).filter(
+            Problem.id.in_([problem_id for problem_id, _, _ in ranked])
+        )
+    }
+    return [
+        TrendingProblem.model_validate(problems[problem_id]).model_copy(update={"ascents": n, "score": float(value)})
+        for problem_id, value, n in ranked
+        if problem_id in problems
+    ]
+
+@router.post("/problems/batch", response_model=ProblemBatchResponse)
+def read_problems_batch(request: ProblemIdsRequest, db: Session = Depends(get_catalog_db)):
+    """
+    Look up many problems at once, e.g. a user's logged ascents.
+
+    One IN query with sectors joined. Problems come back in request order
+    (duplicates once), unknown ids are listed separately.
+    """
+    requested = list(dict.fromkeys(request.problem_ids))
+    found = {
+        problem.id: problem
+        for problem in db.query(Problem).options(joinedload(Problem.sector)).filter(Problem.id.in_(requested))
+    }
+    return ProblemBatchResponse(
+        problems=[found[problem_id] for problem_id in requested if problem_id in found],
+        unknown_ids=[problem_id for problem_id in requested if problem_id not in found],
+    )
+
+@router.get("/problems/{problem_id}/similar", response_model=list[SimilarProblem])
+def get_similar_problems(
+                    problem_id: str,
+                    k: int = Query(10, ge=1, le=100),
+                    other_sectors: bool = Query(False, description = "Only return problems from other sectors."),
+                    db: Session = Depends(get_catalog_db)):
+    """Nearest neighbors of a problem over style tags, grade, rating and sector."""
+    neighbors = get_catalog().similarity_index.query(problem_id, k=k, other_sectors=other_sectors)
+    if neighbors is None:
+        raise HTTPException(status_code=404, detail="Problem not found")
+
+    scores = dict(neighbors)
+    problems = db.query(Problem).options(joinedload(Problem.sector)).filter(Problem.id.in_(list(scores))).all()
+    problems.sort(key=lambda p: scores[p.id], reverse=True)
+    return [
+        SimilarProblem.model_validate(problem).model_copy(update={"score": scores[problem.id]})
+        for problem in problems
+    ]
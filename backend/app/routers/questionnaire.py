@@ -1,14 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Request
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session, joinedload
 from typing import List
 import secrets
 from app.database import SessionLocal
 from app.models import UserResponse, UserClimbedProblem, UserPreferredTag, Problem
 from app.schemas import QuestionnaireSubmission, TagOption, ProblemResponse
-from app.translations import translate_tag
+from app.translations import TAG_LABELS, tag_id, tag_labels
+from app.reco_cache import refresh_user
+from app.ascent_counts import adjust_ascent_counts
+from app.catalog_db import get_catalog_db, fts_enabled, search_problem_ids
+from app.catalog import get_catalog
+from app.metrics import QUESTIONNAIRE_SUBMISSIONS
+from app.matching import get_problem_index
+from app.logbook import (
+    LogbookError, LogbookImport, LogbookParser, MATCH_BATCH_SIZE, MAX_REPORTED_ROWS, MAX_ROWS,
+    iter_lines, logbook_format, write_ascents,
+)
 from datetime import datetime
+import logging
 
 router = APIRouter()
+logger = logging.getLogger("dreamclimb.questionnaire")
 
 def get_db():
     db = SessionLocal()
@@ -20,6 +33,7 @@ def get_db():
 @router.post("/questionnaire/submit")
 def submit_questionnaire(
     submission: QuestionnaireSubmission,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
 ):
     """
@@ -61,7 +75,8 @@ def submit_questionnaire(
     # STEP 2A: Update existing user
     # ==========================================
     if existing_user:
-        print(f"Found existing user {existing_user.id} via {match_method}")
+        logger.info(f"Found existing user {existing_user.id} via {match_method}")
+        QUESTIONNAIRE_SUBMISSIONS.labels("update").inc()
         
         # Update demographics (only if new values provided)
         if submission.gender:
@@ -85,7 +100,7 @@ def submit_questionnaire(
             for cp in existing_user.climbed_problems
         }
         
-        new_problem_count = 0
+        new_problem_ids = []
         for problem_id in submission.climbed_problem_ids:
             if problem_id not in existing_problem_ids:
                 # Add new problem
@@ -94,7 +109,9 @@ def submit_questionnaire(
                     problem_id=problem_id
                 )
                 db.add(climbed)
-                new_problem_count += 1
+                new_problem_ids.append(problem_id)
+        new_problem_count = len(new_problem_ids)
+        adjust_ascent_counts(db, new_problem_ids)
         
         # MERGE PREFERRED TAGS
         existing_tags = {
@@ -112,6 +129,10 @@ def submit_questionnaire(
                 new_tags += 1
         
         db.commit()
+
+        # Only this user's recommendations change: recompute them after responding
+        if new_problem_count or new_tags:
+            background_tasks.add_task(refresh_user, existing_user.id)
         
         total_problems = len(existing_problem_ids) + new_problem_count
         
@@ -129,7 +150,8 @@ def submit_questionnaire(
     # STEP 2B: Create new user
     # ==========================================
     else:
-        print("Creating new user profile")
+        logger.info("Creating new user profile")
+        QUESTIONNAIRE_SUBMISSIONS.labels("new").inc()
         # Create user response
         user_response = UserResponse(
             browser_id=submission.browser_id,
@@ -150,6 +172,7 @@ def submit_questionnaire(
                 problem_id=problem_id
             )
             db.add(climbed)
+        adjust_ascent_counts(db, submission.climbed_problem_ids)
         
         # Add preferred tags
         for tag in submission.preferred_tags:
@@ -160,6 +183,7 @@ def submit_questionnaire(
             db.add(pref_tag)
         
         db.commit()
+        background_tasks.add_task(refresh_user, user_response.id)
         
         return {
             "message": "Profile created successfully!",
@@ -170,10 +194,82 @@ def submit_questionnaire(
             "matched_via": None
         }
 
+@router.post("/questionnaire/import")
+async def import_logbook(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    browser_id: str | None = None,
+    update_code: str | None = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Import a logbook into an existing profile (found by browser_id or update_code).
+
+    The body is CSV with a header row (name, grade, sector, date) sent as
+    text/csv, or NDJSON with the same keys sent as application/x-ndjson.
+    Rows are matched against the catalog by name and grade, the sector
+    breaking ties between same-named problems. Each matched problem is
+    logged once, with its earliest date.
+
+    Returns:
+        A match report: counts per match method, rows written and the
+        rows that could not be matched or read
+    """
+    fmt = logbook_format(request.headers.get("content-type"))
+    if fmt is None:
+        raise HTTPException(status_code=415, detail="Send the logbook as text/csv or application/x-ndjson")
+    if not browser_id and not update_code:
+        raise HTTPException(status_code=400, detail="browser_id or update_code is required")
+
+    user = await run_in_threadpool(
+        lambda: db.query(UserResponse).filter(
+            (UserResponse.browser_id == browser_id) if browser_id else (UserResponse.update_code == update_code)
+        ).first()
+    )
+    if user is None:
+        raise HTTPException(status_code=404, detail="Profile not found, submit the questionnaire first")
+
+    upload = LogbookImport(await run_in_threadpool(get_problem_index))
+    parser = LogbookParser(fmt)
+    batch = []
+    try:
+        async for line in iter_lines(request.stream()):
+            row = parser.parse(line)
+            if row is None:
+                continue
+            batch.append(row)
+            if upload.rows + len(batch) > MAX_ROWS:
+                raise HTTPException(status_code=413, detail=f"Logbooks are limited to {MAX_ROWS} rows")
+            if len(batch) >= MATCH_BATCH_SIZE:
+                await run_in_threadpool(upload.add_batch, batch)
+                batch = []
+    except LogbookError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if batch:
+        await run_in_threadpool(upload.add_batch, batch)
+
+    written = await run_in_threadpool(write_ascents, db, user.id, upload.first_ascents)
+    QUESTIONNAIRE_SUBMISSIONS.labels("import").inc()
+    if written["inserted"] or written["dates_updated"]:
+        background_tasks.add_task(refresh_user, user.id)
+    logger.info(f"Imported logbook for user {user.id}: {upload.matched}/{upload.rows} rows matched")
+
+    return {
+        "message": "Logbook imported successfully!",
+        "user_id": user.id,
+        "rows": upload.rows,
+        "matched": upload.matched,
+        "match_rate": round(upload.matched / upload.rows * 100, 1) if upload.rows else 0.0,
+        "methods": dict(upload.stats.most_common()),
+        **written,
+        "unmatched": upload.unmatched[:MAX_REPORTED_ROWS],
+        "invalid": parser.invalid[:MAX_REPORTED_ROWS],
+        "invalid_count": len(parser.invalid),
+    }
+
 @router.get("/questionnaire/available-tags")
 def get_available_tags(
     language: str = "en",  # 'en' or 'fr'
-    db: Session = Depends(get_db)
 ):
     """
     Get all unique climbing style tags with translations.
@@ -184,50 +280,50 @@ def get_available_tags(
     Returns:
         List of tags with counts and translations
     """
-    # Get all problems and extract tags
-    problems = db.query(Problem).all()
-    tag_counts = {}
-    
-    for problem in problems:
-        if problem.styles:
-            # Split comma-separated tags
-            tags = [tag.strip() for tag in problem.styles.split(',')]
-            for tag in tags:
-                if tag:
-                    # Store in lowercase for consistency
-                    tag_lower = tag.lower()
-                    tag_counts[tag_lower] = tag_counts.get(tag_lower, 0) + 1
+    # Counts per tag id come with the in-memory catalog, labels from the compiled vocabulary
+    tag_counts = get_catalog().tag_counts
     
     # Sort by count (most common first)
-    sorted_tags = sorted(tag_counts.items(), key=lambda x: x[1], reverse=True)
+    sorted_tags = sorted(
+        ((i, int(count)) for i, count in enumerate(tag_counts) if count),
+        key=lambda x: x[1], reverse=True
+    )
     
     # Build response based on language
     if language == "en":
         return [
             {
-                "tag": translate_tag(tag),  # English translation
-                "tag_original": tag,  # Keep French for submission
+                "tag": TAG_LABELS[i][1],  # English translation
+                "tag_original": TAG_LABELS[i][0],  # Keep French for submission
                 "count": count
             }
-            for tag, count in sorted_tags
+            for i, count in sorted_tags
         ]
     else:  # French
         return [
             {
-                "tag": tag,
+                "tag": TAG_LABELS[i][0],
                 "count": count
             }
-            for tag, count in sorted_tags
+            for i, count in sorted_tags
         ]
 
 @router.get("/questionnaire/search-problems", response_model=List[ProblemResponse])
 def search_problems(
     q: str,
     limit: int = 20,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_catalog_db)
 ):
     """Search problems by name for autocomplete"""
     
+    if fts_enabled():
+        # Word-prefix match on the FTS5 index of the SQLite catalog, best match first
+        problem_ids = search_problem_ids(db, q, limit)
+        problems = db.query(Problem).options(joinedload(Problem.sector)).filter(Problem.id.in_(problem_ids)).all()
+        rank = {problem_id: i for i, problem_id in enumerate(problem_ids)}
+        problems.sort(key=lambda p: rank[p.id])
+        return problems
+
     problems = db.query(Problem).filter(
         Problem.name.ilike(f"%{q}%")
     ).limit(limit).all()
@@ -239,7 +335,7 @@ def search_problems(
 def filter_problems(
     styles: str = None,  # Comma-separated, can be English or French
     language: str = "en",
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_catalog_db)
 ):
     """
     Filter problems by styles (accepts English or French tags).
@@ -249,21 +345,12 @@ def filter_problems(
     query = db.query(Problem)
     
     if styles:
-        # User might send English tags, but database has French
-        from app.translations import get_reverse_translations, translate_tag
-        reverse_trans = get_reverse_translations()
-        
-        requested_styles = [s.strip().lower() for s in styles.split(',')]
-        
-        # Convert English to French if needed
+        # User might send English tags, but database has French: both resolve to the same tag id
         french_styles = []
-        for style in requested_styles:
-            # Check if it's English (in reverse mapping)
-            if style in reverse_trans:
-                french_styles.append(reverse_trans[style])
-            else:
-                # Assume it's already French
-                french_styles.append(style)
+        for style in styles.split(','):
+            i = tag_id(style)
+            # Unknown tags are matched as given
+            french_styles.append(TAG_LABELS[i][0] if i is not None else style.strip().lower())
         
         # Filter by French tags in database
         for french_style in french_styles:
@@ -273,20 +360,16 @@ def filter_problems(
     
     # Return with translated styles if English requested
     if language == "en":
-        result = []
-        for p in problems:
-            problem_dict = {
+        return [
+            {
                 "id": p.id,
                 "name": p.name,
                 "grade": p.grade,
                 "styles": p.styles,  # French
-                "styles_translated": [
-                    translate_tag(s.strip()) 
-                    for s in p.styles.split(',')
-                ] if p.styles else []
+                "styles_translated": tag_labels(p.tag_ids, "en"),
             }
-            result.append(problem_dict)
-        return result
+            for p in problems
+        ]
     else:
         return problems
     
@@ -0,0 +1,214 @@
+from fastapi import APIRouter, Depends, Query, HTTPException, BackgroundTasks
+from sqlalchemy import func
+from sqlalchemy.orm import Session, joinedload
+from enum import Enum
+from app.schemas import RecommendedProblem
+from app.models import Problem, UserClimbedProblem, UserResponse, UserRecommendation
+from app.database import get_db
+from app.item_knn import score_climbed_set
+from app.factors import get_factor_model
+from app import reco_cache
+from app.climber_index import get_climber_index, climber_features
+from app.routers.problems import apply_problem_filters, convert_grade_to_order, TagsMode
+
+router = APIRouter()
+
+# Candidates pulled from the factor model before grade/sector/tag filtering
+FACTOR_CANDIDATES = 2000
+
+class RecommendationMethod(str, Enum):
+    NEIGHBORS = "neighbors"
+    FACTORS = "factors"
+
+def get_climbed_ids(db: Session, user_id: int | None, problem_ids: list[str] | None) -> list[str]:
+    """Climbed set of a survey user, or the explicitly provided problem ids."""
+    if user_id is None:
+        return problem_ids or []
+    return [
+        problem_id
+        for (problem_id,) in db.query(UserClimbedProblem.problem_id).filter(
+            UserClimbedProblem.user_response_id == user_id
+        )
+    ]
+
+@router.get("/recommendations", response_model=list[RecommendedProblem])
+def read_recommendations(
+                    background_tasks: BackgroundTasks,
+                    user_id: int | None = None,
+                    problem_ids: list[str] | None = Query(
+                        None,
+                        description = "Climbed problem ids, for visitors without a survey profile."
+                    ),
+                    min_grade: str | None = "1",
+                    max_grade: str | None = "9a",
+                    sector_slug: str | None = None,
+                    tags: list[str] | None = Query(
+                        None,
+                        example = ["dévers","réglette"],
+                        description = "List of tags/styles to filter by."
+                    ),
+                    tags_mode: TagsMode = TagsMode.ANY,
+                    method: RecommendationMethod = RecommendationMethod.NEIGHBORS,
+                    limit: int = Query(20, ge=1, le=100),
+                    db: Session = Depends(get_db)):
+    """
+    Recommend problems from a user's climbed set.
+
+    - neighbors: summed item-item similarities, aggregated in the database in
+      the same query that applies the grade/sector/tag filters.
+    - factors: ALS factor scores over the whole catalog, then filtered.
+
+    Neighbor recommendations for survey users are served from their
+    materialized top-N entry when it is fresh; otherwise the ranking is
+    computed for this response and the entry is refreshed after it.
+    """
+    if user_id is not None:
+        if not db.query(UserResponse.id).filter(UserResponse.id == user_id).first():
+            raise HTTPException(status_code=404, detail="User not found")
+        if method == RecommendationMethod.NEIGHBORS:
+            cached = recommend_from_cache(db, background_tasks, user_id, min_grade, max_grade,
+                                          sector_slug, tags, tags_mode, limit)
+            if cached is not None:
+                return cached
+
+    climbed_ids = get_climbed_ids(db, user_id, problem_ids)
+    if not climbed_ids:
+        return []
+
+    if method == RecommendationMethod.FACTORS:
+        return recommend_from_factors(db, user_id, climbed_ids, min_grade, max_grade,
+                                      sector_slug, tags, tags_mode, limit)
+
+    scores = score_climbed_set(db, climbed_ids)
+    query = db.query(Problem, scores.c.score).join(scores, scores.c.problem_id == Problem.id)
+    query = apply_problem_filters(query, min_grade, max_grade, sector_slug, tags, tags_mode)
+    query = query.options(joinedload(Problem.sector))
+    query = query.order_by(scores.c.score.desc(), Problem.rating.desc().nulls_last()).limit(limit)
+
+    return [
+        RecommendedProblem.model_validate(problem).model_copy(update={"score": score})
+        for problem, score in query.all()
+    ]
+
+def recommend_from_cache(db, background_tasks, user_id, min_grade, max_grade, sector_slug, tags, tags_mode, limit):
+    """
+    Filter a user's materialized top-N. A missing or stale entry is ranked
+    for this request only, the stored entry being refreshed as a background
+    task so that GET requests never write. Returns None when the filters
+    leave too few cached problems, so the caller falls back to a live query.
+    """
+    entry = reco_cache.get_cached(db, user_id)
+    if entry is None:
+        scores = dict(reco_cache.rank_for_user(db, user_id))
+        background_tasks.add_task(reco_cache.refresh_user, user_id)
+    else:
+        scores = dict(zip(entry.problem_ids, entry.scores))
+    if not scores:
+        return []
+    query = db.query(Problem).filter(Problem.id.in_(list(scores)))
+    query = apply_problem_filters(query, min_grade, max_grade, sector_slug, tags, tags_mode)
+    problems = query.options(joinedload(Problem.sector)).all()
+    if len(problems) < limit and len(scores) >= reco_cache.CACHE_SIZE:
+        reco_cache.record("filtered_fallbacks")
+        return None
+
+    problems.sort(key=lambda p: scores[p.id], reverse=True)
+    return [
+        RecommendedProblem.model_validate(problem).model_copy(update={"score": scores[problem.id]})
+        for problem in problems[:limit]
+    ]
+
+def recommend_from_factors(db, user_id, climbed_ids, min_grade, max_grade, sector_slug, tags, tags_mode, limit):
+    """Score the catalog with the memory-mapped ALS model and keep the best filtered problems."""
+    model = get_factor_model()
+    if model is None:
+        raise HTTPException(status_code=503, detail="No factor model has been trained yet")
+    user_vector = model.user_vector(user_id, climbed_ids)
+    if user_vector is None:
+        return []
+
+    candidates = dict(model.top_candidates(user_vector, climbed_ids, FACTOR_CANDIDATES))
+    query = db.query(Problem).filter(Problem.id.in_(list(candidates)))
+    query = apply_problem_filters(query, min_grade, max_grade, sector_slug, tags, tags_mode)
+    problems = query.options(joinedload(Problem.sector)).all()
+    problems.sort(key=lambda p: candidates[p.id], reverse=True)
+
+    return [
+        RecommendedProblem.model_validate(problem).model_copy(update={"score": candidates[problem.id]})
+        for problem in problems[:limit]
+    ]
+
+@router.get("/recommendations/similar-climbers", response_model=list[RecommendedProblem])
+def read_similar_climber_sends(
+                    user_id: int | None = None,
+                    height: int | None = Query(None, ge=100, le=230, description="Height in cm"),
+                    arm_span: int | None = Query(None, ge=100, le=250, description="Arm span in cm"),
+                    grade: str | None = Query(None, description="Typical hard send, e.g. '6c'"),
+                    k: int = Query(50, ge=1, le=500, description="Number of similar climbers"),
+                    min_grade: str | None = "1",
+                    max_grade: str | None = "9a",
+                    sector_slug: str | None = None,
+                    limit: int = Query(20, ge=1, le=100),
+                    db: Session = Depends(get_db)):
+    """
+    Problems sent by the k climbers closest in height, arm span and grade level.
+
+    The profile is a survey user's (user_id, whose climbed problems are then
+    left out) or given as height, arm_span and grade. The score of a problem
+    is the share of the k climbers who sent it.
+    """
+    index = get_climber_index()
+    exclude = None
+    if user_id is not None:
+        features = index.features_of(user_id)
+        if features is None:
+            # Not indexed yet (e.g. submitted since the last build)
+            features = climber_features(db, user_id)
+        if features is None:
+            raise HTTPException(status_code=404, detail="User has no height, arm span or graded ascents")
+        exclude = user_id
+    elif height is not None and arm_span is not None and convert_grade_to_order(grade):
+        features = (height, arm_span, convert_grade_to_order(grade))
+    else:
+        raise HTTPException(status_code=422, detail="Provide user_id, or height, arm_span and grade")
+
+    neighbor_ids = [neighbor_id for neighbor_id, _ in index.nearest(*features, k=k, exclude=exclude)]
+    if not neighbor_ids:
+        return []
+
+    sends = (
+        db.query(UserClimbedProblem.problem_id, func.count().label("climbers"))
+        .filter(UserClimbedProblem.user_response_id.in_(neighbor_ids))
+        .group_by(UserClimbedProblem.problem_id)
+        .subquery()
+    )
+    query = db.query(Problem, sends.c.climbers).join(sends, sends.c.problem_id == Problem.id)
+    if exclude is not None:
+        query = query.filter(Problem.id.notin_(
+            db.query(UserClimbedProblem.problem_id).filter(UserClimbedProblem.user_response_id == exclude)
+        ))
+    query = apply_problem_filters(query, min_grade, max_grade, sector_slug)
+    query = query.options(joinedload(Problem.sector))
+    query = query.order_by(sends.c.climbers.desc(), Problem.rating.desc().nulls_last()).limit(limit)
+
+    return [
+        RecommendedProblem.model_validate(problem).model_copy(update={"score": climbers / len(neighbor_ids)})
+        for problem, climbers in query.all()
+    ]
+
+@router.get("/recommendations/cache-stats")
+def get_recommendation_cache_stats(db: Session = Depends(get_db)):
+    """Hit/miss/staleness counters of this worker, plus entry counts."""
+    version = reco_cache.current_version(db)
+    lookups = reco_cache.stats["hits"] + reco_cache.stats["misses"] + reco_cache.stats["stale"]
+    total_entries = db.query(UserRecommendation).count()
+    stale_entries = db.query(UserRecommendation).filter(
+        UserRecommendation.model_version.is_distinct_from(version)
+    ).count()
+    return {
+        **reco_cache.stats,
+        "hit_ratio": round(reco_cache.stats["hits"] / lookups, 3) if lookups else None,
+        "model_version": version,
+        "entries": total_entries,
+        "stale_entries": stale_entries,
+    }
@@ -1,16 +1,29 @@
 ## Pydantic schemas for request and response models (for API later)
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional
 from datetime import datetime
 
 # ===================
 # Sector schemas
 # ===================
+class SectorStatsResponse(BaseModel):
+    problem_count: int
+    circuit_count: int
+    min_grade_order: int | None = None
+    max_grade_order: int | None = None
+    grade_histogram: dict[str, int]
+    mean_rating: float | None = None
+    tag_histogram: dict[str, int]
+
+    class Config:
+        from_attributes = True
+
 class SectorResponse(BaseModel):
     id: int
     name: str
     slug: str
     grade_range: str | None = None
+    stats: SectorStatsResponse | None = None
 
     class Config:
         from_attributes = True
@@ -37,7 +50,7 @@ class ProblemResponse(BaseModel):
     id: str
     name: str
     url: str
-    grade: str
+    grade: str | None = None  # ungraded problems are only reachable by id (batch lookup)
     #grade_order: int
     alt_grade: str | None = None
     first_ascent: str | None = None
@@ -48,19 +61,64 @@ class ProblemResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class RecommendedProblem(ProblemResponse):
+    """Problem with its recommendation score"""
+    score: float = 0.0
+
+class SimilarProblem(ProblemResponse):
+    """Problem with its content similarity to the queried problem"""
+    score: float = 0.0
+
+class TrendingProblem(ProblemResponse):
+    """Problem with its ascents and score over a trending window"""
+    ascents: int = 0
+    score: float = 0.0
+
 # ===================
 # Circuit schemas
 # ===================
+class CircuitStatsResponse(BaseModel):
+    problem_count: int
+    min_grade_order: int | None = None
+    max_grade_order: int | None = None
+    grade_histogram: dict[str, int]
+    mean_rating: float | None = None
+    dominant_styles: list[str]
+
+    class Config:
+        from_attributes = True
+
 class CircuitResponse(BaseModel):
     id: str
     name: str
     url: str
     sector_id: int
     circuit_level: str | None = None
+    stats: CircuitStatsResponse | None = None
 
     class Config:
         from_attributes = True
 
+class CircuitProblemDetail(ProblemResponse):
+    """Problem as listed in a circuit, with its circuit number"""
+    number: str | None = None
+
+class CircuitMembership(BaseModel):
+    """A circuit a problem belongs to, with the problem's number in it"""
+    circuit_id: str
+    name: str
+    circuit_level: str | None = None
+    number: str | None = None
+
+class ProblemIdsRequest(BaseModel):
+    """Batch of problem ids"""
+    problem_ids: List[str] = Field(..., max_length=5000)
+
+class ProblemBatchResponse(BaseModel):
+    """Problems of a batch lookup, in request order, and the ids that were not found"""
+    problems: List[ProblemResponse]
+    unknown_ids: List[str]
+
 class CircuitProblemResponse(BaseModel):
     circuit_id: str
     problem_id: str
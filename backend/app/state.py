@@ -0,0 +1,22 @@
+# Helpers around the app_state key/value table (dataset and model versions)
+from datetime import datetime
+from sqlalchemy.orm import Session
+from app.models import AppState
+
+def get_state(db: Session, key: str) -> str | None:
+    """Return the stored value for key, or None if unset."""
+    row = db.get(AppState, key)
+    return row.value if row else None
+
+def set_state(db: Session, key: str, value: str) -> None:
+    """Insert or update a key. The caller is responsible for committing."""
+    row = db.get(AppState, key)
+    if row is None:
+        db.add(AppState(key=key, value=value, updated_at=datetime.utcnow()))
+    else:
+        row.value = value
+        row.updated_at = datetime.utcnow()
+
+def new_version() -> str:
+    """Sortable version string for rebuilt datasets and models, e.g. '20261019T101500'."""
+    return datetime.utcnow().strftime("%Y%m%dT%H%M%S")
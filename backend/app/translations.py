@@ -1,49 +1,109 @@
-TAG_TRANSLATIONS = {
+# ==========================================
+# Tag vocabulary
+# ==========================================
+# (id, French, English). Ids are stored in problems.tag_ids: never renumber or
+# reuse one. A new tag takes the next free id; a dropped tag moves its id to
+# RETIRED_TAG_IDS.
+TAGS: list[tuple[int, str, str]] = [
     # Wall angles / Types (most common)
-    "mur": "wall",
-    "dalle": "slab",
-    "dévers": "overhang",
-    "surplomb": "steep overhang",
-    "toit": "roof",
-    "arête": "arete",
-    "dièdre": "corner",
-    "proue": "prow",
-    "pilier": "pillar",
-    "bombé": "rounded",
-    "cheminée": "chimney",
-    
+    (0, "mur", "wall"),
+    (1, "dalle", "slab"),
+    (2, "dévers", "overhang"),
+    (3, "surplomb", "steep overhang"),
+    (4, "toit", "roof"),
+    (5, "arête", "arete"),
+    (6, "dièdre", "corner"),
+    (7, "proue", "prow"),
+    (8, "pilier", "pillar"),
+    (9, "bombé", "rounded"),
+    (10, "cheminée", "chimney"),
+
     # Traverses
-    "traversée g-d": "traverse L-R",
-    "traversée d-g": "traverse R-L",
-    "traversée": "traverse",
-    
+    (11, "traversée g-d", "traverse L-R"),
+    (12, "traversée d-g", "traverse R-L"),
+    (13, "traversée", "traverse"),
+
     # Hold types
-    "aplats": "slopers",
-    "réglettes": "crimps",
-    "réta": "mantle",
-    "trous": "pockets",
-    "bidoigts": "two-finger pockets",
-    "monodoigts": "monos",
-    "inversées": "underclings",
-    "pincettes": "pinches",
-    
+    (14, "aplats", "slopers"),
+    (15, "réglettes", "crimps"),
+    (16, "réta", "mantle"),
+    (17, "trous", "pockets"),
+    (18, "bidoigts", "two-finger pockets"),
+    (19, "monodoigts", "monos"),
+    (20, "inversées", "underclings"),
+    (21, "pincettes", "pinches"),
+
     # Techniques & Features
-    "jeté": "dyno",
-    "fissure": "crack",
-    "boucle": "loop",
-    "saut": "jump",
-    
+    (22, "jeté", "dyno"),
+    (23, "fissure", "crack"),
+    (24, "boucle", "loop"),
+    (25, "saut", "jump"),
+
     # Height & Difficulty
-    "haut": "highball",
-    "expo": "exposed",
-    
+    (26, "haut", "highball"),
+    (27, "expo", "exposed"),
+
     # Start types
-    "départ assis": "sit start",
-    
+    (28, "départ assis", "sit start"),
+
     # Special
-    "descente": "descent",
-    "avec corde": "with rope",
-}
+    (29, "descente", "descent"),
+    (30, "avec corde", "with rope"),
+]
+# Ids of tags removed from TAGS, kept so they are never handed out again
+RETIRED_TAG_IDS: set[int] = set()
+
+# ==========================================
+# Compiled vocabulary
+# ==========================================
+TAG_TRANSLATIONS: dict[str, str] = {}  # French -> English
+TAG_LABELS: dict[int, tuple[str, str]] = {}  # id -> (French, English)
+TAG_IDS: dict[str, int] = {}  # French or English label, lowercased -> id
+_REVERSE_TRANSLATIONS: dict[str, str] = {}
+
+def compile_vocabulary() -> None:
+    """Rebuild the lookup tables from TAGS. Runs at import and after add_translation."""
+    labels = {}
+    for i, french, english in TAGS:
+        if i in labels or i in RETIRED_TAG_IDS:
+            raise ValueError(f"Tag id {i} ('{french}') is already used or retired")
+        labels[i] = (french, english)
+    if len({french for french, _ in labels.values()}) != len(labels):
+        raise ValueError("Duplicate French label in TAGS")
+    TAG_LABELS.clear()
+    TAG_LABELS.update(labels)
+    TAG_TRANSLATIONS.clear()
+    TAG_TRANSLATIONS.update(dict(TAG_LABELS.values()))
+    TAG_IDS.clear()
+    for i, (french, english) in TAG_LABELS.items():
+        TAG_IDS.setdefault(english, i)
+    # French labels win when an English label is also a French tag
+    TAG_IDS.update({french: i for i, (french, _) in TAG_LABELS.items()})
+    _REVERSE_TRANSLATIONS.clear()
+    _REVERSE_TRANSLATIONS.update({english: french for french, english in TAG_LABELS.values()})
+
+def tag_id(label: str) -> int | None:
+    """Id of a French or English tag label, or None if it is not in the vocabulary."""
+    i = TAG_IDS.get(label)
+    if i is None:
+        i = TAG_IDS.get(label.strip().lower())
+    return i
+
+def tag_ids_from_styles(styles: str | None) -> list[int]:
+    """Ids of the known tags in a comma-separated styles column, in order of appearance."""
+    if not styles:
+        return []
+    ids = []
+    for tag in styles.split(","):
+        i = tag_id(tag)
+        if i is not None and i not in ids:
+            ids.append(i)
+    return ids
+
+def tag_labels(tag_ids: list[int] | None, language: str = "en") -> list[str]:
+    """Labels of tag ids in 'en' or 'fr'."""
+    column = 1 if language == "en" else 0
+    return [TAG_LABELS[i][column] for i in tag_ids or []]
 
 def translate_tag(french_tag: str, default_language: str = "en") -> str:
     """
@@ -59,11 +119,13 @@ def translate_tag(french_tag: str, default_language: str = "en") -> str:
     if default_language != "en":
         return french_tag
     
-    # Normalize: strip whitespace, lowercase
-    normalized = french_tag.strip().lower()
-    
+    # Already normalized tags (the common case) skip the strip/lowercase
+    translated = TAG_TRANSLATIONS.get(french_tag)
+    if translated is not None:
+        return translated
+
     # Return translation or original if not found
-    return TAG_TRANSLATIONS.get(normalized, french_tag)
+    return TAG_TRANSLATIONS.get(french_tag.strip().lower(), french_tag)
 
 
 def translate_tags_list(french_tags: list[str], language: str = "en") -> list[str]:
@@ -99,10 +161,20 @@ def add_translation(french: str, english: str) -> None:
         french: French term
         english: English translation
     """
-    TAG_TRANSLATIONS[french.lower()] = english.lower()
+    french, english = french.lower(), english.lower()
+    for position, (i, known, _) in enumerate(TAGS):
+        if known == french:
+            # Same tag, new English label: the id does not change
+            TAGS[position] = (i, french, english)
+            break
+    else:
+        TAGS.append((max({i for i, _, _ in TAGS} | RETIRED_TAG_IDS) + 1, french, english))
+    compile_vocabulary()
 
 
 # Reverse mapping for potential future use
 def get_reverse_translations() -> dict[str, str]:
     """Get English -> French translations"""
-    return {v: k for k, v in TAG_TRANSLATIONS.items()}
\ No newline at end of file
+    return dict(_REVERSE_TRANSLATIONS)
+
+compile_vocabulary()
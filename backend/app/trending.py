@@ -0,0 +1,86 @@
+# Trending and popular problems, precomputed from dated ascents
+#
+# scripts/compute_trending.py aggregates user_climbed_problems (survey
+# answers and scraped repetitions) per problem and day, and stores for each
+# climbed problem its ascents over the last 30 days, the last year and all
+# time. The rolling windows also get a time-decayed score, each ascent
+# weighing 0.5 ** (age / half-life), so that recent ascents rank a problem
+# above older ones. The all-time ranking is by ascent count. Each row also
+# carries the problem's sector and grade: /problems/trending filters and
+# orders on this table alone and only joins the problems it returns.
+from datetime import date, datetime
+import numpy as np
+from sqlalchemy import delete, func, insert
+from sqlalchemy.orm import Session
+from app.models import Problem, ProblemTrending, UserClimbedProblem
+from app.state import set_state
+
+# Window -> (length in days, half-life of an ascent's weight in days)
+WINDOWS = {"30d": (30, 7.0), "1y": (365, 90.0)}
+# app_state key of the reference date of the stored rankings
+TRENDING_AS_OF_KEY = "trending_as_of"
+INSERT_BATCH_SIZE = 5000
+
+def ascents_per_day(db: Session):
+    """(problem_id, day, ascents) rows, day None for undated ascents, in one GROUP BY."""
+    day = func.date(UserClimbedProblem.date_climbed)
+    rows = db.query(UserClimbedProblem.problem_id, day, func.count()).group_by(UserClimbedProblem.problem_id, day)
+    for problem_id, climbed_on, n in rows:
+        # SQLite returns date() as text, Postgres as a date
+        if isinstance(climbed_on, str):
+            climbed_on = date.fromisoformat(climbed_on)
+        yield problem_id, climbed_on, n
+
+def compute_trending(db: Session, as_of: date) -> list[dict]:
+    """
+    Ascent counts and decayed scores per problem at a reference date.
+
+    Ascents dated after as_of only count towards the all-time total.
+
+    Returns:
+        problem_trending rows, one per problem climbed at least once
+    """
+    rows = list(ascents_per_day(db))
+    problem_ids = sorted({problem_id for problem_id, _, _ in rows})
+    position = {problem_id: i for i, problem_id in enumerate(problem_ids)}
+    index = np.array([position[problem_id] for problem_id, _, _ in rows], dtype=np.int64)
+    age = np.array([(as_of - day).days if day else np.nan for _, day, _ in rows], dtype=np.float64)
+    ascents = np.array([n for _, _, n in rows], dtype=np.float64)
+    n_problems = len(problem_ids)
+
+    columns = {"ascents_all": np.bincount(index, weights=ascents, minlength=n_problems)}
+    for window, (days, half_life) in WINDOWS.items():
+        with np.errstate(invalid="ignore"):
+            in_window = (age >= 0) & (age < days)
+        weights = ascents[in_window]
+        columns[f"ascents_{window}"] = np.bincount(index[in_window], weights=weights, minlength=n_problems)
+        columns[f"score_{window}"] = np.bincount(
+            index[in_window], weights=weights * 0.5 ** (age[in_window] / half_life), minlength=n_problems
+        )
+
+    placement = {
+        problem_id: (sector_id, grade_order)
+        for problem_id, sector_id, grade_order in db.query(Problem.id, Problem.sector_id, Problem.grade_order)
+    }
+    computed_at = datetime.utcnow()
+    return [
+        {
+            "problem_id": problem_id,
+            "sector_id": placement.get(problem_id, (None, None))[0],
+            "grade_order": placement.get(problem_id, (None, None))[1],
+            "ascents_30d": int(columns["ascents_30d"][i]),
+            "ascents_1y": int(columns["ascents_1y"][i]),
+            "ascents_all": int(columns["ascents_all"][i]),
+            "score_30d": round(float(columns["score_30d"][i]), 4),
+            "score_1y": round(float(columns["score_1y"][i]), 4),
+            "computed_at": computed_at,
+        }
+        for i, problem_id in enumerate(problem_ids)
+    ]
+
+def write_trending(db: Session, rows: list[dict], as_of: date) -> None:
+    """Replace the stored rankings. The caller is responsible for committing."""
+    db.execute(delete(ProblemTrending))
+    for start in range(0, len(rows), INSERT_BATCH_SIZE):
+        db.execute(insert(ProblemTrending), rows[start:start + INSERT_BATCH_SIZE])
+    set_state(db, TRENDING_AS_OF_KEY, as_of.isoformat())
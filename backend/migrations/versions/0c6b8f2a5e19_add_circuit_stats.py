@@ -0,0 +1,39 @@
+"""add circuit_stats
+
+Revision ID: 0c6b8f2a5e19
+Revises: e81a4c3d9b57
+Create Date: 2026-10-19 16:22:40.172034
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0c6b8f2a5e19'
+down_revision: Union[str, Sequence[str], None] = 'e81a4c3d9b57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('circuit_stats',
+    sa.Column('circuit_id', sa.String(), nullable=False),
+    sa.Column('problem_count', sa.Integer(), nullable=False),
+    sa.Column('min_grade_order', sa.Integer(), nullable=True),
+    sa.Column('max_grade_order', sa.Integer(), nullable=True),
+    sa.Column('grade_histogram', sa.JSON(), nullable=False),
+    sa.Column('mean_rating', sa.Float(), nullable=True),
+    sa.Column('dominant_styles', sa.JSON(), nullable=False),
+    sa.ForeignKeyConstraint(['circuit_id'], ['circuits.id'], ),
+    sa.PrimaryKeyConstraint('circuit_id')
+    )
+    # Populate with: python -m scripts.compute_stats
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('circuit_stats')
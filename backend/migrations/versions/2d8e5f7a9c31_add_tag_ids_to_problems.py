@@ -0,0 +1,57 @@
+"""add tag_ids to problems
+
+Revision ID: 2d8e5f7a9c31
+Revises: 0c6b8f2a5e19
+Create Date: 2026-10-19 18:05:13.418220
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2d8e5f7a9c31'
+down_revision: Union[str, Sequence[str], None] = '0c6b8f2a5e19'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Frozen copy of the French tags of app.translations.TAG_TRANSLATIONS, in id order
+TAGS = [
+    "mur", "dalle", "dévers", "surplomb", "toit", "arête", "dièdre", "proue", "pilier", "bombé",
+    "cheminée", "traversée g-d", "traversée d-g", "traversée", "aplats", "réglettes", "réta",
+    "trous", "bidoigts", "monodoigts", "inversées", "pincettes", "jeté", "fissure", "boucle",
+    "saut", "haut", "expo", "départ assis", "descente", "avec corde",
+]
+TAG_IDS = {tag: i for i, tag in enumerate(TAGS)}
+
+def tag_ids_from_styles(styles):
+    ids = []
+    for tag in (styles or "").split(","):
+        i = TAG_IDS.get(tag.strip().lower())
+        if i is not None and i not in ids:
+            ids.append(i)
+    return ids
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('problems', sa.Column('tag_ids', sa.JSON(), nullable=True))
+
+    # An offline (--sql) script cannot read rows: python -m scripts.compute_stats fills tag_ids afterwards
+    if context.is_offline_mode():
+        return
+
+    # Backfill from the styles column (one UPDATE per distinct styles string)
+    bind = op.get_bind()
+    problems = sa.table('problems', sa.column('styles', sa.String), sa.column('tag_ids', sa.JSON))
+    distinct_styles = [row[0] for row in bind.execute(sa.text("SELECT DISTINCT styles FROM problems"))]
+    for styles in distinct_styles:
+        condition = problems.c.styles.is_(None) if styles is None else problems.c.styles == styles
+        bind.execute(problems.update().where(condition).values(tag_ids=tag_ids_from_styles(styles)))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('problems', 'tag_ids')
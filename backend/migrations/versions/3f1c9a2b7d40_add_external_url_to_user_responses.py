@@ -0,0 +1,33 @@
+"""add external_url to user_responses for scraped climbers
+
+Revision ID: 3f1c9a2b7d40
+Revises: d7b266e64c93
+Create Date: 2026-10-19 09:12:04.118203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1c9a2b7d40'
+down_revision: Union[str, Sequence[str], None] = 'd7b266e64c93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('user_responses', sa.Column('external_url', sa.String(), nullable=True))
+    # Batch mode: SQLite cannot ALTER constraints, it gets a copy-and-move (Postgres a plain ALTER)
+    with op.batch_alter_table('user_responses') as batch_op:
+        batch_op.create_unique_constraint('uq_user_responses_external_url', ['external_url'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('user_responses') as batch_op:
+        batch_op.drop_constraint('uq_user_responses_external_url', type_='unique')
+        batch_op.drop_column('external_url')
@@ -0,0 +1,52 @@
+"""add indexes for hot query paths and foreign keys
+
+Revision ID: 5b7e2d94a1c6
+Revises: c52d0e9f13a7
+Create Date: 2026-10-19 13:05:37.284911
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b7e2d94a1c6'
+down_revision: Union[str, Sequence[str], None] = 'c52d0e9f13a7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # problems: read_problems, sector listings
+    op.create_index('ix_problems_sector_grade_rating', 'problems', ['sector_id', 'grade_order', 'rating'])
+    if op.get_bind().dialect.name == 'postgresql':
+        op.create_index('ix_problems_rating_grade', 'problems', [sa.text('rating DESC NULLS LAST'), 'grade_order'])
+    else:
+        op.create_index('ix_problems_rating_grade', 'problems', [sa.text('rating DESC'), 'grade_order'])
+
+    # circuits: read_circuits by sector, reverse lookup problem -> circuits
+    op.create_index(op.f('ix_circuits_sector_id'), 'circuits', ['sector_id'])
+    op.create_index('ix_circuit_problems_problem_circuit', 'circuit_problems', ['problem_id', 'circuit_id'])
+
+    # questionnaire: returning-user lookups, climbed sets and preferred tags
+    op.create_index(op.f('ix_user_responses_browser_id'), 'user_responses', ['browser_id'])
+    op.create_index(op.f('ix_user_responses_update_code'), 'user_responses', ['update_code'])
+    op.create_index('ix_user_climbed_problems_user_problem', 'user_climbed_problems', ['user_response_id', 'problem_id'])
+    op.create_index(op.f('ix_user_climbed_problems_problem_id'), 'user_climbed_problems', ['problem_id'])
+    op.create_index(op.f('ix_user_preferred_tags_user_response_id'), 'user_preferred_tags', ['user_response_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_user_preferred_tags_user_response_id'), table_name='user_preferred_tags')
+    op.drop_index(op.f('ix_user_climbed_problems_problem_id'), table_name='user_climbed_problems')
+    op.drop_index('ix_user_climbed_problems_user_problem', table_name='user_climbed_problems')
+    op.drop_index(op.f('ix_user_responses_update_code'), table_name='user_responses')
+    op.drop_index(op.f('ix_user_responses_browser_id'), table_name='user_responses')
+    op.drop_index('ix_circuit_problems_problem_circuit', table_name='circuit_problems')
+    op.drop_index(op.f('ix_circuits_sector_id'), table_name='circuits')
+    op.drop_index('ix_problems_rating_grade', table_name='problems')
+    op.drop_index('ix_problems_sector_grade_rating', table_name='problems')
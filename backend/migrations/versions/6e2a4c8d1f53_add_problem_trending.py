@@ -0,0 +1,46 @@
+"""add problem_trending table
+
+Revision ID: 6e2a4c8d1f53
+Revises: 2d8e5f7a9c31
+Create Date: 2026-10-19 21:12:40.118345
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6e2a4c8d1f53'
+down_revision: Union[str, Sequence[str], None] = '2d8e5f7a9c31'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('problem_trending',
+    sa.Column('problem_id', sa.String(), nullable=False),
+    sa.Column('sector_id', sa.Integer(), nullable=True),
+    sa.Column('grade_order', sa.Integer(), nullable=True),
+    sa.Column('ascents_30d', sa.Integer(), nullable=False),
+    sa.Column('ascents_1y', sa.Integer(), nullable=False),
+    sa.Column('ascents_all', sa.Integer(), nullable=False),
+    sa.Column('score_30d', sa.Float(), nullable=False),
+    sa.Column('score_1y', sa.Float(), nullable=False),
+    sa.Column('computed_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['problem_id'], ['problems.id'], ),
+    sa.PrimaryKeyConstraint('problem_id')
+    )
+    op.create_index('ix_problem_trending_score_30d', 'problem_trending', ['score_30d'], unique=False)
+    op.create_index('ix_problem_trending_score_1y', 'problem_trending', ['score_1y'], unique=False)
+    op.create_index('ix_problem_trending_ascents_all', 'problem_trending', ['ascents_all'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_problem_trending_ascents_all', table_name='problem_trending')
+    op.drop_index('ix_problem_trending_score_1y', table_name='problem_trending')
+    op.drop_index('ix_problem_trending_score_30d', table_name='problem_trending')
+    op.drop_table('problem_trending')
@@ -0,0 +1,59 @@
+"""add number_order to circuit_problems
+
+Revision ID: 9d3f7b1e6a28
+Revises: 5b7e2d94a1c6
+Create Date: 2026-10-19 14:31:52.660487
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d3f7b1e6a28'
+down_revision: Union[str, Sequence[str], None] = '5b7e2d94a1c6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Frozen copy of scripts.load_data.circuit_number_order
+SUFFIXES = {"": 0, "bis": 1, "ter": 2, "quat": 3}
+LAST = 1_000_000
+
+def number_order(number):
+    parts = (number or "").strip().lower().split()
+    if not parts:
+        return LAST
+    head, suffix = parts[0], parts[1] if len(parts) > 1 else ""
+    suffix_rank = SUFFIXES.get(suffix, len(SUFFIXES))
+    if head == "d":
+        return suffix_rank
+    if head == "a":
+        return LAST - 10 + suffix_rank
+    if head.isdigit():
+        return (int(head) + 1) * 10 + suffix_rank
+    return LAST
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('circuit_problems', sa.Column('number_order', sa.Integer(), nullable=True))
+
+    # An offline (--sql) script cannot read rows: python -m scripts.load_data --reload fills number_order afterwards
+    if context.is_offline_mode():
+        return
+
+    # Backfill from the existing numbers (one UPDATE per distinct number)
+    bind = op.get_bind()
+    numbers = [row[0] for row in bind.execute(sa.text("SELECT DISTINCT number FROM circuit_problems"))]
+    for number in numbers:
+        bind.execute(
+            sa.text("UPDATE circuit_problems SET number_order = :order WHERE number IS NOT DISTINCT FROM :number"),
+            {"order": number_order(number), "number": number},
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('circuit_problems', 'number_order')
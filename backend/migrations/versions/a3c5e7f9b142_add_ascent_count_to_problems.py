@@ -0,0 +1,35 @@
+"""add ascent_count to problems
+
+Revision ID: a3c5e7f9b142
+Revises: 6e2a4c8d1f53
+Create Date: 2026-10-19 22:04:51.530917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c5e7f9b142'
+down_revision: Union[str, Sequence[str], None] = '6e2a4c8d1f53'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('problems', sa.Column('ascent_count', sa.Integer(), server_default='0', nullable=False))
+    # Backfill from the ascents already logged
+    op.execute(
+        "UPDATE problems SET ascent_count = "
+        "(SELECT COUNT(*) FROM user_climbed_problems WHERE user_climbed_problems.problem_id = problems.id)"
+    )
+    op.create_index('ix_problems_ascent_count', 'problems', ['ascent_count'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_problems_ascent_count', table_name='problems')
+    op.drop_column('problems', 'ascent_count')
@@ -0,0 +1,36 @@
+"""add user_recommendations cache table
+
+Revision ID: c52d0e9f13a7
+Revises: 8a4e61c0b5d2
+Create Date: 2026-10-19 11:20:13.402716
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c52d0e9f13a7'
+down_revision: Union[str, Sequence[str], None] = '8a4e61c0b5d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('user_recommendations',
+    sa.Column('user_response_id', sa.Integer(), nullable=False),
+    sa.Column('problem_ids', sa.JSON(), nullable=False),
+    sa.Column('scores', sa.JSON(), nullable=False),
+    sa.Column('model_version', sa.String(), nullable=True),
+    sa.Column('computed_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_response_id'], ['user_responses.id'], ),
+    sa.PrimaryKeyConstraint('user_response_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('user_recommendations')
@@ -0,0 +1,40 @@
+"""add sector_stats
+
+Revision ID: e81a4c3d9b57
+Revises: 9d3f7b1e6a28
+Create Date: 2026-10-19 15:48:09.913355
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e81a4c3d9b57'
+down_revision: Union[str, Sequence[str], None] = '9d3f7b1e6a28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('sector_stats',
+    sa.Column('sector_id', sa.Integer(), nullable=False),
+    sa.Column('problem_count', sa.Integer(), nullable=False),
+    sa.Column('circuit_count', sa.Integer(), nullable=False),
+    sa.Column('min_grade_order', sa.Integer(), nullable=True),
+    sa.Column('max_grade_order', sa.Integer(), nullable=True),
+    sa.Column('grade_histogram', sa.JSON(), nullable=False),
+    sa.Column('mean_rating', sa.Float(), nullable=True),
+    sa.Column('tag_histogram', sa.JSON(), nullable=False),
+    sa.ForeignKeyConstraint(['sector_id'], ['sectors.id'], ),
+    sa.PrimaryKeyConstraint('sector_id')
+    )
+    # Populate with: python -m scripts.compute_stats
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('sector_stats')
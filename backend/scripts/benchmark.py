@@ -0,0 +1,528 @@
+import csv
+import hashlib
+import io
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+import click
+
+# Endpoint benchmark against a seeded local database.
+#
+# app.database builds its engine from DATABASE_URL at import time, so the app
+# modules are imported inside main() once the benchmark database is selected.
+#
+#   python -m scripts.benchmark --ascents 100000
+#   python -m scripts.benchmark --database-url postgresql://user:pw@localhost:5434/bench --ascents 1000000
+#   python -m scripts.benchmark --compare data/benchmarks/<previous>.json
+
+BENCHMARK_DIR = Path(__file__).parent.parent / "data" / "benchmarks"
+# Scratch space: the default database and the models trained on each benchmark database
+WORK_DIR = Path(tempfile.gettempdir()) / "dreamclimb-benchmark"
+DEFAULT_DATABASE_URL = f"sqlite:///{WORK_DIR / 'benchmark.db'}"
+DATASET_KEY = "benchmark_dataset"
+INSERT_BATCH_SIZE = 10000
+SERVER_TIMING = re.compile(r'db;dur=([\d.]+);desc="(\d+) queries"')
+
+@click.command()
+@click.option('--database-url', default=DEFAULT_DATABASE_URL, show_default=True,
+              help='Database to seed and benchmark (Postgres, or SQLite as a stand-in)')
+@click.option('--ascents', default=10000, show_default=True, type=click.IntRange(1000, 1_000_000),
+              help='Synthetic survey ascents to generate')
+@click.option('--ascents-per-user', default=50, show_default=True, help='Average climbed set size of a synthetic user')
+@click.option('--seed', default=42, show_default=True, help='Random seed of the synthetic users')
+@click.option('--reseed', is_flag=True, help='Drop and reseed the database even if it matches the requested scale')
+@click.option('--requests', 'n_requests', default=200, show_default=True, help='Timed requests per route')
+@click.option('--warmup', default=10, show_default=True, help='Untimed requests per route')
+@click.option('--concurrency', default=1, show_default=True, help='Client threads sending requests')
+@click.option('--route', 'route_filter', multiple=True, help='Only benchmark routes containing this string')
+@click.option('--output', type=click.Path(path_type=Path), default=None,
+              help='Result file (default: data/benchmarks/benchmark-<timestamp>.json)')
+@click.option('--compare', type=click.Path(exists=True, path_type=Path), default=None,
+              help='Previous result file to print p50/p99 changes against')
+def main(database_url, ascents, ascents_per_user, seed, reseed, n_requests, warmup, concurrency,
+         route_filter, output, compare):
+    """Seed a database from data/raw plus synthetic users, then time every API route."""
+    BENCHMARK_DIR.mkdir(parents=True, exist_ok=True)
+    WORK_DIR.mkdir(parents=True, exist_ok=True)
+    os.environ["DATABASE_URL"] = database_url
+    # Always overridden: a MODEL_DIR set for the API must never get the benchmark's models
+    os.environ["MODEL_DIR"] = str(WORK_DIR / f"models-{hashlib.sha1(database_url.encode()).hexdigest()[:10]}")
+    # Every timed request would otherwise be a candidate for the slow request log
+    os.environ.setdefault("SLOW_REQUEST_MS", "60000")
+
+    from app.database import SessionLocal, engine
+
+    dataset = {"ascents": ascents, "ascents_per_user": ascents_per_user, "seed": seed}
+    db = SessionLocal()
+    try:
+        t0 = time.perf_counter()
+        seeded = seed_database(db, engine, dataset, reseed)
+        if seeded:
+            print(f"✅ Seeded {engine.dialect.name} database in {time.perf_counter() - t0:.1f}s")
+        else:
+            print(f"✅ Reusing seeded {engine.dialect.name} database ({ascents} synthetic ascents)")
+        samples = sample_values(db)
+    finally:
+        db.close()
+
+    results = run_benchmarks(samples, n_requests, warmup, concurrency, route_filter)
+    report = {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(timespec="seconds"),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "dialect": engine.dialect.name,
+            "dataset": {**dataset, **samples["counts"]},
+            "requests": n_requests,
+            "warmup": warmup,
+            "concurrency": concurrency,
+        },
+        "routes": results,
+    }
+
+    output = output or BENCHMARK_DIR / f"benchmark-{datetime.utcnow():%Y%m%dT%H%M%S}.json"
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print_results(results, compare)
+    print(f"✅ Results written to {output}")
+
+# ==========================================
+# Seeding
+# ==========================================
+
+def seed_database(db, engine, dataset, reseed):
+    """
+    Load data/raw through scripts.load_data, then synthetic survey users,
+    item neighbors, cached recommendations and the factor model.
+
+    The requested scale and the raw dataset version are stored in app_state,
+    so a matching database is reused as is. The schema and dataset versions
+    boot checks are recorded too, so the app does not reload the catalog
+    while routes are being timed.
+
+    Returns:
+        False if the existing database was reused
+    """
+    from app.database import Base
+    from app.state import get_state, set_state
+    from app.boot import SCHEMA_VERSION_KEY, DATASET_VERSION_KEY, schema_version, dataset_version
+
+    # Raw files changed since seeding: the catalog has to be reloaded, so reseed
+    dataset = {**dataset, "dataset_version": dataset_version()}
+    if not reseed:
+        try:
+            if get_state(db, DATASET_KEY) == json.dumps(dataset, sort_keys=True):
+                ensure_factor_model()
+                return False
+        except Exception:
+            db.rollback()
+
+    from scripts import (
+        load_data, build_item_neighbors, train_factors, compute_trending,
+        reconcile_ascent_counts,
+    )
+
+    db.close()
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    load_data.main()
+
+    n_users = create_synthetic_users(db, dataset["ascents"], dataset["ascents_per_user"], dataset["seed"])
+    print(f"✅ Created {n_users} synthetic users with {dataset['ascents']} ascents")
+
+    # Also rebuilds the cached recommendations
+    build_item_neighbors.main.main(args=[], standalone_mode=False)
+    train_factors.main.main(args=["--iterations", "5"], standalone_mode=False)
+    compute_trending.main.main(args=[], standalone_mode=False)
+    reconcile_ascent_counts.main.main(args=[], standalone_mode=False)
+
+    set_state(db, SCHEMA_VERSION_KEY, schema_version())
+    set_state(db, DATASET_VERSION_KEY, dataset_version())
+    set_state(db, DATASET_KEY, json.dumps(dataset, sort_keys=True))
+    db.commit()
+    return True
+
+def ensure_factor_model():
+    """Train the factor model of a reused database if its scratch directory was cleared."""
+    from app.factors import ALS_DIR, LATEST_FILE
+    from scripts import train_factors
+
+    if not (ALS_DIR / LATEST_FILE).exists():
+        train_factors.main.main(args=["--iterations", "5"], standalone_mode=False)
+
+def create_synthetic_users(db, n_ascents, ascents_per_user, seed):
+    """
+    Insert survey users whose climbed sets follow a long-tailed popularity:
+    problems are drawn with a weight decaying with their rating rank, so a
+    few classics collect most ascents, as in the real logbooks. Ascents are
+    dated uniformly over the last three years.
+
+    Returns:
+        Number of users created
+    """
+    import numpy as np
+    from sqlalchemy import func, insert
+    from app.models import Problem, UserResponse, UserClimbedProblem
+
+    rng = np.random.default_rng(seed)
+    problem_ids = [
+        problem_id
+        for (problem_id,) in db.query(Problem.id).order_by(Problem.rating.desc().nulls_last(), Problem.id)
+    ]
+    weights = 1.0 / np.power(np.arange(len(problem_ids)) + 10.0, 0.8)
+    cdf = np.cumsum(weights) / weights.sum()
+
+    n_users = max(1, n_ascents // ascents_per_user)
+    sizes = rng.poisson(ascents_per_user, n_users).clip(1, len(problem_ids))
+    # The last user absorbs the difference to the requested number of ascents
+    sizes[-1] = max(1, n_ascents - int(sizes[:-1].sum()))
+
+    first_id = (db.query(func.max(UserResponse.id)).scalar() or 0) + 1
+    now = datetime.utcnow()
+    users = [
+        {
+            "id": first_id + i,
+            "browser_id": f"benchmark-{seed}-{i}",
+            "gender": str(rng.choice(["male", "female"])),
+            "height": int(rng.normal(175, 9)),
+            "arm_span": int(rng.normal(177, 10)),
+            "created_at": now,
+        }
+        for i in range(n_users)
+    ]
+    for start in range(0, len(users), INSERT_BATCH_SIZE):
+        db.execute(insert(UserResponse), users[start:start + INSERT_BATCH_SIZE])
+
+    rows = []
+    for i, size in enumerate(sizes.tolist()):
+        # Oversample then dedupe: a climbed set holds each problem once
+        drawn = np.searchsorted(cdf, rng.random(size * 2 + 10))
+        _, first = np.unique(drawn, return_index=True)
+        ages = rng.integers(0, 3 * 365, size).tolist()
+        for j, age in zip(drawn[np.sort(first)][:size].tolist(), ages):
+            rows.append({
+                "user_response_id": first_id + i,
+                "problem_id": problem_ids[j],
+                "date_climbed": now - timedelta(days=age),
+            })
+        if len(rows) >= INSERT_BATCH_SIZE:
+            db.execute(insert(UserClimbedProblem), rows)
+            rows = []
+    if rows:
+        db.execute(insert(UserClimbedProblem), rows)
+    db.commit()
+    return n_users
+
+def sample_values(db):
+    """Ids and slugs from the seeded database used to fill the route parameters."""
+    from sqlalchemy import func
+    from app.models import Sector, Problem, Circuit, CircuitProblem, UserResponse, UserClimbedProblem
+
+    busiest_sector = (
+        db.query(Sector.slug).join(Problem, Problem.sector_id == Sector.id)
+        .group_by(Sector.slug).order_by(func.count(Problem.id).desc()).limit(1).scalar()
+    )
+    circuit_id = (
+        db.query(CircuitProblem.circuit_id).group_by(CircuitProblem.circuit_id)
+        .order_by(func.count().desc()).limit(1).scalar()
+    )
+    popular = [
+        problem_id
+        for (problem_id,) in db.query(UserClimbedProblem.problem_id).group_by(UserClimbedProblem.problem_id)
+        .order_by(func.count().desc()).limit(50)
+    ]
+    in_circuit = db.query(CircuitProblem.problem_id).filter(CircuitProblem.problem_id.in_(popular)).limit(1).scalar()
+    user_id = (
+        db.query(UserClimbedProblem.user_response_id).group_by(UserClimbedProblem.user_response_id)
+        .order_by(func.count().desc()).limit(1).scalar()
+    )
+    # Logbook import: popular problems as a climber would write them, into a synthetic profile
+    logbook_rows = (
+        db.query(Problem.name, Problem.grade, Sector.name).join(Sector, Sector.id == Problem.sector_id)
+        .filter(Problem.id.in_(popular)).all()
+    )
+    import_browser_id = (
+        db.query(UserResponse.browser_id).filter(UserResponse.browser_id.like("benchmark-%"))
+        .order_by(UserResponse.id).limit(1).scalar()
+    )
+    return {
+        "sector_slug": busiest_sector,
+        "circuit_id": circuit_id,
+        "problem_id": popular[0] if popular else db.query(Problem.id).limit(1).scalar(),
+        "circuit_problem_id": in_circuit or db.query(CircuitProblem.problem_id).limit(1).scalar(),
+        "popular_ids": popular,
+        "user_id": user_id,
+        "logbook_rows": logbook_rows,
+        "import_browser_id": import_browser_id,
+        "counts": {
+            "sectors": db.query(Sector).count(),
+            "problems": db.query(Problem).count(),
+            "circuits": db.query(Circuit).count(),
+            "users": db.query(UserResponse).count(),
+            "user_ascents": db.query(UserClimbedProblem).count(),
+        },
+    }
+
+# ==========================================
+# Requests
+# ==========================================
+
+def logbook_csv(rows):
+    """A CSV logbook upload (name, grade, sector) as (content type, bytes)."""
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(["name", "grade", "sector"])
+    writer.writerows(rows)
+    return ("text/csv", out.getvalue().encode())
+
+def benchmark_cases(s):
+    """
+    Requests sent per route template, as (label, method, url, params, body).
+    The body is a JSON payload, or a (content type, bytes) pair sent as is.
+    A route may have several cases covering its slow and fast shapes.
+    """
+    climbed = s["popular_ids"][:10]
+    return {
+        "/api/problems": [
+            ("default", "GET", "/api/problems", {}, None),
+            ("sector + tags all", "GET", "/api/problems",
+             {"sector_slug": s["sector_slug"], "tags": ["dévers", "réglettes"], "tags_mode": "all"}, None),
+            ("style match", "GET", "/api/problems",
+             {"order_by": "style_match", "preferred_tags": ["dévers:1", "réglettes:0.5"]}, None),
+            ("most climbed", "GET", "/api/problems", {"order_by": "ascents"}, None),
+        ],
+        "/api/problems/trending": [
+            ("30 days", "GET", "/api/problems/trending", {}, None),
+            ("all time, sector", "GET", "/api/problems/trending", {"window": "all", "sector_slug": s["sector_slug"]}, None),
+        ],
+        "/api/problems/batch": [
+            ("50 ids", "POST", "/api/problems/batch", {}, {"problem_ids": s["popular_ids"]}),
+        ],
+        "/api/problems/{problem_id}/similar": [
+            ("default", "GET", f"/api/problems/{s['problem_id']}/similar", {}, None),
+        ],
+        "/api/sectors": [("default", "GET", "/api/sectors", {}, None)],
+        "/api/sectors/{sector_slug}/problems": [
+            ("busiest sector", "GET", f"/api/sectors/{s['sector_slug']}/problems", {}, None),
+        ],
+        "/api/circuits": [
+            ("default", "GET", "/api/circuits", {}, None),
+            ("with stats", "GET", "/api/circuits", {"include_stats": True}, None),
+        ],
+        "/api/circuits/{circuit_id}/problems": [
+            ("longest circuit", "GET", f"/api/circuits/{s['circuit_id']}/problems", {}, None),
+        ],
+        "/api/problems/{problem_id}/circuits": [
+            ("default", "GET", f"/api/problems/{s['circuit_problem_id']}/circuits", {}, None),
+        ],
+        "/api/problems/circuits": [
+            ("50 ids", "POST", "/api/problems/circuits", {}, {"problem_ids": s["popular_ids"]}),
+        ],
+        "/api/questionnaire/submit": [
+            ("returning user", "POST", "/api/questionnaire/submit", {},
+             {"browser_id": "benchmark-submit", "climbed_problem_ids": climbed, "preferred_tags": ["dévers"]}),
+        ],
+        "/api/questionnaire/import": [
+            # Every row is logged after the first request: the steady state is matching only
+            ("50 CSV rows", "POST", "/api/questionnaire/import", {"browser_id": s["import_browser_id"]},
+             logbook_csv(s["logbook_rows"])),
+        ],
+        "/api/questionnaire/available-tags": [
+            ("en", "GET", "/api/questionnaire/available-tags", {"language": "en"}, None),
+        ],
+        "/api/questionnaire/search-problems": [
+            ("substring", "GET", "/api/questionnaire/search-problems", {"q": "arête"}, None),
+        ],
+        "/api/problems/filter": [
+            ("en styles", "GET", "/api/problems/filter", {"styles": "overhang,crimps"}, None),
+        ],
+        "/api/questionnaire/stats": [("default", "GET", "/api/questionnaire/stats", {}, None)],
+        "/api/recommendations": [
+            ("cached user", "GET", "/api/recommendations", {"user_id": s["user_id"]}, None),
+            ("visitor ids", "GET", "/api/recommendations", {"problem_ids": climbed}, None),
+            ("factors", "GET", "/api/recommendations", {"user_id": s["user_id"], "method": "factors"}, None),
+        ],
+        "/api/recommendations/similar-climbers": [
+            ("profile", "GET", "/api/recommendations/similar-climbers",
+             {"height": 175, "arm_span": 178, "grade": "7a"}, None),
+        ],
+        "/api/recommendations/cache-stats": [
+            ("default", "GET", "/api/recommendations/cache-stats", {}, None),
+        ],
+    }
+
+def router_routes():
+    """(method, template) of every route declared in app/routers."""
+    from app.routers import sectors, problems, circuits, questionnaire, recommendations
+
+    routes = []
+    for module in (problems, sectors, circuits, questionnaire, recommendations):
+        for route in module.router.routes:
+            for method in sorted(route.methods):
+                routes.append((method, "/api" + route.path))
+    return routes
+
+def percentile(sorted_values, q):
+    index = min(len(sorted_values) - 1, max(0, round(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def time_case(client, method, url, params, body, n_requests, warmup, concurrency):
+    """Send one request shape repeatedly and summarize latencies in milliseconds."""
+    def send():
+        t = time.perf_counter()
+        if isinstance(body, tuple):
+            content_type, content = body
+            response = client.request(method, url, params=params, content=content,
+                                      headers={"content-type": content_type})
+        else:
+            response = client.request(method, url, params=params, json=body)
+        elapsed = (time.perf_counter() - t) * 1000
+        match = SERVER_TIMING.search(response.headers.get("server-timing", ""))
+        db_ms, statements = (float(match.group(1)), int(match.group(2))) if match else (None, None)
+        return elapsed, response.status_code, len(response.content), db_ms, statements
+
+    for _ in range(warmup):
+        send()
+
+    started = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            timings = list(pool.map(lambda _: send(), range(n_requests)))
+    else:
+        timings = [send() for _ in range(n_requests)]
+    wall = time.perf_counter() - started
+
+    latencies = sorted(t[0] for t in timings)
+    db_times = [t[3] for t in timings if t[3] is not None]
+    statements = [t[4] for t in timings if t[4] is not None]
+    return {
+        "requests": n_requests,
+        "throughput_rps": round(n_requests / wall, 1),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p90_ms": round(percentile(latencies, 90), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "mean_ms": round(statistics.fmean(latencies), 2),
+        "max_ms": round(latencies[-1], 2),
+        "db_mean_ms": round(statistics.fmean(db_times), 2) if db_times else None,
+        "statements": max(statements) if statements else None,
+        "response_bytes": round(statistics.fmean(t[2] for t in timings)),
+        "status_codes": dict(Counter(str(t[1]) for t in timings)),
+    }
+
+def wait_for_boot(status, timeout=600):
+    """Block until the app's background boot (dataset load, cache warm-up) has finished."""
+    deadline = time.monotonic() + timeout
+    while status["warm_s"] is None:
+        if time.monotonic() > deadline:
+            raise click.ClickException(f"The app was not ready after {timeout}s")
+        time.sleep(0.1)
+    if not status["ready"]:
+        raise click.ClickException(f"The app's background boot failed (dataset load {status['setup']})")
+    if status["setup"] == "done":
+        print(f"⚠️ The app reloaded the dataset at startup ({status['warm_s']}s), before the timed requests")
+
+def response_cache(app):
+    """The app's CompressionMiddleware, built by the first request."""
+    from app.compression import CompressionMiddleware
+
+    layer = app.middleware_stack
+    while not isinstance(layer, CompressionMiddleware):
+        layer = layer.app
+    return layer
+
+def is_cached_case(method, url, params):
+    """Whether CompressionMiddleware answers this request from its response cache after the first one."""
+    from urllib.parse import urlencode
+    from app.compression import is_cacheable_path, is_live_query
+
+    return method == "GET" and is_cacheable_path(url) and not is_live_query(urlencode(params, doseq=True).encode())
+
+def run_benchmarks(samples, n_requests, warmup, concurrency, route_filter):
+    """
+    Time every route case. Cases served by the response cache are timed twice:
+    "uncached" with the cache disabled (the endpoint runs on every request),
+    then "warm" (answered from memory after the warm-up).
+    """
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app import boot
+
+    cases = benchmark_cases(samples)
+    results = []
+    with TestClient(app) as client:
+        wait_for_boot(boot.status)
+        cache = response_cache(app)
+        cache_max_bytes = cache.cache_max_bytes
+        for method, template in router_routes():
+            if route_filter and not any(f in template for f in route_filter):
+                continue
+            route_cases = [c for c in cases.get(template, []) if c[1] == method]
+            if not route_cases:
+                print(f"⚠️ No benchmark case for {method} {template}")
+                results.append({"route": template, "method": method, "case": None, "skipped": True})
+                continue
+            for label, _, url, params, body in route_cases:
+                modes = ["uncached", "warm"] if is_cached_case(method, url, params) else [None]
+                for mode in modes:
+                    # Nothing is stored with a zero size limit: every request runs the endpoint
+                    cache.cache_max_bytes = 0 if mode == "uncached" else cache_max_bytes
+                    cache.cache.clear()
+                    cache.cache_bytes = 0
+                    stats = time_case(client, method, url, params, body, n_requests, warmup, concurrency)
+                    results.append({"route": template, "method": method, "case": label, "cache": mode, **stats})
+                    print(f"  {method:4} {template} [{case_name(label, mode)}]: p50 {stats['p50_ms']} ms, "
+                          f"p99 {stats['p99_ms']} ms, {stats['throughput_rps']} req/s")
+        cache.cache_max_bytes = cache_max_bytes
+    return results
+
+def case_name(label, mode):
+    return f"{label}, {mode}" if mode else label
+
+# ==========================================
+# Reporting
+# ==========================================
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=Path(__file__).parent).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_results(results, compare):
+    previous = {}
+    if compare:
+        with open(compare) as f:
+            previous = {(r["method"], r["route"], r["case"], r.get("cache")): r for r in json.load(f)["routes"]}
+
+    print(f"\n{'route':70} {'p50 ms':>9} {'p99 ms':>9} {'req/s':>8} {'queries':>8}")
+    for r in results:
+        if r.get("skipped"):
+            continue
+        name = f"{r['method']} {r['route']} [{case_name(r['case'], r.get('cache'))}]"
+        line = f"{name[:70]:70} {r['p50_ms']:>9} {r['p99_ms']:>9} {r['throughput_rps']:>8} {str(r['statements']):>8}"
+        before = previous.get((r["method"], r["route"], r["case"], r.get("cache")))
+        if before and not before.get("skipped"):
+            line += f"   p50 {change(before['p50_ms'], r['p50_ms'])}, p99 {change(before['p99_ms'], r['p99_ms'])}"
+        print(line)
+    errors = [r for r in results if not r.get("skipped") and any(not code.startswith("2") for code in r["status_codes"])]
+    for r in errors:
+        print(f"⚠️ {r['method']} {r['route']} [{case_name(r['case'], r.get('cache'))}] returned {r['status_codes']}")
+
+def change(before, after):
+    if not before:
+        return "n/a"
+    return f"{(after - before) / before * 100:+.0f}%"
+
+if __name__ == "__main__":
+    main()
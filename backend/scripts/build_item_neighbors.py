@@ -0,0 +1,62 @@
+import time
+import click
+from sqlalchemy import insert
+from app.database import SessionLocal
+from app.models import ProblemNeighbor
+from app.item_knn import build_interaction_matrix, compute_item_neighbors, NEIGHBORS_VERSION_KEY
+from app.reco_cache import rebuild_all
+from app.state import set_state, new_version
+
+INSERT_BATCH_SIZE = 10000
+
+@click.command()
+@click.option('--k', default=50, show_default=True, help='Neighbors kept per problem')
+@click.option('--metric', type=click.Choice(['cosine', 'jaccard']), default='cosine', show_default=True)
+@click.option('--shrinkage', default=10.0, show_default=True, help='Shrinkage constant for low-support pairs')
+@click.option('--min-support', default=1, show_default=True, help='Minimum users per problem and per co-occurrence')
+@click.option('--jobs', default=None, type=int, help='Worker processes (default: all cores)')
+@click.option('--rebuild-recommendations/--no-rebuild-recommendations', default=True, show_default=True,
+              help='Recompute the cached recommendations from the new neighbors')
+def main(k, metric, shrinkage, min_support, jobs, rebuild_recommendations):
+    db = SessionLocal()
+    try:
+        t0 = time.perf_counter()
+        X, user_ids, problem_ids = build_interaction_matrix(db)
+        print(f"Interaction matrix: {X.shape[0]} users x {X.shape[1]} problems, {X.nnz} ascents")
+        if X.nnz == 0:
+            print("⚠️ No ascents found. Load ascents first (python -m scripts.load_ascents).")
+            return
+
+        sources, targets, scores = compute_item_neighbors(
+            X, k=k, metric=metric, shrinkage=shrinkage, min_support=min_support, n_jobs=jobs
+        )
+        t_compute = time.perf_counter() - t0
+        print(f"Computed {len(scores)} neighbor pairs in {t_compute:.2f}s")
+
+        rows = [
+            {"problem_id": problem_ids[s], "neighbor_id": problem_ids[t], "score": float(v)}
+            for s, t, v in zip(sources.tolist(), targets.tolist(), scores.tolist())
+        ]
+        db.query(ProblemNeighbor).delete(synchronize_session=False)
+        for start in range(0, len(rows), INSERT_BATCH_SIZE):
+            db.execute(insert(ProblemNeighbor), rows[start:start + INSERT_BATCH_SIZE])
+
+        version = new_version()
+        set_state(db, NEIGHBORS_VERSION_KEY, version)
+        ## Same transaction: the cache never lags behind the model it was computed from
+        n_users = rebuild_all(db, version) if rebuild_recommendations else None
+        db.commit()
+        print(f"✅ Stored item neighbors (version {version})")
+        if n_users is None:
+            print("Cached recommendations are now stale: run python -m scripts.rebuild_recommendations")
+        else:
+            print(f"✅ Rebuilt cached recommendations for {n_users} users")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error building item neighbors: {e}")
+        raise
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import os
+import time
+from pathlib import Path
+import click
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app.catalog_db import CATALOG_DB_PATH, CATALOG_TABLES, FTS_TABLE
+from app.boot import DATASET_VERSION_KEY, dataset_version
+from app.state import set_state
+from scripts.load_data import load_raw_data
+
+DEFAULT_OUTPUT = Path(__file__).parent.parent / "data" / "catalog.sqlite"
+
+@click.command()
+@click.option('--output', type=click.Path(path_type=Path), default=CATALOG_DB_PATH or DEFAULT_OUTPUT,
+              show_default=True, help='Catalog file to write (CATALOG_DB_PATH if set)')
+def main(output):
+    """Build the self-contained read-only SQLite catalog from data/raw, with an FTS5 name index."""
+    output = Path(output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    # Built next to the target, then swapped in atomically: running workers keep their open file
+    tmp_path = output.with_name(output.name + ".tmp")
+    tmp_path.unlink(missing_ok=True)
+
+    t0 = time.perf_counter()
+    catalog_engine = create_engine(f"sqlite:///{tmp_path}")
+    try:
+        Base.metadata.create_all(bind=catalog_engine, tables=[Base.metadata.tables[t] for t in CATALOG_TABLES])
+        db = sessionmaker(bind=catalog_engine)()
+        try:
+            load_raw_data(db)
+            db.execute(text(
+                f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+                "id UNINDEXED, name, tokenize = 'unicode61 remove_diacritics 2')"
+            ))
+            db.execute(text(f"INSERT INTO {FTS_TABLE} (id, name) SELECT id, name FROM problems WHERE name IS NOT NULL"))
+            db.execute(text(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')"))
+            set_state(db, DATASET_VERSION_KEY, dataset_version())
+            db.commit()
+        finally:
+            db.close()
+
+        with catalog_engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("ANALYZE"))
+            conn.execute(text("VACUUM"))
+    except Exception as e:
+        print(f"❌ Error building SQLite catalog: {e}")
+        tmp_path.unlink(missing_ok=True)
+        raise
+    finally:
+        catalog_engine.dispose()
+
+    os.replace(tmp_path, output)
+    size_mb = output.stat().st_size / 1e6
+    print(f"✅ Built {output} ({size_mb:.1f} MB, dataset {dataset_version()}) in {time.perf_counter() - t0:.1f}s")
+    print("Serve it with CATALOG_DB_PATH set to this file")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+from collections import Counter, defaultdict
+from sqlalchemy import func
+from app.database import SessionLocal
+from app.models import Sector, Problem, Circuit, CircuitProblem, SectorStats, CircuitStats
+from app.matching import GRADE_ORDER
+from app.translations import tag_ids_from_styles
+
+ORDER_2_GRADE = {order: grade for grade, order in GRADE_ORDER.items()}
+# Number of tags reported as a circuit's dominant styles
+DOMINANT_STYLES = 3
+
+def main():
+    db = SessionLocal()
+    try:
+        compute_problem_tag_ids(db)
+        compute_sector_stats(db)
+        compute_circuit_stats(db)
+    finally:
+        db.close()
+
+def compute_problem_tag_ids(db):
+    """Recompute problems.tag_ids from the styles column, one UPDATE per distinct styles string."""
+    distinct_styles = [styles for (styles,) in db.query(Problem.styles).distinct()]
+    for styles in distinct_styles:
+        db.query(Problem).filter(Problem.styles.is_(None) if styles is None else Problem.styles == styles).update(
+            {Problem.tag_ids: tag_ids_from_styles(styles)}, synchronize_session=False
+        )
+    db.commit()
+    print(f"✅ Computed tag ids for {len(distinct_styles)} distinct style sets")
+
+def compute_sector_stats(db):
+    """
+    Recompute the sector_stats table in one grouped pass over the problems.
+
+    Also refreshes Sector.grade_range from the actual min/max grades.
+    """
+    problem_counts = Counter()
+    grade_counts = defaultdict(Counter)
+    tag_counts = defaultdict(Counter)
+    rating_sums = Counter()
+    rating_counts = Counter()
+
+    rows = db.query(Problem.sector_id, Problem.grade_order, Problem.rating, Problem.styles).yield_per(5000)
+    for sector_id, grade_order, rating, styles in rows:
+        problem_counts[sector_id] += 1
+        if grade_order:
+            grade_counts[sector_id][grade_order] += 1
+        if rating is not None:
+            rating_sums[sector_id] += rating
+            rating_counts[sector_id] += 1
+        if styles:
+            tag_counts[sector_id].update(tag.strip().lower() for tag in styles.split(",") if tag.strip())
+
+    circuit_counts = dict(
+        db.query(Circuit.sector_id, func.count(Circuit.id)).group_by(Circuit.sector_id).all()
+    )
+
+    try:
+        db.query(SectorStats).delete(synchronize_session=False)
+        for sector in db.query(Sector).all():
+            grades = grade_counts[sector.id]
+            min_order = min(grades) if grades else None
+            max_order = max(grades) if grades else None
+            db.add(SectorStats(
+                sector_id=sector.id,
+                problem_count=problem_counts[sector.id],
+                circuit_count=circuit_counts.get(sector.id, 0),
+                min_grade_order=min_order,
+                max_grade_order=max_order,
+                grade_histogram={ORDER_2_GRADE[order]: grades[order] for order in sorted(grades)},
+                mean_rating=(rating_sums[sector.id] / rating_counts[sector.id]) if rating_counts[sector.id] else None,
+                tag_histogram=dict(tag_counts[sector.id].most_common()),
+            ))
+            sector.grade_range = f"{ORDER_2_GRADE[min_order]} - {ORDER_2_GRADE[max_order]}" if grades else ""
+        db.commit()
+        print(f"✅ Computed stats for {len(problem_counts)} sectors")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error computing sector stats: {e}")
+        raise
+
+def compute_circuit_stats(db):
+    """Recompute the circuit_stats table in one grouped pass over circuit memberships."""
+    problem_counts = Counter()
+    grade_counts = defaultdict(Counter)
+    tag_counts = defaultdict(Counter)
+    rating_sums = Counter()
+    rating_counts = Counter()
+
+    rows = (
+        db.query(CircuitProblem.circuit_id, Problem.grade_order, Problem.rating, Problem.styles)
+        .join(Problem, Problem.id == CircuitProblem.problem_id)
+        .yield_per(5000)
+    )
+    for circuit_id, grade_order, rating, styles in rows:
+        problem_counts[circuit_id] += 1
+        if grade_order:
+            grade_counts[circuit_id][grade_order] += 1
+        if rating is not None:
+            rating_sums[circuit_id] += rating
+            rating_counts[circuit_id] += 1
+        if styles:
+            tag_counts[circuit_id].update(tag.strip().lower() for tag in styles.split(",") if tag.strip())
+
+    try:
+        db.query(CircuitStats).delete(synchronize_session=False)
+        for (circuit_id,) in db.query(Circuit.id).all():
+            grades = grade_counts[circuit_id]
+            db.add(CircuitStats(
+                circuit_id=circuit_id,
+                problem_count=problem_counts[circuit_id],
+                min_grade_order=min(grades) if grades else None,
+                max_grade_order=max(grades) if grades else None,
+                grade_histogram={ORDER_2_GRADE[order]: grades[order] for order in sorted(grades)},
+                mean_rating=(rating_sums[circuit_id] / rating_counts[circuit_id]) if rating_counts[circuit_id] else None,
+                dominant_styles=[tag for tag, _ in tag_counts[circuit_id].most_common(DOMINANT_STYLES)],
+            ))
+        db.commit()
+        print(f"✅ Computed stats for {len(problem_counts)} circuits")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error computing circuit stats: {e}")
+        raise
+
+if __name__ == "__main__":
+    main()
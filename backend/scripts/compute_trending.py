@@ -0,0 +1,43 @@
+import time
+from datetime import date, datetime
+import click
+from sqlalchemy import func
+from app.database import SessionLocal
+from app.models import UserClimbedProblem
+from app.trending import compute_trending, write_trending
+
+@click.command()
+@click.option('--as-of', default=None,
+              help="Reference date (YYYY-MM-DD) of the rolling windows, 'latest' for the most recent ascent. Defaults to today.")
+def main(as_of):
+    """
+    Recompute the trending rankings (30 days, 1 year, all time) served by
+    /api/problems/trending. Meant to run daily, e.g. from a scheduler, and
+    after scripts.load_ascents.
+    """
+    db = SessionLocal()
+    try:
+        t0 = time.perf_counter()
+        if as_of == "latest":
+            latest = db.query(func.max(UserClimbedProblem.date_climbed)).scalar()
+            reference = latest.date() if latest else date.today()
+        elif as_of:
+            reference = datetime.strptime(as_of, "%Y-%m-%d").date()
+        else:
+            reference = date.today()
+
+        rows = compute_trending(db, reference)
+        write_trending(db, rows, reference)
+        db.commit()
+        trending = sum(1 for row in rows if row["ascents_30d"])
+        print(f"✅ Trending computed as of {reference} for {len(rows)} problems "
+              f"({trending} climbed in the last 30 days) in {time.perf_counter() - t0:.2f}s")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error computing trending problems: {e}")
+        raise
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
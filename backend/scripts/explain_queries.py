@@ -0,0 +1,245 @@
+import io
+import os
+import random
+import re
+import sys
+import tempfile
+from pathlib import Path
+
+# The audit runs on its own throwaway database: point the app at it before anything opens a connection
+_tmp_dir = tempfile.TemporaryDirectory(prefix="dreamclimb-explain-")
+os.environ["DATABASE_URL"] = f"sqlite:///{Path(_tmp_dir.name) / 'explain.db'}"
+
+import click
+from alembic import command
+from sqlalchemy import create_mock_engine, insert, text
+from app.boot import migrate, _alembic_config
+from app.database import Base, SessionLocal, engine
+from app.models import Sector, Problem, Circuit, CircuitProblem, UserResponse, UserClimbedProblem, UserPreferredTag
+from app.routers.problems import apply_problem_filters, listing_grade_order, TagsMode
+
+# Size of the seeded catalog: large enough for the planner to prefer indexes after ANALYZE
+N_SECTORS = 30
+PROBLEMS_PER_SECTOR = 150
+CIRCUITS_PER_SECTOR = 4
+PROBLEMS_PER_CIRCUIT = 20
+N_USERS = 400
+ASCENTS_PER_USER = 40
+GRADES = ["4a", "4b", "4c", "5a", "5b", "5c", "6a", "6a+", "6b", "6b+", "6c", "6c+",
+          "7a", "7a+", "7b", "7b+", "7c", "7c+", "8a"]
+TAGS = ["dévers", "réglette", "dalle", "traversée", "mur", "arête"]
+
+# Production dialect the migrations are rendered for (offline: no server, no driver needed)
+MIGRATION_DIALECT_URL = "postgresql+psycopg2://"
+# Created by scripts.create_tables before migrations were tracked (the initial revision is empty)
+PRE_MIGRATION_INDEXES = {
+    "ix_sectors_id", "ix_sectors_name", "ix_sectors_slug",
+    "ix_problems_id", "ix_problems_name", "ix_problems_url", "ix_problems_grade_order",
+    "ix_circuits_id", "ix_circuits_name", "ix_circuits_url",
+    "ix_user_responses_id", "ix_user_responses_email",
+    "ix_user_climbed_problems_id", "ix_user_preferred_tags_id",
+}
+CREATE_INDEX = re.compile(r"^CREATE (UNIQUE )?INDEX (\w+) ON ")
+DROP_INDEX = re.compile(r"^DROP INDEX (\w+)")
+
+def seed(db, rng: random.Random) -> None:
+    """Fill the empty database with a synthetic catalog, survey users and ascents."""
+    sectors = [{"id": s + 1, "name": f"Sector {s + 1}", "slug": f"sector-{s + 1}"} for s in range(N_SECTORS)]
+    problems, circuits, circuit_problems = [], [], []
+    for sector in sectors:
+        sector_problems = []
+        for p in range(PROBLEMS_PER_SECTOR):
+            grade_order = rng.randrange(len(GRADES))
+            problem_id = f"{sector['slug']}-{p}"
+            sector_problems.append(problem_id)
+            problems.append({
+                "id": problem_id, "name": f"Problem {p}", "url": f"https://example.com/{problem_id}",
+                "grade": GRADES[grade_order], "grade_order": grade_order + 1, "sector_id": sector["id"],
+                "styles": ",".join(rng.sample(TAGS, 2)),
+                "rating": round(rng.uniform(1, 5), 2) if rng.random() < 0.7 else None,
+            })
+        for c in range(CIRCUITS_PER_SECTOR):
+            circuit_id = f"{sector['slug']}-circuit-{c}"
+            circuits.append({"id": circuit_id, "name": f"Circuit {c}", "url": f"https://example.com/{circuit_id}",
+                             "sector_id": sector["id"]})
+            circuit_problems += [
+                {"circuit_id": circuit_id, "problem_id": problem_id, "number": str(n + 1), "number_order": n + 1}
+                for n, problem_id in enumerate(rng.sample(sector_problems, PROBLEMS_PER_CIRCUIT))
+            ]
+
+    users = [
+        {"id": u + 1, "browser_id": f"browser-{u}", "email": f"climber{u}@example.com",
+         "update_code": f"CODE{u:04d}", "height": rng.randint(155, 195), "arm_span": rng.randint(150, 200)}
+        for u in range(N_USERS)
+    ]
+    problem_ids = [problem["id"] for problem in problems]
+    ascents = [
+        {"user_response_id": user["id"], "problem_id": problem_id}
+        for user in users
+        for problem_id in rng.sample(problem_ids, ASCENTS_PER_USER)
+    ]
+    preferred_tags = [
+        {"user_response_id": user["id"], "tag": tag} for user in users for tag in rng.sample(TAGS, 2)
+    ]
+
+    for model, rows in ((Sector, sectors), (Problem, problems), (Circuit, circuits),
+                        (CircuitProblem, circuit_problems), (UserResponse, users),
+                        (UserClimbedProblem, ascents), (UserPreferredTag, preferred_tags)):
+        db.execute(insert(model), rows)
+    db.commit()
+    # Planner statistics, as a production database would have them
+    db.execute(text("ANALYZE"))
+
+def index_statements(ddl: str) -> dict[str, str]:
+    """{index name: CREATE INDEX statement} left by a DDL script, later DROP INDEXes applied."""
+    indexes = {}
+    for statement in ddl.split(";"):
+        # Offline scripts interleave "-- Running upgrade ..." comment lines
+        lines = [line for line in statement.splitlines() if not line.lstrip().startswith("--")]
+        statement = " ".join(" ".join(lines).split())
+        created, dropped = CREATE_INDEX.match(statement), DROP_INDEX.match(statement)
+        if created:
+            indexes[created.group(2)] = statement
+        elif dropped:
+            indexes.pop(dropped.group(1), None)
+    return indexes
+
+def migration_indexes(url: str) -> dict[str, str]:
+    """Indexes created by the migration chain, from its offline (--sql) rendering for a dialect."""
+    config = _alembic_config()
+    config.output_buffer = io.StringIO()
+    # migrations/env.py reads the URL from the environment
+    app_url, os.environ["DATABASE_URL"] = os.environ["DATABASE_URL"], url
+    try:
+        command.upgrade(config, "head", sql=True)
+    finally:
+        os.environ["DATABASE_URL"] = app_url
+    return index_statements(config.output_buffer.getvalue())
+
+def model_indexes(url: str) -> dict[str, str]:
+    """Indexes declared by app.models (DDL events included), rendered for a dialect."""
+    statements = []
+    mock = create_mock_engine(url, lambda ddl, *args, **kwargs: statements.append(str(ddl.compile(dialect=mock.dialect))))
+    Base.metadata.create_all(mock, checkfirst=False)
+    return index_statements(";".join(statements))
+
+def index_mismatches(url: str) -> list[str]:
+    """
+    Differences between the indexes the migrations create and the ones
+    create_all builds from the models, for databases created before
+    migrations excepted. The query plans below run on a create_all schema,
+    so they only hold for migrated databases if both sets agree.
+    """
+    migrated, declared = migration_indexes(url), model_indexes(url)
+    mismatches = []
+    for name in sorted(declared.keys() | migrated.keys()):
+        if name not in migrated and name not in PRE_MIGRATION_INDEXES:
+            mismatches.append(f"{name} is declared in app.models but no migration creates it")
+        elif name not in declared:
+            mismatches.append(f"{name} is created by a migration but not declared in app.models")
+        elif name in migrated and migrated[name] != declared[name]:
+            mismatches.append(f"{name} differs: migration '{migrated[name]}', models '{declared[name]}'")
+    return mismatches
+
+def router_queries(db):
+    """
+    The query shapes issued by the routers, with sample values from the
+    seeded database, as (label, index expected in the plan, query).
+    """
+    sector_slug = db.query(Sector.slug).order_by(Sector.id).limit(1).scalar()
+    problem_id = db.query(CircuitProblem.problem_id).limit(1).scalar()
+    circuit_id = db.query(CircuitProblem.circuit_id).limit(1).scalar()
+    user_id = db.query(UserResponse.id).order_by(UserResponse.id).limit(1).scalar()
+
+    problems_by_sector = apply_problem_filters(db.query(Problem), "6a", "7a", sector_slug, None, TagsMode.ANY)
+    problems_all = apply_problem_filters(db.query(Problem), "1", "9a", grade_order=listing_grade_order(db, "1", "9a"))
+    problems_by_grade = apply_problem_filters(db.query(Problem), "7a", "7a+")
+
+    return [
+        ("read_problems (sector)", "ix_problems_sector_grade_rating",
+         problems_by_sector.order_by(Problem.rating.desc().nulls_last(), Problem.grade_order).limit(100)),
+        ("read_problems (all sectors)", "ix_problems_rating_grade",
+         problems_all.order_by(Problem.rating.desc().nulls_last(), Problem.grade_order).limit(100)),
+        ("read_problems (grade range)", "ix_problems_grade_order",
+         problems_by_grade.order_by(Problem.rating.desc().nulls_last(), Problem.grade_order).limit(100)),
+        ("read_problems (most climbed)", "ix_problems_ascent_count",
+         problems_all.order_by(Problem.ascent_count.desc(), Problem.rating.desc().nulls_last()).limit(100)),
+        ("read_circuits (sector)", "ix_circuits_sector_id",
+         db.query(Circuit).filter(Circuit.sector_id == db.query(Sector.id).filter(Sector.slug == sector_slug).scalar_subquery())),
+        ("get_circuit_problems", "sqlite_autoindex_circuit_problems_1",
+         db.query(CircuitProblem).filter(CircuitProblem.circuit_id == circuit_id)),
+        ("problem -> circuits", "ix_circuit_problems_problem_circuit",
+         db.query(CircuitProblem.circuit_id).filter(CircuitProblem.problem_id == problem_id)),
+        ("submit: user by browser_id", "ix_user_responses_browser_id",
+         db.query(UserResponse).filter(UserResponse.browser_id == "browser-1")),
+        ("submit: user by email", "ix_user_responses_email",
+         db.query(UserResponse).filter(UserResponse.email == "climber1@example.com")),
+        ("submit: user by update_code", "ix_user_responses_update_code",
+         db.query(UserResponse).filter(UserResponse.update_code == "CODE0001")),
+        ("climbed set of a user", "ix_user_climbed_problems_user_problem",
+         db.query(UserClimbedProblem.problem_id).filter(UserClimbedProblem.user_response_id == user_id)),
+        ("ascents of a problem", "ix_user_climbed_problems_problem_id",
+         db.query(UserClimbedProblem.user_response_id).filter(UserClimbedProblem.problem_id == problem_id)),
+        ("preferred tags of a user", "ix_user_preferred_tags_user_response_id",
+         db.query(UserPreferredTag.tag).filter(UserPreferredTag.user_response_id == user_id)),
+    ]
+
+def explain(db, query):
+    """Return the plan of a query as a list of lines."""
+    sql = str(query.statement.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+    return [row[-1] for row in db.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+
+def uses_index(plan, index):
+    """True if any step of the plan reads through `index`."""
+    pattern = re.compile(rf"USING (COVERING )?INDEX {index}\b")
+    return any(pattern.search(line) for line in plan)
+
+@click.command()
+@click.option('--verbose', is_flag=True, help='Print every plan, not only failures')
+@click.option('--seed', 'seed_value', default=42, help='Seed of the synthetic data')
+def main(verbose, seed_value):
+    """
+    Check that the migrations create the indexes declared in app.models
+    (as rendered for Postgres), then create a temporary SQLite database the
+    way boot does, seed it with a synthetic catalog and survey data, and
+    assert that every router query shape is served by its index. Exits
+    with status 1 on any regression.
+    """
+    failures = 0
+    try:
+        dialect = MIGRATION_DIALECT_URL.split("+")[0]
+        mismatches = index_mismatches(MIGRATION_DIALECT_URL)
+        for mismatch in mismatches:
+            print(f"❌ {dialect}: {mismatch}")
+        if not mismatches:
+            print(f"✅ Migrations create every index declared in app.models ({dialect})")
+        failures += len(mismatches)
+
+        migrate()
+        db = SessionLocal()
+        try:
+            seed(db, random.Random(seed_value))
+            for label, index, query in router_queries(db):
+                plan = explain(db, query)
+                ok = uses_index(plan, index)
+                if ok:
+                    print(f"✅ {label}: {index}")
+                else:
+                    failures += 1
+                    print(f"❌ {label}: {index} not used")
+                if verbose or not ok:
+                    for line in plan:
+                        print(f"     {line}")
+        finally:
+            db.close()
+    finally:
+        engine.dispose()
+        _tmp_dir.cleanup()
+
+    if failures:
+        print(f"❌ {failures} index mismatch(es) or query shape(s) not served by their index")
+        sys.exit(1)
+    print("✅ All router query shapes use their indexes")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+import json
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+import click
+from sqlalchemy import insert
+from app.database import SessionLocal
+from app.models import UserResponse, UserClimbedProblem
+from app.matching import build_problem_index
+from app.ascent_counts import adjust_ascent_counts
+
+ASCENTS_PATH = Path(__file__).parent.parent / "data" / "raw" / "ascents" / "betty_climbers_reps.json"
+INSERT_BATCH_SIZE = 5000
+
+@click.command()
+@click.option('--reps-file', type=click.Path(exists=True, path_type=Path), default=ASCENTS_PATH,
+              help='Scraped repetitions JSON (list of climbers with dated repetitions)')
+@click.option('--force', is_flag=True, help='Re-import climbers that were already loaded')
+@click.option('--dry-run', is_flag=True, help='Match and report without writing to the database')
+def main(reps_file, force, dry_run):
+    db = SessionLocal()
+    try:
+        t0 = time.perf_counter()
+        index = build_problem_index(db)
+        t_index = time.perf_counter() - t0
+        print(f"✅ Indexed {len(index)} problems in {t_index:.2f}s")
+
+        with open(reps_file, "r") as f:
+            climbers = json.load(f)
+
+        t1 = time.perf_counter()
+        stats, climbed_rows = match_climbers(db, index, climbers, force=force, dry_run=dry_run)
+        t_match = time.perf_counter() - t1
+
+        if not dry_run:
+            insert_climbed_problems(db, climbed_rows)
+            db.commit()
+
+        report(stats, t_match, len(climbed_rows), dry_run)
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error loading ascents: {e}")
+        raise
+    finally:
+        db.close()
+
+def parse_date(raw: str | None) -> datetime | None:
+    """Parse scraped dates like '9/15/2025' (month/day/year)."""
+    if not raw:
+        return None
+    try:
+        return datetime.strptime(raw.strip(), "%m/%d/%Y")
+    except ValueError:
+        return None
+
+def get_or_create_climber(db, climber, force):
+    """
+    Return the UserResponse for a scraped climber, or None if it was already
+    loaded and force is not set.
+    """
+    existing = db.query(UserResponse).filter(UserResponse.external_url == climber["url"]).first()
+    if existing and not force:
+        return None
+    if existing:
+        reloaded = db.query(UserClimbedProblem).filter(UserClimbedProblem.user_response_id == existing.id)
+        adjust_ascent_counts(db, [row.problem_id for row in reloaded.with_entities(UserClimbedProblem.problem_id)], -1)
+        reloaded.delete(synchronize_session=False)
+        existing.height = climber.get("height")
+        existing.arm_span = climber.get("span")
+        return existing
+
+    user = UserResponse(
+        external_url=climber["url"],
+        height=climber.get("height"),
+        arm_span=climber.get("span"),
+        created_at=datetime.utcnow()
+    )
+    db.add(user)
+    db.flush()  # Get the ID
+    return user
+
+def match_climbers(db, index, climbers, force=False, dry_run=False):
+    """
+    Match every climber's repetitions against the index, one logbook per batch.
+
+    Returns:
+        (Counter of match methods, list of user_climbed_problems rows)
+    """
+    stats = Counter()
+    rows = []
+    for climber in climbers:
+        repetitions = climber.get("repetitions", [])
+        if dry_run:
+            user_id = None
+        else:
+            user = get_or_create_climber(db, climber, force)
+            if user is None:
+                stats["skipped_existing"] += len(repetitions)
+                continue
+            user_id = user.id
+
+        results = index.resolve_batch([(r.get("ascent", ""), r.get("grade")) for r in repetitions])
+
+        # Keep the earliest dated repetition of each problem
+        first_ascents = {}
+        for rep, result in zip(repetitions, results):
+            stats[result.method] += 1
+            if result.problem_id is None:
+                continue
+            date = parse_date(rep.get("date"))
+            if result.problem_id not in first_ascents:
+                first_ascents[result.problem_id] = date
+            elif date and (first_ascents[result.problem_id] is None or date < first_ascents[result.problem_id]):
+                first_ascents[result.problem_id] = date
+
+        rows.extend(
+            {"user_response_id": user_id, "problem_id": problem_id, "date_climbed": date}
+            for problem_id, date in first_ascents.items()
+        )
+    return stats, rows
+
+def insert_climbed_problems(db, rows):
+    """Insert user_climbed_problems rows with batched executemany statements, and count them."""
+    for start in range(0, len(rows), INSERT_BATCH_SIZE):
+        db.execute(insert(UserClimbedProblem), rows[start:start + INSERT_BATCH_SIZE])
+    adjust_ascent_counts(db, [row["problem_id"] for row in rows])
+
+def report(stats, elapsed, n_rows, dry_run):
+    """Print match rate and throughput."""
+    skipped = stats.pop("skipped_existing", 0)
+    total = sum(stats.values())
+    matched = sum(n for method, n in stats.items() if method not in ("unmatched", "ambiguous", "circuit"))
+    rate = matched / total * 100 if total else 0.0
+    throughput = total / elapsed if elapsed > 0 else 0.0
+
+    print(f"Matched {matched}/{total} repetitions ({rate:.1f}%) in {elapsed:.2f}s ({throughput:,.0f} ascents/s)")
+    for method, n in stats.most_common():
+        print(f"  {method:<15} {n}")
+    if skipped:
+        print(f"⚠️ Skipped {skipped} repetitions from climbers already loaded (use --force to reload)")
+    if dry_run:
+        print(f"Dry run: {n_rows} climbed problems would be inserted.")
+    else:
+        print(f"✅ Inserted {n_rows} climbed problems")
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,14 @@
 import os
+import sys
 from pathlib import Path
 import json
+from sqlalchemy import delete, insert, update
 from app.database import SessionLocal
 from app.models import Sector, Problem, Circuit, CircuitProblem
+from app.matching import GRADE_ORDER
+from app.translations import tag_ids_from_styles
+from scripts.compute_stats import compute_sector_stats, compute_circuit_stats
 
-GRADE_ORDER = {
-    "1": 1, "1+": 2, "2-": 3, "2": 4, "2+": 5, 
-    "3-": 6, "3": 7, "3+": 8, "4-": 9, "4": 10, "4+": 11,
-    "5-": 12, "5": 13, "5+": 14, "6a": 15, "6a+": 16, "6b": 17,
-    "6b+": 18, "6c": 19, "6c+": 20, "7a": 21, "7a+": 22, "7b": 23,
-    "7b+": 24, "7c": 25, "7c+": 26, "8a": 27, "8a+": 28, "8b": 29,
-    "8b+": 30, "8c": 31, "8c+": 32, "9a": 33
-}
 CIRCUIT_ORDER = {
     ## ABO circuits not included, they are mixed
     "EN": 1, "F": 2, "PD-": 3, "PD": 4, "PD+": 5, "AD-": 6, 
@@ -20,17 +17,35 @@ CIRCUIT_ORDER = {
 }
 CIRC_LVLS = ["EN", "F", "PD-", "PD", "PD+", "AD-", "AD", "AD+",
              "D-", "D", "D+", "TD-", "TD", "TD+", "ED-", "ED", "ED+"]
+CIRCUIT_NUMBER_SUFFIXES = {"": 0, "bis": 1, "ter": 2, "quat": 3}
+CIRCUIT_NUMBER_LAST = 1_000_000
 
-def main():
-    db = SessionLocal()
+def main(reload=False):
+    """
+    Load data/raw into an empty database. With reload, a database that
+    already holds a catalog is brought in line with data/raw instead of
+    being skipped.
 
-    # Check if data already loaded
-    existing_sectors = db.query(Sector).count()
-    if existing_sectors > 0:
-        print(f"✅ Data already loaded ({existing_sectors} sectors found). Skipping.")
+    Returns:
+        True if the catalog was (re)loaded, False if it was skipped
+    """
+    db = SessionLocal()
+    try:
+        # Check if data already loaded
+        existing_sectors = db.query(Sector).count()
+        if existing_sectors > 0:
+            if not reload:
+                print(f"✅ Data already loaded ({existing_sectors} sectors found). Skipping.")
+                return False
+            reload_raw_data(db)
+        else:
+            load_raw_data(db)
+        return True
+    finally:
         db.close()
-        return
 
+def load_raw_data(db):
+    """Load sectors, problems, circuits and their stats from data/raw into the session's database."""
     boulder_path = Path(__file__).parent.parent / "data" / "raw" / "boulders"
     circuit_path = Path(__file__).parent.parent / "data" / "raw" / "circuits"
     
@@ -52,8 +67,73 @@ def main():
     
     circuit_problem_records = list(unique_circuit_problems)
     load_records(db, CircuitProblem, circuit_problem_records)
-    
-    db.close()
+
+    # Summaries served by /api/sectors and /api/circuits
+    compute_sector_stats(db)
+    compute_circuit_stats(db)
+
+def reload_raw_data(db):
+    """
+    Update the catalog in place from data/raw: new sectors, problems and
+    circuits are inserted, existing ones updated, circuit memberships and
+    stats rebuilt. Rows keep their ids, so ascents, neighbors and cached
+    recommendations stay valid; problems gone from data/raw are kept for
+    the ascents that reference them.
+    """
+    boulder_path = Path(__file__).parent.parent / "data" / "raw" / "boulders"
+    circuit_path = Path(__file__).parent.parent / "data" / "raw" / "circuits"
+
+    sector_records, boulder_records = read_boulder_jsons(boulder_path)
+    circuit_records, circuit_problem_records = read_circuit_jsons(circuit_path)
+
+    slug2id = upsert_sectors(db, sector_records)
+    for record in boulder_records + circuit_records:
+        record["sector_id"] = slug2id.get(record["id"].split("-")[0])
+    upsert_records(db, Problem, boulder_records)
+    upsert_records(db, Circuit, circuit_records)
+    load_circuit_problems_if_missing(db, circuit_problem_records, sector_slug_2_id=slug2id)
+
+    unique_circuit_problems = list({
+        (r["circuit_id"], r["problem_id"]): r
+        for r in circuit_problem_records
+    }.values())
+    db.execute(delete(CircuitProblem))
+    load_records(db, CircuitProblem, unique_circuit_problems)
+
+    compute_sector_stats(db)
+    compute_circuit_stats(db)
+
+def upsert_sectors(db, sector_records):
+    """Insert or update sectors by slug. Returns the slug->id mapping."""
+    slug2id = dict(db.query(Sector.slug, Sector.id).all())
+    new_records = [r for r in sector_records if r["slug"] not in slug2id]
+    existing_records = [{**r, "id": slug2id[r["slug"]]} for r in sector_records if r["slug"] in slug2id]
+    for record in new_records:
+        sector = Sector(**record)
+        db.add(sector)
+        db.flush()
+        slug2id[sector.slug] = sector.id
+    if existing_records:
+        db.execute(update(Sector), existing_records)
+    db.commit()
+    print(f"✅ Reloaded sectors: {len(new_records)} new, {len(existing_records)} updated")
+    return slug2id
+
+def upsert_records(db, model_class, records):
+    """
+    Insert records whose id is new and update the others in place, with one
+    executemany INSERT and one bulk UPDATE by primary key.
+    """
+    model_name = model_class.__name__.lower()
+    existing_ids = {record_id for (record_id,) in db.query(model_class.id)}
+    new_records = [r for r in records if r["id"] not in existing_ids]
+    existing_records = [r for r in records if r["id"] in existing_ids]
+    if new_records:
+        db.execute(insert(model_class), new_records)
+    if existing_records:
+        db.execute(update(model_class), existing_records)
+    db.commit()
+    print(f"✅ Reloaded {model_name}s: {len(new_records)} new, {len(existing_records)} updated")
 
 def read_json_files(data_path):
     """Generic function to read all JSON files from a path."""
@@ -110,6 +190,7 @@ def make_boulder_records(data, sector_slug):
         url = problem.get("url", "")
         unique_id = f"{sector_slug}-{url.split('/')[-1].split('.')[0]}"
         grade = problem.get("grade", "")
+        styles = ",".join(problem.get("styles", []))
 
         records.append({
             "id": unique_id,
@@ -120,7 +201,8 @@ def make_boulder_records(data, sector_slug):
             "alt_grade": problem.get("alt_grade", ""),
             "rating": problem.get("rating", None),
             "first_ascent": problem.get("first_ascensionist", ""),
-            "styles": ",".join(problem.get("styles", []))
+            "styles": styles,
+            "tag_ids": tag_ids_from_styles(styles),
         })
     return records
 
@@ -155,13 +237,35 @@ def make_circuit_problem_records(data, sector_slug):
             problem_url = problem.get("url", "")
             problem_id = f"{sector_slug}-{problem_url.split('/')[-1].split('.')[0]}"
             
+            number = problem.get("id", "")  # Using 'id' field from circuit[problems] data as number
             records.append({
                 "circuit_id": circuit_id,
                 "problem_id": problem_id,
-                "number": problem.get("id", "")  # Using 'id' field from circuit[problems] data as number
+                "number": number,
+                "number_order": circuit_number_order(number)
             })
     return records
 
+def circuit_number_order(number):
+    """
+    Integer sort key for circuit numbers, in walking order.
+
+    "D" (départ) comes first, then "1", "1 bis", "1 ter", "1 quat", "2", ...,
+    and "A" (arrivée) last. Unrecognized numbers sort at the end.
+    """
+    parts = (number or "").strip().lower().split()
+    if not parts:
+        return CIRCUIT_NUMBER_LAST
+    head, suffix = parts[0], parts[1] if len(parts) > 1 else ""
+    suffix_rank = CIRCUIT_NUMBER_SUFFIXES.get(suffix, len(CIRCUIT_NUMBER_SUFFIXES))
+    if head == "d":
+        return suffix_rank
+    if head == "a":
+        return CIRCUIT_NUMBER_LAST - 10 + suffix_rank
+    if head.isdigit():
+        return (int(head) + 1) * 10 + suffix_rank
+    return CIRCUIT_NUMBER_LAST
+
 def load_circuit_problems_if_missing(db, circuit_problem_records, sector_slug_2_id):
     """Load circuit problems in the problems table, if they are missing from it."""
     existing_problem_ids = {p.id for p in db.query(Problem).all()}
@@ -181,6 +285,7 @@ def load_circuit_problems_if_missing(db, circuit_problem_records, sector_slug_2_
             alt_grade = "",
             first_ascent = "",
             styles = "",
+            tag_ids = [],
             sector_id = sector_slug_2_id.get(sector_slug)
         )
         db.add(new_problem)
@@ -236,4 +341,4 @@ def load_records(db, model_class, records, sector_slug_2_id=None,
         raise
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main(reload="--reload" in sys.argv)
\ No newline at end of file
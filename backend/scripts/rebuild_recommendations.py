@@ -0,0 +1,27 @@
+import time
+import click
+from app.database import SessionLocal
+from app.item_knn import NEIGHBORS_VERSION_KEY
+from app.reco_cache import rebuild_all, CACHE_SIZE
+from app.state import get_state
+
+@click.command()
+@click.option('--top-n', default=CACHE_SIZE, show_default=True, help='Recommendations materialized per user')
+def main(top_n):
+    """Rebuild every user's cached recommendations. build_item_neighbors already does it for each new model."""
+    db = SessionLocal()
+    try:
+        t0 = time.perf_counter()
+        version = get_state(db, NEIGHBORS_VERSION_KEY)
+        n_users = rebuild_all(db, version, top_n=top_n)
+        db.commit()
+        print(f"✅ Rebuilt recommendations for {n_users} users in {time.perf_counter() - t0:.2f}s (model version {version})")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error rebuilding recommendations: {e}")
+        raise
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+import time
+import click
+from app.database import SessionLocal
+from app.ascent_counts import reconcile_ascent_counts
+
+@click.command()
+@click.option('--dry-run', is_flag=True, help='Report drifted counters without fixing them')
+def main(dry_run):
+    """
+    Recompute Problem.ascent_count from user_climbed_problems where it drifted.
+    The writers keep the counters current; run this periodically (e.g. nightly)
+    and after editing ascents by hand.
+    """
+    db = SessionLocal()
+    try:
+        t0 = time.perf_counter()
+        n_drifted = reconcile_ascent_counts(db, dry_run=dry_run)
+        db.commit()
+        elapsed = time.perf_counter() - t0
+        if not n_drifted:
+            print(f"✅ All ascent counters are consistent ({elapsed:.2f}s)")
+        elif dry_run:
+            print(f"⚠️ {n_drifted} problems have a drifted ascent counter ({elapsed:.2f}s)")
+        else:
+            print(f"✅ Fixed {n_drifted} drifted ascent counters in {elapsed:.2f}s")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error reconciling ascent counts: {e}")
+        raise
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+import time
+import click
+from app.database import SessionLocal
+from app.item_knn import build_interaction_matrix
+from app.factors import train_als, save_model
+from app.state import set_state, new_version
+
+FACTORS_VERSION_KEY = "als_version"
+
+@click.command()
+@click.option('--factors', default=64, show_default=True, help='Latent dimension')
+@click.option('--regularization', default=0.1, show_default=True, help='L2 penalty')
+@click.option('--alpha', default=20.0, show_default=True, help='Confidence weight of observed ascents')
+@click.option('--iterations', default=15, show_default=True, help='Alternating least squares sweeps')
+@click.option('--jobs', default=None, type=int, help='Threads (default: all cores)')
+def main(factors, regularization, alpha, iterations, jobs):
+    db = SessionLocal()
+    try:
+        R, user_ids, problem_ids = build_interaction_matrix(db, all_problems=True)
+        print(f"Interaction matrix: {R.shape[0]} users x {R.shape[1]} problems, {R.nnz} ascents")
+        if R.nnz == 0:
+            print("⚠️ No ascents found. Load ascents first (python -m scripts.load_ascents).")
+            return
+
+        t0 = time.perf_counter()
+        user_factors, item_factors = train_als(
+            R, factors=factors, regularization=regularization, alpha=alpha,
+            iterations=iterations, n_jobs=jobs
+        )
+        print(f"Trained ALS ({factors} factors, {iterations} iterations) in {time.perf_counter() - t0:.2f}s")
+
+        version = new_version()
+        params = {"factors": factors, "regularization": regularization, "alpha": alpha, "iterations": iterations}
+        path = save_model(version, user_factors, item_factors, user_ids, problem_ids, params)
+        # The saved version may carry a suffix if this one was already taken
+        set_state(db, FACTORS_VERSION_KEY, path.name)
+        db.commit()
+        print(f"✅ Saved model artifacts to {path}")
+        print("Restart the API workers to map the new model.")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()